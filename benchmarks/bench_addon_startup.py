@@ -0,0 +1,222 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DIR_ADDON = Path(Path(__file__).resolve().parent, "..", "blender_install").resolve()
+RESULT_MARKER = "BENCH_RESULT "
+
+# Runs inside Blender: imports the addon and registers it, reports timings
+BENCH_EXPR = """
+import sys, time, json, importlib
+sys.path.insert(0, {parent!r})
+t0 = time.perf_counter()
+mod = importlib.import_module({name!r})
+t1 = time.perf_counter()
+mod.register()
+t2 = time.perf_counter()
+print({marker!r} + json.dumps({{"import": t1 - t0, "register": t2 - t1}}))
+"""
+
+SYNTH_INIT = """import os
+import sys
+from bpy.utils import register_class, unregister_class
+
+sys.path.append({addon_dir!r})
+
+from lazy_registry import OperatorEntry, get_classes
+
+bl_info = {{"name": "Startup benchmark", "blender": (3, 3, 0), "category": "Object"}}
+
+OPERATORS = tuple(
+    OperatorEntry(f"bench.op_{{i}}", f"Op {{i}}", f"{{__name__}}.op_{{i}}", "Op")
+    for i in range({operators})
+)
+lazy_registration = os.environ.get("BLENDER_INSTALL_EAGER", "") in ("", "0")
+classes = ()
+
+
+def register():
+    global classes
+    classes = get_classes(OPERATORS, lazy_registration)
+
+    for cls in classes:
+        register_class(cls)
+
+
+def unregister():
+    for cls in reversed(classes):
+        unregister_class(cls)
+"""
+
+SYNTH_OPERATOR = """{heavy_import}
+from bpy.types import Operator
+
+
+class Op(Operator):
+    bl_idname = "bench.op_{i}"
+    bl_label = "Op {i}"
+
+    def execute(self, context):
+        return {{"FINISHED"}}
+"""
+
+
+def make_synthetic_addon(root: Path, operators: int, heavy: List[str]) -> Path:
+    """Generates addon with many operator modules importing heavy dependencies.
+
+    Parameters:
+    -----------
+    root : Path
+        Folder to create the addon in.
+    operators : int
+        Number of operator modules.
+    heavy : List[str]
+        Modules imported by every operator module, e.g. numpy.
+
+    Returns:
+    --------
+    Path
+        Folder of the addon package.
+    """
+    pkg = Path(root, "bench_synthetic_addon")
+    os.makedirs(pkg, exist_ok=True)
+    Path(pkg, "__init__.py").write_text(
+        SYNTH_INIT.format(addon_dir=str(DIR_ADDON), operators=operators)
+    )
+    heavy_import = "\n".join(f"import {h}" for h in heavy)
+
+    for i in range(operators):
+        Path(pkg, f"op_{i}.py").write_text(
+            SYNTH_OPERATOR.format(heavy_import=heavy_import, i=i)
+        )
+
+    return pkg
+
+
+def run_once(blender: str, addon: Path, eager: bool) -> Optional[Dict[str, float]]:
+    """Starts fresh Blender, imports and registers addon.
+
+    Returns:
+    --------
+    Optional[Dict[str, float]]
+        Timings, None if the run failed.
+    """
+    env = dict(os.environ, BLENDER_INSTALL_EAGER="1" if eager else "0")
+    expr = BENCH_EXPR.format(
+        parent=str(addon.parent), name=addon.name, marker=RESULT_MARKER
+    )
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [blender, "-b", "--factory-startup", "--python-exit-code", "1"]
+        + ["--python-expr", expr],
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - t0
+
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            res = json.loads(line[len(RESULT_MARKER) :])
+            res["process"] = wall
+            return res
+
+    print(f"Run failed ({proc.returncode}):\n{proc.stdout}\n{proc.stderr}")
+    return None
+
+
+def bench(blender: str, addon: Path, repeats: int) -> Dict[str, Any]:
+    """Runs eager and lazy registration alternately, so drift of the machine
+    affects both modes equally.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Median timings per mode and all raw runs.
+    """
+    runs: Dict[str, List[Dict[str, float]]] = {"eager": [], "lazy": []}
+
+    for _ in range(repeats):
+        for mode in runs.keys():
+            res = run_once(blender, addon, mode == "eager")
+
+            if res is not None:
+                runs[mode].append(res)
+
+    summary: Dict[str, Any] = {}
+
+    for mode, rs in runs.items():
+        if rs:
+            summary[mode] = {
+                k: statistics.median(r[k] for r in rs)
+                for k in ("import", "register", "process")
+            }
+
+    return {"addon": str(addon), "summary": summary, "runs": runs}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare eager and lazy addon registration startup cost",
+        add_help=True,
+    )
+    parser.add_argument(
+        "-b", "--blender", type=str, required=True, help="Blender executable"
+    )
+    parser.add_argument(
+        "-a",
+        "--addon",
+        type=Path,
+        default=DIR_ADDON,
+        help="Addon package folder, defaults to the template",
+    )
+    parser.add_argument(
+        "-s",
+        "--synthetic",
+        type=int,
+        default=0,
+        help="Benchmark generated addon with this number of operator modules",
+    )
+    parser.add_argument(
+        "--heavy",
+        type=str,
+        default="",
+        help="Comma-separated modules imported by synthetic operators, e.g. numpy",
+    )
+    parser.add_argument("-r", "--repeats", type=int, default=5)
+    parser.add_argument("-o", "--output", type=Path, help="Write JSON results")
+
+    args = parser.parse_args()
+    tmp = None
+    addon = args.addon.resolve()
+
+    if args.synthetic > 0:
+        tmp = tempfile.mkdtemp(prefix="bench_addon_")
+        heavy = [h.strip() for h in args.heavy.split(",") if h.strip()]
+        addon = make_synthetic_addon(Path(tmp), args.synthetic, heavy)
+
+    try:
+        result = bench(args.blender, addon, args.repeats)
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, True)
+
+    print(f"{'mode':6} {'import':>9} {'register':>9} {'process':>9}  (median, s)")
+
+    for mode, s in result["summary"].items():
+        print(f"{mode:6} {s['import']:9.4f} {s['register']:9.4f} {s['process']:9.4f}")
+
+    if args.output is not None:
+        with open(args.output, "wt") as f:
+            json.dump(result, f, indent=1)
+
+    if len(result["summary"]) != 2:
+        sys.exit(1)
@@ -0,0 +1,448 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from contextlib import redirect_stdout
+from typing import Any, Callable, Dict, List, Optional
+
+DIR_ADDON = Path(Path(__file__).resolve().parent, "..", "blender_install").resolve()
+sys.path.append(str(DIR_ADDON))
+
+from synthetic import SIZES, make_addon_tree, make_portable_archive
+from install_trace import summarize
+
+SCENARIOS = ("extract", "checksum", "unpack_cache", "install")
+
+# Installs Blender from the archive, copies the addon, activates it and sets
+# up compute devices in fake Blender, pip is skipped as it would touch the host
+# Python
+INSTALL_CONFIG = """blender_path = {blender!r}
+blender_unpack = true
+blender_packed = {archive!r}
+blender_overwrite = false
+blender_unpack_cache = {unpack_cache}
+blender_unpack_cache_path = {unpack_cache_path!r}
+binaries_checksum = true
+checksum_cache = true
+checksum_cache_path = {checksum_cache_path!r}
+addon_path_autodetect = false
+addon_path = {addon_target!r}
+addon_allowed_paths = [{addons!r}]
+addon_install_mode = "copy"
+binaries_path = {binaries!r}
+binaries_copy = false
+binaries_compile = false
+install_activate_script = "install_activate.py"
+setup_compute_devices = true
+compute_device_cache = false
+activation_cache = false
+activate_addons = [{addon_name!r}]
+config_cache = true
+state_db_path = {state_db!r}
+"""
+
+
+def timed(
+    func: Callable[[], Any], setup: Optional[Callable[[], Any]], repeats: int
+) -> List[float]:
+    """Runs func repeats times after setup, output of both is discarded.
+
+    Returns:
+    --------
+    List[float]
+        Time of every run in seconds.
+    """
+    runs = []
+
+    for _ in range(repeats):
+        with redirect_stdout(io.StringIO()):
+            if setup is not None:
+                setup()
+
+            t0 = time.perf_counter()
+            func()
+            runs.append(time.perf_counter() - t0)
+
+    return runs
+
+
+def record(runs: List[float], size_mb: int) -> Dict[str, Any]:
+    return {
+        "median": statistics.median(runs),
+        "min": min(runs),
+        "runs": runs,
+        "size_mb": size_mb,
+    }
+
+
+def fresh(*paths: Path) -> Callable[[], None]:
+    """Setup which removes the folders, so every run starts cold."""
+
+    def setup():
+        for p in paths:
+            shutil.rmtree(p, True)
+
+    return setup
+
+
+def bench_extract(
+    root: Path, archive: Path, size_mb: int, repeats: int
+) -> Dict[str, Any]:
+    from install_config import extract_portable
+
+    target = Path(root, "extracted")
+
+    def setup():
+        # Zip extraction expects existing Blender folder
+        fresh(target)()
+        os.makedirs(target)
+
+    runs = timed(lambda: extract_portable(archive, target), setup, repeats)
+    shutil.rmtree(target, True)
+
+    return record(runs, size_mb)
+
+
+def bench_checksum(
+    root: Path, archive: Path, size_mb: int, repeats: int
+) -> Dict[str, Dict[str, Any]]:
+    from checksum_file import checksum_file
+
+    cache = Path(root, "checksum_cache")
+    cold = timed(lambda: checksum_file(archive, cache), fresh(cache), repeats)
+    warm = timed(lambda: checksum_file(archive, cache), None, repeats)
+    shutil.rmtree(cache, True)
+
+    return {"cold": record(cold, size_mb), "warm": record(warm, size_mb)}
+
+
+def bench_unpack_cache(
+    root: Path, archive: Path, size_mb: int, repeats: int
+) -> Dict[str, Dict[str, Any]]:
+    from install_unpack_cache import unpack_cached
+
+    cache = Path(root, "unpack_cache")
+    target = Path(root, "materialized")
+    cold = timed(
+        lambda: unpack_cached(archive, target, cache), fresh(cache, target), repeats
+    )
+    warm = timed(lambda: unpack_cached(archive, target, cache), fresh(target), repeats)
+    shutil.rmtree(cache, True)
+    shutil.rmtree(target, True)
+
+    return {"cold": record(cold, size_mb), "warm": record(warm, size_mb)}
+
+
+def run_install(addon: Path, cfg: Path, trace: Path) -> Dict[str, float]:
+    """Runs install.py of the synthetic addon with tracing.
+
+    Returns:
+    --------
+    Dict[str, float]
+        Wall time and total time of every stage in seconds.
+    """
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [
+            sys.executable,
+            str(Path(addon, "install.py")),
+            "-c",
+            str(cfg),
+            "--trace",
+            str(trace),
+        ],
+        cwd=str(addon),
+        # Fake Blender imports installed addons from <scripts>/addons
+        env={**os.environ, "BLENDER_USER_SCRIPTS": str(addon.parent)},
+        capture_output=True,
+        text=True,
+    )
+    wall = time.perf_counter() - t0
+
+    if proc.returncode != 0:
+        raise Exception(
+            f"Install failed ({proc.returncode}):\n{proc.stdout}\n{proc.stderr}"
+        )
+
+    with open(trace, "rt") as f:
+        events = json.load(f)["traceEvents"]
+
+    stages = {r["name"]: r["total"] for r in summarize(events) if r["cat"] == "stage"}
+
+    return {"wall": wall, **stages}
+
+
+def bench_install(
+    root: Path, archive: Path, size_mb: int, repeats: int, unpack_cache: bool
+) -> Dict[str, Dict[str, Any]]:
+    """Installs portable Blender and addon of the size from scratch (cold) and
+    again with everything in place (warm), splits the time by stage."""
+    work = Path(root, "install")
+    addon = make_addon_tree(work, modules=200, data_mb=max(1, size_mb // 8))
+    blender = Path(work, "blender", "blender")
+    addons = Path(work, "addons")
+    # Installer expects existing addon folder, it's replaced by the copy
+    addon_target = Path(addons, addon.name)
+    binaries = Path(work, "bin")
+    os.makedirs(binaries)
+
+    # Warm runs skip stages which are up to date, cold ones start without it
+    state_db = Path(work, "install_state.sqlite")
+    cfg = Path(work, "bench.toml")
+    cfg.write_text(
+        INSTALL_CONFIG.format(
+            blender=str(blender),
+            archive=str(archive),
+            unpack_cache=str(unpack_cache).lower(),
+            unpack_cache_path=str(Path(work, "unpack_cache")),
+            checksum_cache_path=str(Path(work, "checksum_cache")),
+            addons=str(addons),
+            addon_target=str(addon_target),
+            addon_name=addon.name,
+            binaries=str(binaries),
+            state_db=str(state_db),
+        )
+    )
+    trace = Path(work, "trace.json")
+    cold: Dict[str, List[float]] = {}
+    warm: Dict[str, List[float]] = {}
+
+    for _ in range(repeats):
+        fresh(
+            blender.parent,
+            addons,
+            Path(work, "unpack_cache"),
+            Path(work, "checksum_cache"),
+        )()
+        os.makedirs(addon_target)
+
+        if state_db.exists():
+            state_db.unlink()
+
+        # Snapshot of the previous run refers to removed Blender
+        for s in addon.glob(".*.snapshot.json"):
+            s.unlink()
+
+        for runs, result in (
+            (cold, run_install(addon, cfg, trace)),
+            (warm, run_install(addon, cfg, trace)),
+        ):
+            for stage, t in result.items():
+                runs.setdefault(stage, []).append(t)
+
+    shutil.rmtree(work, True)
+
+    return {
+        f"{kind}:{stage}": record(runs, size_mb)
+        for kind, stages in (("cold", cold), ("warm", warm))
+        for stage, runs in stages.items()
+    }
+
+
+def bench(
+    root: Path,
+    sizes: List[str],
+    formats: List[str],
+    scenarios: List[str],
+    repeats: int,
+    unpack_cache: bool,
+) -> Dict[str, Dict[str, Any]]:
+    """Generates inputs of every size and runs the scenarios.
+
+    Returns:
+    --------
+    Dict[str, Dict[str, Any]]
+        Scenario name -> median, min and every run in seconds.
+    """
+    results: Dict[str, Dict[str, Any]] = {}
+
+    for size in sizes:
+        size_mb = SIZES[size]
+        print(f"Generating {size} inputs ({size_mb} MB)")
+        archives = {fmt: make_portable_archive(root, size_mb, fmt) for fmt in formats}
+        tar = archives.get("tar.xz")
+
+        if "extract" in scenarios:
+            for fmt, archive in archives.items():
+                results[f"extract_{fmt}_{size}"] = bench_extract(
+                    root, archive, size_mb, repeats
+                )
+
+        if "checksum" in scenarios and tar is not None:
+            for kind, r in bench_checksum(root, tar, size_mb, repeats).items():
+                results[f"checksum_{kind}_{size}"] = r
+
+        if "unpack_cache" in scenarios and tar is not None:
+            for kind, r in bench_unpack_cache(root, tar, size_mb, repeats).items():
+                results[f"unpack_cache_{kind}_{size}"] = r
+
+        # Executable bit of fake Blender survives only in tar
+        if "install" in scenarios and tar is not None:
+            for name, r in bench_install(
+                root, tar, size_mb, repeats, unpack_cache
+            ).items():
+                kind, stage = name.split(":")
+                results[f"install_{kind}_{size}:{stage}"] = r
+
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    threshold: float,
+    min_delta: float,
+) -> List[str]:
+    """Prints medians against the baseline.
+
+    Parameters:
+    -----------
+    threshold : float
+        Relative slowdown that is a regression, e.g. 0.25 - 25% slower.
+    min_delta : float
+        Smaller differences in seconds are noise, even if relatively large.
+
+    Returns:
+    --------
+    List[str]
+        Names of regressed scenarios.
+    """
+    regressed = []
+    print(f"{'scenario':44} {'base, s':>9} {'now, s':>9} {'change':>8}")
+
+    for name, r in results.items():
+        base = baseline.get(name)
+
+        if base is None:
+            print(f"{name[:44]:44} {'':>9} {r['median']:9.4f} {'new':>8}")
+            continue
+
+        delta = r["median"] - base["median"]
+        change = delta / base["median"] if base["median"] > 0 else 0.0
+        status = ""
+
+        if change > threshold and delta > min_delta:
+            status = "  REGRESSION"
+            regressed.append(name)
+
+        print(
+            f"{name[:44]:44} {base['median']:9.4f} {r['median']:9.4f} "
+            f"{change * 100:+7.1f}%{status}"
+        )
+
+    return regressed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark unpacking, checksumming, copying and installation "
+        "with fake Blender and synthetic archives",
+        add_help=True,
+    )
+    parser.add_argument(
+        "--sizes",
+        default="small",
+        help=f"Comma separated sizes of inputs: {', '.join(f'{k} ({v} MB)' for k, v in SIZES.items())}",
+    )
+    parser.add_argument("--formats", default="tar.xz,zip", help="Archive formats")
+    parser.add_argument(
+        "-s",
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help="Comma separated scenarios",
+    )
+    parser.add_argument(
+        "--no-unpack-cache",
+        action="store_true",
+        help="Install without blender_unpack_cache",
+    )
+    parser.add_argument("-r", "--repeats", type=int, default=3)
+    parser.add_argument(
+        "-d",
+        "--dir",
+        type=Path,
+        help="Folder to generate inputs in, e.g. on a real network mount",
+    )
+    parser.add_argument("-o", "--output", type=Path, help="Write JSON results")
+    parser.add_argument(
+        "-b",
+        "--baseline",
+        type=Path,
+        help="JSON results of a previous run, exit with 1 on regression",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="Relative slowdown of the median treated as regression",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=0.01,
+        help="Slowdowns shorter than this (seconds) are treated as noise",
+    )
+
+    args = parser.parse_args()
+    sizes = args.sizes.split(",")
+    scenarios = args.scenarios.split(",")
+
+    for name in sizes:
+        if name not in SIZES:
+            parser.error(f"Unknown size: {name}")
+
+    for name in scenarios:
+        if name not in SCENARIOS:
+            parser.error(f"Unknown scenario: {name}")
+
+    root = Path(tempfile.mkdtemp(prefix="bench_install_", dir=args.dir))
+
+    try:
+        results = bench(
+            root,
+            sizes,
+            args.formats.split(","),
+            scenarios,
+            args.repeats,
+            not args.no_unpack_cache,
+        )
+    finally:
+        shutil.rmtree(root, True)
+
+    output = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "repeats": args.repeats,
+        },
+        "results": results,
+    }
+
+    if args.output is not None:
+        with open(args.output, "wt") as f:
+            json.dump(output, f, indent=1)
+
+    if args.baseline is not None:
+        with open(args.baseline, "rt") as f:
+            baseline = json.load(f)["results"]
+
+        regressed = compare(results, baseline, args.threshold, args.min_delta)
+
+        if len(regressed) > 0:
+            print(f"{len(regressed)} scenarios regressed")
+            sys.exit(1)
+    else:
+        print(f"{'scenario':44} {'median, s':>9} {'min, s':>9}")
+
+        for name, r in results.items():
+            print(f"{name[:44]:44} {r['median']:9.4f} {r['min']:9.4f}")
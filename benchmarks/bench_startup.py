@@ -0,0 +1,204 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+DIR_ADDON = Path(Path(__file__).resolve().parent, "..", "blender_install").resolve()
+INSTALL_SCRIPT = Path(DIR_ADDON, "install.py")
+
+# Stand-in of Blender executable, only --version is called while validating
+FAKE_BLENDER = """#!/bin/sh
+echo "Blender 4.2.0"
+echo "\tbuild date: 2024-07-16"
+"""
+
+NOOP_CONFIG = """blender_path = {blender!r}
+blender_unpack = false
+addon_path_autodetect = false
+addon_path = {addons!r}
+addon_install_mode = "symlink"
+binaries_path = {binaries!r}
+binaries_copy = false
+binaries_compile = false
+setup_compute_devices = false
+activation_cache = false
+config_cache = true
+state_db = false
+"""
+
+
+def parse_importtime(stderr: str) -> Tuple[float, Dict[str, float]]:
+    """Parses output of python -X importtime.
+
+    Returns:
+    --------
+    Tuple[float, Dict[str, float]]
+        Total import time in ms (sum of top level imports) and cumulative time
+        of every module in ms.
+    """
+    total = 0.0
+    modules: Dict[str, float] = {}
+
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+
+        parts = line[len("import time:") :].split("|")
+
+        try:
+            cumulative = int(parts[1]) / 1000
+        except ValueError:
+            # Header line
+            continue
+
+        name = parts[2].rstrip()
+        modules[name.strip()] = cumulative
+
+        # Nested imports are indented and already counted by their parent
+        if not name.startswith("  "):
+            total += cumulative
+
+    return total, modules
+
+
+def make_noop_setup(root: Path) -> Path:
+    """Creates fake Blender, addons folder and config, where every stage has
+    nothing to do: addon is already linked, no scripts and binaries.
+
+    Returns:
+    --------
+    Path
+        Path of the config.
+    """
+    blender = Path(root, "blender", "blender")
+    os.makedirs(Path(blender.parent, "4.2", "python", "bin"))
+    Path(blender.parent, "4.2", "python", "bin", "python3.11").touch()
+    blender.write_text(FAKE_BLENDER)
+    blender.chmod(0o755)
+
+    # Addon is already linked, so the install stage has nothing to do
+    addons = Path(root, "addons")
+    binaries = Path(root, "bin")
+    os.makedirs(addons)
+    os.makedirs(binaries)
+    addon = Path(addons, DIR_ADDON.name)
+    os.symlink(DIR_ADDON, addon, True)
+
+    cfg = Path(root, "noop.toml")
+    cfg.write_text(
+        NOOP_CONFIG.format(
+            blender=str(blender), addons=str(addon), binaries=str(binaries)
+        )
+    )
+
+    return cfg
+
+
+def run_importtime(args: List[str], cwd: Path) -> Tuple[float, Dict[str, float]]:
+    """Runs fresh interpreter with -X importtime."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime"] + args,
+        cwd=str(cwd),
+        capture_output=True,
+        text=True,
+    )
+
+    if proc.returncode != 0:
+        raise Exception(f"{args} failed ({proc.returncode}):\n{proc.stderr}")
+
+    return parse_importtime(proc.stderr)
+
+
+def bench(root: Path, repeats: int) -> Dict[str, Any]:
+    """Measures import time of the orchestrator on top of the bare interpreter
+    for --help and a run with no-op config.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Median import time over baseline in ms and the heaviest modules per
+        scenario.
+    """
+    cfg = make_noop_setup(root)
+    scenarios = {
+        "baseline": ["-c", "pass"],
+        "help": [str(INSTALL_SCRIPT), "--help"],
+        "noop": [str(INSTALL_SCRIPT), "-c", str(cfg)],
+    }
+
+    # First run validates the config, next runs load it from the snapshot
+    run_importtime(scenarios["noop"], DIR_ADDON)
+    runs: Dict[str, List[float]] = {name: [] for name in scenarios.keys()}
+    modules: Dict[str, Dict[str, float]] = {}
+
+    for _ in range(repeats):
+        for name, args in scenarios.items():
+            total, modules[name] = run_importtime(args, DIR_ADDON)
+            runs[name].append(total)
+
+    baseline = statistics.median(runs["baseline"])
+    result: Dict[str, Any] = {"baseline": baseline}
+
+    for name in ("help", "noop"):
+        own = {m: t for m, t in modules[name].items() if m not in modules["baseline"]}
+        result[name] = {
+            "import": statistics.median(runs[name]) - baseline,
+            "top": sorted(own.items(), key=lambda kv: kv[1], reverse=True)[:10],
+        }
+
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Measure import time of install.py and fail over budget",
+        add_help=True,
+    )
+    parser.add_argument(
+        "--budget-help",
+        type=float,
+        default=40.0,
+        help="Import budget of install.py --help over bare interpreter, ms",
+    )
+    parser.add_argument(
+        "--budget-noop",
+        type=float,
+        default=70.0,
+        help="Import budget of a run with no-op config over bare interpreter, ms",
+    )
+    parser.add_argument("-r", "--repeats", type=int, default=5)
+    parser.add_argument("-o", "--output", type=Path, help="Write JSON results")
+
+    args = parser.parse_args()
+    root = Path(tempfile.mkdtemp(prefix="bench_startup_"))
+
+    try:
+        result = bench(root, args.repeats)
+    finally:
+        shutil.rmtree(root, True)
+
+    budgets = {"help": args.budget_help, "noop": args.budget_noop}
+    failed = False
+    print(f"Bare interpreter imports: {result['baseline']:.1f} ms")
+
+    for name, budget in budgets.items():
+        r = result[name]
+        status = "OK" if r["import"] <= budget else "OVER BUDGET"
+        failed |= r["import"] > budget
+        print(f"{name:5} {r['import']:7.1f} ms (budget {budget:.1f} ms) {status}")
+
+        for module, t in r["top"]:
+            print(f"    {t:7.1f} ms  {module}")
+
+    if args.output is not None:
+        with open(args.output, "wt") as f:
+            json.dump({"budgets": budgets, **result}, f, indent=1)
+
+    if failed:
+        sys.exit(1)
@@ -0,0 +1,196 @@
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+import statistics
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, List
+
+DIR_ADDON = Path(Path(__file__).resolve().parent, "..", "blender_install").resolve()
+sys.path.append(str(DIR_ADDON))
+
+from install_bundle import write_bundle, collect_tree
+
+RESULT_MARKER = "BENCH_RESULT "
+
+# Runs in a fresh interpreter: slows down and counts stat/open calls of the
+# import system, stats bundled sources like __init__.py does before it uses
+# the bundle, imports every module of the layout and reports timings
+BENCH_CODE = """
+import sys, time, json, _io, importlib, importlib._bootstrap_external as be
+
+latency = {latency}
+counts = {{"stat": 0, "open": 0}}
+path_stat = be._path_stat
+open_code = _io.open_code
+
+def slow_stat(path):
+    counts["stat"] += 1
+    time.sleep(latency)
+    return path_stat(path)
+
+def slow_open(path):
+    counts["open"] += 1
+    time.sleep(latency)
+    return open_code(path)
+
+# Loose layout is searched along the rest of sys.path like on a real node
+sys.path[0:0] = {paths!r}
+be._path_stat = slow_stat
+_io.open_code = slow_open
+sys.path_importer_cache.clear()
+
+t0 = time.perf_counter()
+for path in {checks!r}:
+    slow_stat(path)
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = time.perf_counter() - t0
+
+print({marker!r} + json.dumps({{"time": elapsed, **counts}}))
+"""
+
+
+def make_package(root: Path, packages: int, modules: int) -> List[str]:
+    """Generates pure Python packages that import each other like a real
+    dependency tree.
+
+    Parameters:
+    -----------
+    root : Path
+        Folder to create packages in.
+    packages : int
+        Number of packages.
+    modules : int
+        Number of modules in every package.
+
+    Returns:
+    --------
+    List[str]
+        Names of all modules.
+    """
+    names: List[str] = []
+
+    for p in range(packages):
+        pkg = Path(root, f"bench_pkg_{p}")
+        os.makedirs(pkg, exist_ok=True)
+        Path(pkg, "__init__.py").write_text(
+            "".join(f"from . import mod_{m}\n" for m in range(modules))
+        )
+        names.append(pkg.name)
+
+        for m in range(modules):
+            Path(pkg, f"mod_{m}.py").write_text(
+                f"import json\nVALUE = {m}\n\n\ndef f(x):\n    return x + VALUE\n"
+            )
+            names.append(f"{pkg.name}.mod_{m}")
+
+    return names
+
+
+def run_layout(
+    paths: List[str], checks: List[str], modules: List[str], latency: float
+) -> Dict:
+    """Imports modules in a fresh interpreter with the given sys.path prefix,
+    files of checks are stat'ed first."""
+    code = BENCH_CODE.format(
+        latency=latency,
+        paths=paths,
+        checks=checks,
+        modules=modules,
+        marker=RESULT_MARKER,
+    )
+    proc = subprocess.run(
+        [sys.executable, "-B", "-c", code], capture_output=True, text=True
+    )
+
+    for line in proc.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER) :])
+
+    raise Exception(f"Benchmark run failed:\n{proc.stdout}\n{proc.stderr}")
+
+
+def bench(root: Path, packages: int, modules: int, latency: float, repeats: int):
+    """Compares loose files with precompiled bytecode against the zip bundle.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Median timings and call counts per layout.
+    """
+    loose = Path(root, "loose")
+    names = make_package(loose, packages, modules)
+    bundle = Path(root, "bundle.zip")
+    files = collect_tree(loose, ["__pycache__"], [])
+    write_bundle([(loose, files)], bundle)
+
+    # Give loose layout its best case: bytecode is already cached
+    subprocess.run([sys.executable, "-m", "compileall", "-q", str(loose)], check=True)
+
+    # Several empty entries stand in for other addon folders and site-packages
+    extra = []
+    for i in range(4):
+        os.makedirs(Path(root, f"path_{i}"), exist_ok=True)
+        extra.append(str(Path(root, f"path_{i}")))
+
+    # sys.path as __init__.py builds it: addon folder is appended after
+    # site-packages, the bundle goes first once its sources are checked
+    sources = [str(Path(loose, f)) for f in files]
+    layouts = {
+        "loose": (extra + [str(loose)], []),
+        "zip": ([str(bundle)] + extra + [str(loose)], sources),
+    }
+    result: Dict[str, Any] = {}
+
+    for name, (paths, checks) in layouts.items():
+        runs = [run_layout(paths, checks, names, latency) for _ in range(repeats)]
+        result[name] = {
+            k: statistics.median(r[k] for r in runs) for k in ("time", "stat", "open")
+        }
+
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare import latency of loose files and zip bundle",
+        add_help=True,
+    )
+    parser.add_argument("-p", "--packages", type=int, default=10)
+    parser.add_argument("-m", "--modules", type=int, default=20)
+    parser.add_argument(
+        "-l",
+        "--latency",
+        type=float,
+        default=0.0005,
+        help="Simulated latency of every stat/open in seconds, NFS is ~0.5 ms",
+    )
+    parser.add_argument(
+        "-d",
+        "--dir",
+        type=Path,
+        help="Folder to generate layouts in, e.g. on a real network mount",
+    )
+    parser.add_argument("-r", "--repeats", type=int, default=3)
+    parser.add_argument("-o", "--output", type=Path, help="Write JSON results")
+
+    args = parser.parse_args()
+    root = Path(tempfile.mkdtemp(prefix="bench_zipimport_", dir=args.dir))
+
+    try:
+        result = bench(root, args.packages, args.modules, args.latency, args.repeats)
+    finally:
+        shutil.rmtree(root, True)
+
+    print(f"{'layout':6} {'time, s':>9} {'stat':>7} {'open':>7}  (median)")
+
+    for name, r in result.items():
+        print(f"{name:6} {r['time']:9.4f} {r['stat']:7.0f} {r['open']:7.0f}")
+
+    if args.output is not None:
+        with open(args.output, "wt") as f:
+            json.dump(result, f, indent=1)
@@ -0,0 +1,112 @@
+"""Stand-in of Blender executable for benchmarks: answers --version and runs
+-P scripts and --python-expr code in the current interpreter against the stub
+bpy and addon_utils of benchmarks/stubs, like Blender in background mode.
+"""
+
+import os
+import sys
+import runpy
+import traceback
+from pathlib import Path
+from typing import List
+
+DIR_BENCH = Path(__file__).resolve().parent
+DIR_STUBS = Path(DIR_BENCH, "stubs")
+
+# Generated executable, imports this module from the benchmarks folder
+EXECUTABLE = """#!{python}
+import sys
+sys.path.insert(0, {bench!r})
+from fake_blender import main
+sys.exit(main(sys.argv, {version!r}))
+"""
+
+
+def make_fake_blender(
+    folder: Path, version: str = "4.2.0", python: str = "3.11"
+) -> Path:
+    """Creates executable and the layout of portable Blender installer looks
+    for: <major.minor>/python/bin/python<version>.
+
+    Parameters:
+    -----------
+    folder : Path
+        Folder of portable Blender.
+    version : str
+        Reported Blender version.
+    python : str
+        Version of the bundled Python, only the name of the binary.
+
+    Returns:
+    --------
+    Path
+        Path of the executable.
+    """
+    major = ".".join(version.split(".")[:2])
+    python_bin = Path(folder, major, "python", "bin")
+    os.makedirs(python_bin, exist_ok=True)
+    Path(python_bin, f"python{python}").touch()
+
+    blender = Path(folder, "blender")
+    blender.write_text(
+        EXECUTABLE.format(python=sys.executable, bench=str(DIR_BENCH), version=version)
+    )
+    blender.chmod(0o755)
+
+    return blender
+
+
+def main(argv: List[str], version: str) -> int:
+    """Handles command line of Blender: --version, -b, -P <script>,
+    --python-expr <code>, arguments after -- are left to the scripts.
+
+    Returns:
+    --------
+    int
+        Exit code: code of sys.exit of a script, 0 otherwise. Like Blender,
+        exceptions of scripts are printed and don't change the exit code.
+    """
+    args = argv[1 : argv.index("--")] if "--" in argv else argv[1:]
+
+    if "--version" in args or "-v" in args:
+        print(f"Blender {version}")
+        print("\tbuild date: 2024-07-16")
+        return 0
+
+    sys.path.insert(0, str(DIR_STUBS))
+
+    # Installed addons are importable like in Blender, from <scripts>/addons
+    if os.environ.get("BLENDER_USER_SCRIPTS"):
+        sys.path.append(os.path.join(os.environ["BLENDER_USER_SCRIPTS"], "addons"))
+
+    import bpy
+
+    bpy.app.binary_path = argv[0]
+    bpy.app.version = tuple(int(v) for v in version.split("."))
+    bpy.app.version_string = f"{version} (fake)"
+
+    # Scripts read their arguments from the whole command line like in Blender
+    sys.argv = list(argv)
+    i = 0
+
+    while i < len(args):
+        arg = args[i]
+        i += 1
+
+        if arg not in ("-P", "--python", "--python-expr") or i >= len(args):
+            continue
+
+        value = args[i]
+        i += 1
+
+        try:
+            if arg == "--python-expr":
+                exec(compile(value, "<string>", "exec"), {"__name__": "__main__"})
+            else:
+                runpy.run_path(value, run_name="__main__")
+        except SystemExit as e:
+            return e.code if isinstance(e.code, int) else 0
+        except Exception:
+            traceback.print_exc()
+
+    return 0
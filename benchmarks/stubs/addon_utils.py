@@ -0,0 +1,49 @@
+"""Stand-in of Blender addon_utils: imports module and calls register()."""
+
+import importlib
+import traceback
+from typing import List
+
+# Names of enabled addons
+enabled: List[str] = []
+
+
+def enable(
+    module_name: str,
+    default_set: bool = False,
+    persistent: bool = False,
+    handle_error=None,
+):
+    # Like Blender: failures are passed to handle_error or printed, not raised
+    try:
+        mod = importlib.import_module(module_name)
+        mod.register()
+    except Exception as e:
+        if handle_error is None:
+            traceback.print_exc()
+        else:
+            handle_error(e)
+
+        return None
+
+    enabled.append(module_name)
+    return mod
+
+
+def disable(module_name: str, default_set: bool = False, handle_error=None):
+    if module_name not in enabled:
+        return
+
+    try:
+        importlib.import_module(module_name).unregister()
+    except Exception as e:
+        if handle_error is None:
+            traceback.print_exc()
+        else:
+            handle_error(e)
+
+    enabled.remove(module_name)
+
+
+def check(module_name: str):
+    return (module_name in enabled, module_name in enabled)
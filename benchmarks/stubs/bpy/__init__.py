@@ -0,0 +1,112 @@
+"""Minimal stand-in of Blender Python API to run installer scripts outside of
+Blender, e.g. to check compute device and CPU tuning logic on a render node:
+
+    PYTHONPATH=benchmarks/stubs python -c "import install_activate as a; \\
+        a.setup_compute_devices(cpu_tuning=True)"
+
+Only attributes used by the installer are provided. Calls of operators are
+recorded in `calls`, devices reported by Cycles are set with `set_devices`.
+"""
+
+import sys
+from types import SimpleNamespace
+from typing import Any, Dict, List, Tuple
+
+from . import types, utils, props
+
+# Operator calls in order: ("wm.save_userpref", kwargs)
+calls: List[Tuple[str, Dict[str, Any]]] = []
+
+
+class Device(SimpleNamespace):
+    """Compute device of Cycles."""
+
+    def __init__(self, type: str, name: str, use: bool = False):
+        super().__init__(type=type, name=name, id=f"{type}_{name}", use=use)
+
+
+class CyclesPreferences:
+    """Preferences of Cycles addon with configurable device list."""
+
+    def __init__(self):
+        self.compute_device_type = "NONE"
+        self.compute_device = "NONE"
+        self.devices: List[Device] = []
+
+    def get_device_types(self, context) -> List[Tuple[str, str, str]]:
+        types = ["NONE", "CUDA", "OPTIX", "HIP", "METAL", "ONEAPI"]
+        return [(t, t, t) for t in types]
+
+    def get_devices_for_type(self, compute_device_type: str) -> List[Device]:
+        return [d for d in self.devices if d.type in (compute_device_type, "CPU")] or [
+            d for d in self.devices if d.type == "CPU"
+        ]
+
+    def refresh_devices(self):
+        pass
+
+
+class Addons(dict):
+    """Collection of enabled addons, missing addons are created on access."""
+
+    def __missing__(self, key: str):
+        self[key] = SimpleNamespace(module=key, preferences=SimpleNamespace())
+        return self[key]
+
+
+class Scene(SimpleNamespace):
+    """Scene with render and Cycles settings."""
+
+    def __init__(self, name: str = "Scene"):
+        super().__init__(
+            name=name,
+            render=SimpleNamespace(
+                threads_mode="AUTO", threads=1, use_persistent_data=False
+            ),
+            cycles=SimpleNamespace(device="CPU", use_auto_tile=True, tile_size=2048),
+        )
+
+
+class OpsNamespace:
+    """Resolves bpy.ops.<module>.<operator>, every call is recorded."""
+
+    def __init__(self, module: str = ""):
+        self._module = module
+
+    def __getattr__(self, name: str):
+        if not self._module:
+            return OpsNamespace(name)
+
+        idname = f"{self._module}.{name}"
+
+        def op(*args, **kwargs):
+            calls.append((idname, kwargs))
+            return {"FINISHED"}
+
+        return op
+
+
+def set_devices(devices: List[Tuple[str, str]]):
+    """Sets devices reported by Cycles: pairs of type and name, e.g.
+    [("CPU", "Xeon"), ("CUDA", "RTX A4000")]."""
+    context.preferences.addons["cycles"].preferences.devices = [
+        Device(t, n) for t, n in devices
+    ]
+
+
+_addons = Addons()
+_addons["cycles"] = SimpleNamespace(module="cycles", preferences=CyclesPreferences())
+
+app = SimpleNamespace(
+    version=(4, 2, 0),
+    version_string="4.2.0 (stub)",
+    binary_path=sys.executable,
+    background=True,
+    timers=SimpleNamespace(register=lambda func, **kwargs: None),
+)
+data = SimpleNamespace(scenes=[Scene()])
+context = SimpleNamespace(
+    preferences=SimpleNamespace(addons=_addons), scene=data.scenes[0]
+)
+ops = OpsNamespace()
+set_devices([("CPU", "CPU")])
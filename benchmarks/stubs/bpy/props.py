@@ -0,0 +1,9 @@
+def _prop(**kwargs):
+    return kwargs
+
+
+BoolProperty = _prop
+IntProperty = _prop
+FloatProperty = _prop
+StringProperty = _prop
+EnumProperty = _prop
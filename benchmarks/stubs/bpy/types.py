@@ -0,0 +1,18 @@
+class Context:
+    pass
+
+
+class Operator:
+    bl_idname = ""
+    bl_label = ""
+
+    def report(self, type, message):
+        print(f"{type}: {message}")
+
+
+class AddonPreferences:
+    pass
+
+
+class Panel:
+    pass
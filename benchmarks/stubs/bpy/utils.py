@@ -0,0 +1,12 @@
+from typing import List
+
+# Classes in order of registration
+registered: List[type] = []
+
+
+def register_class(cls: type):
+    registered.append(cls)
+
+
+def unregister_class(cls: type):
+    registered.remove(cls)
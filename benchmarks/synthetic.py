@@ -0,0 +1,170 @@
+"""Generators of synthetic inputs for benchmarks: portable Blender archives
+and addon trees of a given size. Content is deterministic and compresses
+about 2x, like Blender releases.
+"""
+
+import os
+import shutil
+import random
+import hashlib
+import tarfile
+import zipfile
+from pathlib import Path
+from typing import Dict
+
+from fake_blender import make_fake_blender
+
+DIR_ADDON = Path(Path(__file__).resolve().parent, "..", "blender_install").resolve()
+
+# Name of the root folder in the archive, stripped by the installer
+ARCHIVE_ROOT = "blender-4.2.0-linux-x64"
+
+# Sizes of generated inputs in MB
+SIZES: Dict[str, int] = {"small": 8, "medium": 64, "large": 256}
+
+
+def fill_bytes(rng: random.Random, size: int) -> bytes:
+    """Half random, half repeated text, compresses about 2x."""
+    half = size // 2
+    text = b"# synthetic blender data\n" * (half // 25 + 1)
+    return rng.randbytes(size - half) + text[:half]
+
+
+def make_tree(folder: Path, size_mb: int, seed: int = 0) -> int:
+    """Fills folder with files of the total size: many small files and a few
+    large ones, like datafiles and libraries of Blender.
+
+    Returns:
+    --------
+    int
+        Number of files.
+    """
+    if size_mb <= 0:
+        return 0
+
+    rng = random.Random(seed)
+    left = size_mb * 1024 * 1024
+    # A quarter of the size is in 4 large files
+    large = left // 16
+    n = 0
+
+    for i in range(4):
+        d = Path(folder, "lib")
+        os.makedirs(d, exist_ok=True)
+        Path(d, f"lib_{i}.so").write_bytes(fill_bytes(rng, large))
+        left -= large
+        n += 1
+
+    while left > 0:
+        size = min(left, rng.randint(1024, 64 * 1024))
+        d = Path(folder, "datafiles", f"d{n // 200}")
+        os.makedirs(d, exist_ok=True)
+        Path(d, f"f{n}.dat").write_bytes(fill_bytes(rng, size))
+        left -= size
+        n += 1
+
+    return n
+
+
+def write_hashfile(archive: Path) -> Path:
+    """Writes <archive>.sha256 for shasum -c, path in it is absolute, so the
+    check doesn't depend on working directory."""
+    h = hashlib.sha256()
+
+    with open(archive, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+    hashfile = Path(f"{archive}.sha256")
+    hashfile.write_text(f"{h.hexdigest()}  {archive}\n")
+
+    return hashfile
+
+
+def make_portable_archive(root: Path, size_mb: int, fmt: str) -> Path:
+    """Creates archive of portable Blender with fake executable and hashfile.
+    tar.xz keeps the executable bit, so only it can be installed end to end,
+    zip is for extraction scenarios.
+
+    Parameters:
+    -----------
+    root : Path
+        Folder for the archive and its source tree.
+    size_mb : int
+        Size of the data in the archive before compression.
+    fmt : str
+        tar.xz or zip.
+
+    Returns:
+    --------
+    Path
+        Path of the archive.
+    """
+    tree = Path(root, f"src_{size_mb}", ARCHIVE_ROOT)
+
+    if not tree.is_dir():
+        make_fake_blender(tree)
+        make_tree(Path(tree, "4.2"), size_mb)
+
+    archive = Path(root, f"blender-{size_mb}mb.{fmt}")
+
+    if fmt == "tar.xz":
+        # Compression speed is not measured, low preset keeps generation short
+        with tarfile.open(str(archive), "w:xz", preset=1) as f:
+            f.add(str(tree), arcname=ARCHIVE_ROOT)
+    elif fmt == "zip":
+        with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED, compresslevel=1) as f:
+            # Installer expects the root folder first and folders before files
+            for d, dirs, files in os.walk(tree):
+                dirs.sort()
+                arc = Path(ARCHIVE_ROOT, Path(d).relative_to(tree)).as_posix()
+                # Folder names get the trailing slash from zipfile
+                f.write(d, arc)
+
+                for name in sorted(files):
+                    f.write(Path(d, name), f"{arc}/{name}")
+    else:
+        raise ValueError(f"Unsupported archive format: {fmt}")
+
+    write_hashfile(archive)
+
+    return archive
+
+
+def make_addon_tree(root: Path, modules: int, data_mb: int) -> Path:
+    """Copies the installer into a folder of its own and adds a generated
+    package and data files, so the copy installs a larger addon.
+
+    Parameters:
+    -----------
+    root : Path
+        Parent folder, installer resolves ../ paths of the config from it.
+    modules : int
+        Number of generated Python modules.
+    data_mb : int
+        Size of generated data files.
+
+    Returns:
+    --------
+    Path
+        Folder of the addon, install.py is run from it.
+    """
+    addon = Path(root, DIR_ADDON.name)
+    shutil.copytree(
+        DIR_ADDON,
+        addon,
+        ignore=shutil.ignore_patterns("__pycache__", ".*.snapshot.json", "*.zip"),
+    )
+
+    package = Path(addon, "synthetic")
+    os.makedirs(package)
+    Path(package, "__init__.py").write_text("")
+
+    for i in range(modules):
+        Path(package, f"module_{i}.py").write_text(
+            "".join(f"def func_{j}(x):\n    return x + {j}\n\n" for j in range(50))
+        )
+
+    make_tree(Path(addon, "synthetic_data"), data_mb, seed=1)
+
+    return addon
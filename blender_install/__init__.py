@@ -1,7 +1,7 @@
 import os
 import sys
 from bpy.utils import register_class, unregister_class
-from typing import Tuple, Any
+from typing import Tuple, Any, Optional
 
 # Register possibility to import files from addon space
 # Blender doesn't correctly import modules without it.
@@ -11,7 +11,47 @@ dir_cur = os.path.dirname(__file__)
 if dir_cur not in sys.path:
     sys.path.append(dir_cur)
 
-from example.example_operator import ExampleOperator
+
+def get_bundle() -> Optional[str]:
+    """Precompiled bundle of pip modules and submodules built by
+    install_bundle.py for this Python, its name and signatures of bundled
+    sources are in addon_bundle-py<version>.txt. None if sources were edited
+    since the bundle was built, its bytecode would shadow them."""
+    from install_platform import BUNDLE_MARKER, python_keyed
+
+    marker = os.path.join(dir_cur, python_keyed(BUNDLE_MARKER))
+
+    if not os.path.isfile(marker):
+        return None
+
+    with open(marker, "rt") as f:
+        name, *sources = f.read().splitlines()
+
+    for line in sources:
+        size, mtime_ns, rel = line.split(" ", 2)
+
+        try:
+            st = os.stat(os.path.join(dir_cur, rel))
+        except OSError:
+            st = None
+
+        if st is None or [st.st_size, st.st_mtime_ns] != [int(size), int(mtime_ns)]:
+            print(f"Addon source {rel} changed since {name} was built, not using it")
+            return None
+
+    bundle = os.path.join(dir_cur, name)
+
+    return bundle if os.path.isfile(bundle) else None
+
+
+# Bundle goes first, so imports are served from it and not from loose files
+# along the whole sys.path
+bundle = get_bundle()
+if bundle is not None and bundle not in sys.path:
+    sys.path.insert(0, bundle)
+
+from lazy_registry import get_classes
+from addon_registry import OPERATORS
 
 bl_info = {
     "name": "Blender Install",
@@ -33,14 +73,31 @@ addon_path = __path__
 addon_name = __name__
 
 
-addon_classes: Tuple[Any] = (ExampleOperator,)
+# Operators are registered as lightweight proxies, their modules are imported
+# on the first execute(). Set BLENDER_INSTALL_EAGER=1 to import everything at
+# startup, e.g. to compare startup cost with benchmarks/bench_addon_startup.py
+lazy_registration = os.environ.get("BLENDER_INSTALL_EAGER", "") in ("", "0")
+
+# Classes that have to be imported eagerly, e.g. panels and menus
+addon_classes: Tuple[Any, ...] = ()
+# Operators of the registry, filled in on register()
+operator_classes: Tuple[Any, ...] = ()
 
 
 def register():
-    for cls in addon_classes:
+    global operator_classes
+    operator_classes = get_classes(OPERATORS, lazy_registration)
+
+    for cls in addon_classes + operator_classes:
         register_class(cls)
 
+    # Development only: allow install.py --watch to reload the addon
+    if "BLENDER_INSTALL_RELOAD_PORT" in os.environ:
+        from install_reload import start_from_env
+
+        start_from_env()
+
 
 def unregister():
-    for cls in addon_classes:
+    for cls in reversed(addon_classes + operator_classes):
         unregister_class(cls)
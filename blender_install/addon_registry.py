@@ -0,0 +1,15 @@
+from lazy_registry import OperatorEntry
+
+# Operators of the addon, their modules are imported on the first execute(),
+# so Blender startup doesn't pay for them and their heavy dependencies.
+# Keep this module light: no imports of operator modules or pip libraries.
+# Set has_poll=True for operators defining poll, it's not delegated otherwise.
+OPERATORS = (
+    OperatorEntry(
+        bl_idname="bl_install.example_operator",
+        bl_label="Example Operator",
+        module="example.example_operator",
+        cls_name="ExampleOperator",
+        bl_description="Register script example",
+    ),
+)
@@ -1,14 +1,17 @@
 import os
+import json
 import shutil
+import hashlib
 from pathlib import Path
 from typing import Optional, List
 from install_proc_utils import run_process
 from install_platform import PLATFORM
+from install_trace import traced
 
 CHK_FMTS = {"md5", "sha1", "sha256", "sha384", "sha512"}
 
 
-def checksum_and_copy(fp: Path, target: Path):
+def checksum_and_copy(fp: Path, target: Path, cache_dir: Optional[Path] = None) -> bool:
     """
     Runs checksum on specified file and copies file to target dir if everything
     is fine.
@@ -19,6 +22,13 @@ def checksum_and_copy(fp: Path, target: Path):
         Path to file to run checksum for.
     target : Path
         Path to folder to copy checksummed file.
+    cache_dir : Optional[Path]
+        Folder with results of previous checks, see checksum_file.
+
+    Returns:
+    --------
+    bool
+        File is checksummed and copied.
     """
     print(f"Checking integrity of: {fp}")
     fp_checksum = [f"{str(fp)}.{i}" for i in CHK_FMTS]
@@ -26,14 +36,74 @@ def checksum_and_copy(fp: Path, target: Path):
     for i in fp_checksum:
         if os.path.exists(i):
             if os.path.isfile(i):
-                if checksum_file(Path(i)):
+                if checksum_file(Path(i), cache_dir):
                     print(f"Copied to: {shutil.copy2(fp, target)}")
-                    return
+                    return True
 
     print("File was not copied - no checksum file found")
+    return False
+
+
+def get_cache_entry(cache_dir: Path, fp: Path) -> Path:
+    """Returns cache file of verified file, it holds stat data of the file and
+    its hashfile, so changed files are checked again.
+
+    Returns:
+    --------
+    Path
+        Cache file, one per verified file, so concurrent installs don't share
+        files they write.
+    """
+    name = hashlib.sha256(str(fp.absolute()).encode("utf8")).hexdigest()
+    return Path(cache_dir, f"{name}.json")
+
+
+def get_signature(fp: Path, hash_file: Path) -> List[int]:
+    """Signature of verified file and its hashfile."""
+    st = os.stat(fp)
+    st_hash = os.stat(hash_file)
+
+    return [st.st_size, st.st_mtime_ns, st_hash.st_size, st_hash.st_mtime_ns]
+
+
+def is_verified(cache_dir: Path, fp: Path, hash_file: Path) -> bool:
+    """Checks that file was verified with the same hashfile and not changed."""
+    try:
+        with open(get_cache_entry(cache_dir, fp), "rt") as f:
+            entry = json.load(f)
+
+        return entry == {
+            "file": str(fp.absolute()),
+            "hash_file": str(hash_file.absolute()),
+            "signature": get_signature(fp, hash_file),
+        }
+    except (OSError, ValueError):
+        return False
+
+
+def store_verified(cache_dir: Path, fp: Path, hash_file: Path):
+    """Records successful check, failures to write are not fatal."""
+    entry = {
+        "file": str(fp.absolute()),
+        "hash_file": str(hash_file.absolute()),
+        "signature": get_signature(fp, hash_file),
+    }
+    path = get_cache_entry(cache_dir, fp)
+    tmp = Path(f"{path}.{os.getpid()}.tmp")
 
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
 
-def checksum_file(checksum_file: Path) -> bool:
+        with open(tmp, "wt") as f:
+            json.dump(entry, f)
+
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Could not cache checksum result: {e}")
+
+
+@traced("checksum")
+def checksum_file(checksum_file: Path, cache_dir: Optional[Path] = None) -> bool:
     """
     Uses os software to run checksum algorithm on file.
 
@@ -41,6 +111,9 @@ def checksum_file(checksum_file: Path) -> bool:
     -----------
     checksum_file : Path
         Path to file that has hashfile.
+    cache_dir : Optional[Path]
+        Folder with results of previous checks. If file and its hashfile are
+        not changed since the last successful check, checksum is not run.
 
     Returns:
     --------
@@ -136,6 +209,34 @@ def checksum_file(checksum_file: Path) -> bool:
     if PLATFORM in {"Linux", "Darwin"}:
         command.append(str(checksum_hash_file))
 
+    if cache_dir is None:
+        return run_checksum(checksum_file, command)
+
+    from install_lock import file_lock, lock_path
+
+    # The first install checks the file, concurrent ones wait for it and reuse
+    # its result instead of reading the archive again
+    with file_lock(lock_path(get_cache_entry(cache_dir, checksum_file))):
+        if is_verified(cache_dir, checksum_file, checksum_hash_file):
+            print(f"Checksum of {checksum_file.name} is cached, file is not changed")
+            return True
+
+        if not run_checksum(checksum_file, command):
+            return False
+
+        store_verified(cache_dir, checksum_file, checksum_hash_file)
+
+    return True
+
+
+def run_checksum(checksum_file: Path, command: Optional[List[str]]) -> bool:
+    """Runs checksum command in the folder of the file.
+
+    Returns:
+    --------
+    bool
+        Checksum is successful.
+    """
     if command is None:
         print(
             "Could not construct checksum command: "
@@ -145,15 +246,23 @@ def checksum_file(checksum_file: Path) -> bool:
 
     print(f"Checksum command: {command}")
 
-    ec, so, se, er = run_process(
-        command,
-        "Could not run checksum program on your OS, check that "
-        "certutil is available on Windows and md5sum/shasum is available on "
-        "Linux/Mac",
-        5,
-        wd=checksum_file.parent,
-        print_std=True,
-    )
+    from install_progress import Progress
+
+    # Checksum tool reports nothing while running, throughput is reported
+    # when the file is done
+    size = checksum_file.stat().st_size
+
+    with Progress(f"Checksum {checksum_file.name}", size, 1) as progress:
+        ec, so, se, er = run_process(
+            command,
+            "Could not run checksum program on your OS, check that "
+            "certutil is available on Windows and md5sum/shasum is available on "
+            "Linux/Mac",
+            5,
+            wd=checksum_file.parent,
+            print_std=True,
+        )
+        progress.update(size)
 
     if ec != 0:
         print(f"Checksum failed with code: {ec} for file: {checksum_file.name}")
@@ -1,17 +1,23 @@
+from __future__ import annotations
+
+import os
 import argparse
 import sys
-from pprint import pprint
 from pathlib import Path
-from typing import Optional
+from contextlib import nullcontext
+from typing import ContextManager, Optional, TYPE_CHECKING
 
-from install_utils import (
-    try_to_install,
-)
-from install_config import InstallConfig
-from install_platform import PLATFORM, EC
-from install_proc_utils import run_process
+from install_platform import PLATFORM, EC, BUNDLE_MARKER, python_keyed
+from install_trace import span, traced
+
+# Modules of the stages are imported by the stages, so --help and skipped
+# stages don't pay for them
+if TYPE_CHECKING:
+    from install_config import InstallConfig
+    from install_state import StageSelection
 
 
+@traced("addon install")
 def install_addon(cfg: InstallConfig):
     """
     Install plugin to specified folder.
@@ -30,9 +36,12 @@ def install_addon(cfg: InstallConfig):
 
     print(f"Syncing addon folder\nFr: {path_current}\nTo: {addon_path}")
 
+    from install_utils import try_to_install
+
     try_to_install(cfg)
 
 
+@traced("pip")
 def install_pip(cfg: InstallConfig) -> Optional[int]:
     """Install pip for instance of Blender3D.
 
@@ -50,20 +59,24 @@ def install_pip(cfg: InstallConfig) -> Optional[int]:
         print("No PIP install script provided, skipping")
         return 0
 
+    from install_profile import script_args
+
     cmd = [
         str(cfg.blender_path),
         "-b",
-        "-P",
-        str(cfg.install_pip_script),
+        *script_args(cfg.install_pip_script),
     ]
 
     if cfg.install_pip_timeout != 0:
-        cmd.extend(["--", "-t", cfg.install_pip_timeout])
+        cmd.extend(["--", "-t", str(cfg.install_pip_timeout)])
 
-    if cfg.pip_modules is not None:
+    # Bundled modules are installed by the bundle script
+    if cfg.pip_modules is not None and not cfg.pip_bundle:
         if len(cfg.pip_modules) > 0:
             cmd.extend(["-m", ",".join(m for m in cfg.pip_modules)])
 
+    from install_proc_utils import run_process
+
     print("Trying to install PIP")
     ec, so, se, er = run_process(
         cmd,
@@ -75,6 +88,63 @@ def install_pip(cfg: InstallConfig) -> Optional[int]:
     return ec
 
 
+@traced("bundle")
+def build_bundle(cfg: InstallConfig) -> Optional[int]:
+    """Bundles addon submodules and pure Python pip modules into precompiled zip
+    which is put on sys.path by the addon. Bytecode has to match Python of
+    Blender, so the bundle is built by Blender's Python and its name is keyed
+    by Python version.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Parsed and validated config object.
+
+    Returns:
+    --------
+    Optional[int]
+        Propagates run_process exit code.
+    """
+    if not cfg.pip_bundle:
+        # Bundles of previous runs must not be loaded by the addon anymore
+        for marker in cfg.current_folder.glob(python_keyed(BUNDLE_MARKER, "*")):
+            marker.unlink(missing_ok=True)
+
+        return 0
+
+    bundle = Path(cfg.current_folder, cfg.pip_bundle_name)
+    from install_profile import script_args
+
+    cmd = [
+        str(cfg.blender_path),
+        "-b",
+        *script_args(Path(cfg.current_folder, "install_bundle.py")),
+        "--",
+        "-s",
+        str(cfg.current_folder),
+        "-o",
+        str(bundle),
+        "-t",
+        str(cfg.install_pip_timeout),
+    ]
+
+    if len(cfg.pip_modules) > 0:
+        cmd.extend(["-m", ",".join(m for m in cfg.pip_modules)])
+
+    from install_proc_utils import run_process
+
+    print("Building import bundle")
+    ec, so, se, er = run_process(
+        cmd,
+        "Failed to build import bundle",
+        cfg.install_pip_timeout * (len(cfg.pip_modules) + 1),
+        print_std=False,
+    )
+
+    return ec
+
+
+@traced("activation")
 def activate_addons(cfg: InstallConfig) -> Optional[int]:
     """Setup Blender3D for rendering and also activate addons that are found in
     config.activate_addons list.
@@ -98,11 +168,12 @@ def activate_addons(cfg: InstallConfig) -> Optional[int]:
         print("No activation script provided, but activation is requested, aborting")
         return 0
 
+    from install_profile import script_args
+
     cmd = [
         str(cfg.blender_path),
         "-b",
-        "-P",
-        str(cfg.install_activate_script),
+        *script_args(cfg.install_activate_script),
     ]
 
     if any(
@@ -116,15 +187,65 @@ def activate_addons(cfg: InstallConfig) -> Optional[int]:
         if sc:
             cmd.append("-g")
 
+            if cfg.compute_device_cache:
+                cmd.extend(["-c", str(cfg.compute_device_cache_path)])
+
+            if cfg.cpu_tuning:
+                cmd.append("-t")
+
+                if cfg.cpu_tuning_save_startup:
+                    cmd.append("-s")
+
+            if cfg.cpu_numa_node >= 0:
+                cmd.extend(["-n", str(cfg.cpu_numa_node)])
+
         if ad:
             cmd.extend(["-a", ",".join(a for a in cfg.activate_addons)])
 
+            if cfg.activate_profile:
+                cmd.extend(["-p", str(cfg.activate_profile_report)])
+                cmd.extend(["-b", str(cfg.activate_budget)])
+
+                if len(cfg.activate_budgets) > 0:
+                    cmd.extend(
+                        [
+                            "--budgets",
+                            ",".join(
+                                f"{a}={b}" for a, b in cfg.activate_budgets.items()
+                            ),
+                        ]
+                    )
+
+    # Profiling needs the real activation in Blender. CPU tuning follows
+    # topology and free memory of the node and may write startup.blend, which
+    # the cache doesn't hold, so it always runs in Blender too
+    use_cache = cfg.activation_cache and not cfg.activate_profile and not cfg.cpu_tuning
+
+    if use_cache:
+        from install_activation_cache import (
+            get_activation_key,
+            restore_activation,
+            store_activation,
+        )
+
+        key = get_activation_key(cfg)
+
+        if restore_activation(cfg, key):
+            print("Restored cached activation result, Blender is not started")
+            return 0
+
+    from install_proc_utils import run_process
+
     print("Activating addons and components")
     ec, so, se, er = run_process(cmd, "Addon activation failed", 60, print_std=False)
 
+    if ec == 0 and use_cache:
+        store_activation(cfg, key)
+
     return ec
 
 
+@traced("custom script")
 def run_custom_script(cfg: InstallConfig) -> Optional[int]:
     """Run custom script which is needed to set up additional components for the addon.
     If no script is provided, this stage will be skipped.
@@ -143,17 +264,20 @@ def run_custom_script(cfg: InstallConfig) -> Optional[int]:
         print("Skipping custom script")
         return 0
 
+    from install_profile import script_args
+
     cmd = [
         str(cfg.blender_path),
         "-b",
-        "-P",
-        str(cfg.install_custom_script),
+        *script_args(cfg.install_custom_script),
     ]
 
     if len(cfg.install_custom_args) > 0:
         cmd.append("--")
         cmd.extend(cfg.install_custom_args)
 
+    from install_proc_utils import run_process
+
     print("Running custom script:")
     ec, so, se, er = run_process(
         cmd, "Custom script run failed", cfg.install_custom_timeout, print_std=False
@@ -162,6 +286,129 @@ def run_custom_script(cfg: InstallConfig) -> Optional[int]:
     return ec
 
 
+def install_addon_stage(cfg: InstallConfig) -> int:
+    print(f"Installing plugin for platform: {PLATFORM}")
+    install_addon(cfg)
+
+    return 0
+
+
+def activate_addons_stage(cfg: InstallConfig) -> Optional[int]:
+    print("Trying to activate addons")
+
+    return activate_addons(cfg)
+
+
+# Pip and bundle go first, so copied addon already contains the bundle
+STAGES = (
+    ("pip", install_pip, EC.PIP_NOT_INSTALLED),
+    ("bundle", build_bundle, EC.PIP_MODULES_NOT_INSTALLED),
+    ("addon", install_addon_stage, EC.INSTALLATION_FAILED),
+    ("activation", activate_addons_stage, EC.ADDON_ACTIVATION_FAILED),
+    ("custom", run_custom_script, EC.CUSTOM_SCRIPT_FAILED),
+)
+
+
+def stage_lock(cfg: InstallConfig, stage: str) -> ContextManager:
+    """Lock of the folder the stage writes or runs Blender with: pip writes
+    into Blender (same lock as unpacking), addon stage replaces the addon,
+    activation and custom script share it, so concurrent installs never load
+    half copied addon. Bundles of all Python versions share one lock, they are
+    written to the same folder."""
+    from install_lock import file_lock, lock_path
+
+    if stage == "pip":
+        return file_lock(lock_path(cfg.blender_path.parent))
+    elif stage == "bundle":
+        return file_lock(lock_path(Path(cfg.current_folder, cfg.pip_bundle_name)))
+    elif stage == "addon":
+        return file_lock(lock_path(cfg.addon_path))
+    elif stage in ("activation", "custom"):
+        return file_lock(lock_path(cfg.addon_path), shared=True)
+
+    return nullcontext()
+
+
+def run_install(cfg: InstallConfig, selection: Optional[StageSelection] = None) -> int:
+    """Runs installation stages for one Blender instance, stages which are up to
+    date according to the state database are skipped.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Parsed and validated config object.
+    selection : Optional[StageSelection]
+        Stages selected by --only, --skip and --force.
+
+    Returns:
+    --------
+    int
+        Exit code of the first failed stage, 0 on success.
+    """
+    import time
+    from install_state import InstallState
+
+    if PLATFORM not in ("Linux", "Darwin", "Windows"):
+        print(f"Installation on this OS({PLATFORM}) is not supported.")
+        print("Please install addon manually...")
+        return EC.PLATFORM_NOT_SUPPORTED.value
+
+    # Wheels downloaded by pip of any target are reused by others
+    if cfg.pip_cache_path is not None:
+        os.environ["PIP_CACHE_DIR"] = str(cfg.pip_cache_path)
+
+    state = InstallState(cfg, selection)
+
+    try:
+        for stage, func, default_ec in STAGES:
+            # Concurrent installs of the same target wait for the stage and
+            # find it up to date afterwards
+            with stage_lock(cfg, stage):
+                run, reason = state.check(stage)
+                print(f"Stage {stage}: {reason}")
+
+                if not run:
+                    continue
+
+                t0 = time.perf_counter()
+
+                try:
+                    ec = func(cfg)
+                except SystemExit as e:
+                    # Fatal errors are results too, the stage reruns next time
+                    ec = e.code if isinstance(e.code, int) else default_ec.value
+                    state.record(stage, ec, time.perf_counter() - t0)
+                    raise
+
+                ec = ec if ec is not None else default_ec.value
+                state.record(stage, ec, time.perf_counter() - t0)
+
+                if ec != 0:
+                    return ec
+
+    except SystemExit as e:
+        # Stages exit on fatal errors, the other targets must keep going
+        return e.code if isinstance(e.code, int) else EC.INSTALLATION_FAILED.value
+
+    finally:
+        from install_proc_utils import report_usage
+
+        report_usage()
+        state.close()
+
+    return 0
+
+
+def stages_arg(value: str) -> set:
+    """Argparse type of --only, --skip and --force."""
+    from install_state import parse_stages
+
+    try:
+        return parse_stages(value)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description="Automated installer for Blender3D",
@@ -177,34 +424,164 @@ if __name__ == "__main__":
         required=True,
     )
 
-    args = parser.parse_args()
+    parser.add_argument(
+        "-w",
+        "--watch",
+        action="store_true",
+        help="After installation keep syncing changed addon files and reload "
+        "them in running Blender",
+    )
 
-    cfg = (
-        InstallConfig(Path(args.config).resolve(True))
-        if "config" in args
-        else sys.exit(EC.CONFIG_NOT_PROVIDED.value)
+    parser.add_argument(
+        "--fleet",
+        nargs="?",
+        const="",
+        metavar="NODES_FILE",
+        help="Prepare installation once and push it to node root folders listed "
+        "in the file (one per line) or in fleet_nodes of the config",
     )
 
-    print("Validated config:")
-    pprint(vars(cfg))
+    parser.add_argument(
+        "--revalidate",
+        action="store_true",
+        help="Ignore validated config snapshot and validate config again",
+    )
 
-    if PLATFORM in ("Linux", "Darwin", "Windows"):
-        print(f"Installing plugin for platform: {PLATFORM}")
-        install_addon(cfg)
+    parser.add_argument(
+        "--progress",
+        choices=("auto", "tty", "json", "off"),
+        help="Report progress of extraction, checksum and copying: single "
+        "updated line (tty), JSON lines for log parsers (json), auto - tty on "
+        "terminal. Defaults to BLENDER_INSTALL_PROGRESS or auto",
+    )
 
-        print("Trying to activate addons")
-        if (ec := install_pip(cfg)) != 0:
-            sys.exit(ec)
+    parser.add_argument(
+        "--profile",
+        nargs="?",
+        type=Path,
+        const=Path(Path(__file__).resolve().parent, "..", "reports", "profile"),
+        metavar="PROFILE_DIR",
+        help="Run under cProfile, Blender scripts (custom ones too) profile "
+        "themselves, .pstats of all processes are merged in the folder and "
+        "functions with the largest own time are printed",
+    )
 
-        if (ec := activate_addons(cfg)) != 0:
-            sys.exit(ec)
+    parser.add_argument(
+        "--profile-top",
+        type=int,
+        default=25,
+        help="Number of functions printed by --profile",
+    )
 
-        if (ec := run_custom_script(cfg)) != 0:
-            sys.exit(ec)
+    parser.add_argument(
+        "--only",
+        type=stages_arg,
+        default=set(),
+        metavar="STAGES",
+        help="Run only these stages, comma separated: pip, bundle, addon, "
+        "activation, custom or all",
+    )
 
-    else:
-        print(f"Installation on this OS({PLATFORM}) is not supported.")
-        print("Please install addon manually...")
-        sys.exit(EC.PLATFORM_NOT_SUPPORTED.value)
+    parser.add_argument(
+        "--skip",
+        type=stages_arg,
+        default=set(),
+        metavar="STAGES",
+        help="Do not run these stages",
+    )
+
+    parser.add_argument(
+        "--force",
+        type=stages_arg,
+        default=set(),
+        metavar="STAGES",
+        help="Run these stages and stages depending on them even if the state "
+        "database says they are up to date",
+    )
+
+    parser.add_argument(
+        "--trace",
+        nargs="?",
+        type=Path,
+        const=Path(Path(__file__).resolve().parent, "..", "reports", "trace.json"),
+        metavar="TRACE_FILE",
+        help="Record time of the stages and child processes, including spans "
+        "inside Blender scripts, write Chrome trace JSON (chrome://tracing, "
+        "ui.perfetto.dev) and print summary",
+    )
+
+    args = parser.parse_args()
+
+    if "config" not in args:
+        sys.exit(EC.CONFIG_NOT_PROVIDED.value)
+
+    if args.progress is not None:
+        from install_progress import configure
+
+        configure(args.progress)
+
+    if args.profile is not None:
+        import atexit
+        import install_profile
+
+        profile_dir = args.profile.resolve()
+        profiler = install_profile.enable(profile_dir)
+        atexit.register(install_profile.finish, profiler, profile_dir, args.profile_top)
+
+    if args.trace is not None:
+        import atexit
+        import install_trace
+
+        trace_file = args.trace.resolve()
+        install_trace.enable(trace_file.with_suffix(".children.jsonl"))
+        # Written on every exit path, failed runs are the interesting ones
+        atexit.register(install_trace.write_trace, trace_file)
+
+    from install_config import InstallConfig, get_targets
+    from install_state import StageSelection
+
+    selection = StageSelection(args.only, args.skip, args.force)
+    cfg_file = Path(args.config).resolve(True)
+
+    if len(targets := get_targets(cfg_file)) > 0:
+        if args.watch:
+            print("Watch mode is not supported with multiple targets")
+            sys.exit(EC.CONFIG_NOT_PROVIDED.value)
+
+        if args.fleet is not None:
+            print("Fleet mode is not supported with multiple targets")
+            sys.exit(EC.CONFIG_NOT_PROVIDED.value)
+
+        from install_targets import run_targets
+
+        sys.exit(run_targets(cfg_file, targets, not args.revalidate, selection))
+
+    try:
+        with span("config validation"):
+            cfg = InstallConfig(cfg_file, not args.revalidate)
+    except Exception as e:
+        # Blender could not be unpacked or config is wrong
+        print(f"Config validation failed: {e}")
+        sys.exit(EC.INSTALLATION_FAILED.value)
+
+    # pprint pulls in dataclasses and inspect, plain lines are enough here
+    print("Validated config:")
+
+    for key, value in vars(cfg).items():
+        print(f"    {key}: {value!r}")
+
+    if args.fleet is not None:
+        from install_fleet import load_nodes, run_fleet
+
+        nodes = load_nodes(cfg, Path(args.fleet) if args.fleet else None)
+        sys.exit(run_fleet(cfg, nodes))
+
+    if (ec := run_install(cfg, selection)) != 0:
+        sys.exit(ec)
 
     print("Installation finished")
+
+    if args.watch:
+        from install_watch import watch_addon
+
+        watch_addon(cfg)
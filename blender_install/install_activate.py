@@ -1,9 +1,11 @@
 import os
 import sys
 import bpy
+import json
+import time
 import argparse
 import addon_utils
-from typing import List
+from typing import Any, Dict, List, Optional
 
 # Make it possible to import modules
 dircur = os.path.dirname(__file__)
@@ -11,23 +13,205 @@ if dircur not in sys.path:
     sys.path.append(os.path.dirname(__file__))
 
 from install_proc_utils import run_process
+from install_platform import EC
+from install_trace import span, traced
+from install_hardware import (
+    hardware_fingerprint,
+    get_cpu_topology,
+    cpu_render_settings,
+)
 
 python_dir = "python{}.{}".format(sys.version_info.major, sys.version_info.minor)
 
 
-def activate_addons(addons: List[str]):
+class ImportProfiler:
+    """Meta path finder that measures execution time of every module imported
+    while it's installed, similar to -X importtime: cumulative time includes
+    nested imports, self time doesn't. Only loaders that are instances are
+    wrapped, builtin and frozen modules are negligible."""
+
+    def __init__(self):
+        self.records: List[Dict[str, Any]] = []
+        self.stack: List[float] = []
+        self.finding = False
+
+    def find_spec(self, fullname, path, target=None):
+        # Delegate to the rest of finders, only the loader is instrumented
+        if self.finding:
+            return None
+
+        self.finding = True
+
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+
+                spec = finder.find_spec(fullname, path, target)
+
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self.finding = False
+
+        loader = spec.loader
+
+        if loader is not None and not isinstance(loader, type):
+            exec_module = getattr(loader, "exec_module", None)
+
+            if exec_module is not None and not hasattr(exec_module, "_profiled"):
+                loader.exec_module = self.wrap(fullname, exec_module)
+
+        return spec
+
+    def wrap(self, fullname: str, exec_module):
+        def timed_exec_module(module):
+            depth = len(self.stack)
+            self.stack.append(0.0)
+            t0 = time.perf_counter()
+
+            try:
+                exec_module(module)
+            finally:
+                cumulative = time.perf_counter() - t0
+                nested = self.stack.pop()
+
+                if self.stack:
+                    self.stack[-1] += cumulative
+
+                self.records.append(
+                    {
+                        "module": fullname,
+                        "self": cumulative - nested,
+                        "cumulative": cumulative,
+                        "depth": depth,
+                    }
+                )
+
+        timed_exec_module._profiled = True
+        return timed_exec_module
+
+    def __enter__(self):
+        sys.meta_path.insert(0, self)
+        return self
+
+    def __exit__(self, *exc):
+        sys.meta_path.remove(self)
+
+
+def activate_addons(
+    addons: List[str],
+    profile: Optional[str] = None,
+    budget: float = 0.0,
+    budgets: Optional[Dict[str, float]] = None,
+) -> bool:
     """Tries to activate all selected addons and saves user configuration.
+    Optionally profiles activation of every addon and checks startup budgets.
 
     Parameters:
     -----------
     addons : List[str]
         Names of addons.
+    profile : Optional[str]
+        Path of JSON report, profiling is off if not provided.
+    budget : float
+        Startup budget of every addon in seconds, 0 - no budget.
+    budgets : Optional[Dict[str, float]]
+        Budgets of specific addons, override budget.
+
+    Returns:
+    --------
+    bool
+        All addons fit into their budgets.
     """
-    for a in addons:
-        try_activate(a, True)
+    if profile is None:
+        for a in addons:
+            try_activate(a, True)
+
+        bpy.ops.wm.save_userpref()
+        return True
 
+    report = [profile_activate(a) for a in addons]
     bpy.ops.wm.save_userpref()
 
+    return report_profile(report, profile, budget, budgets or {})
+
+
+def profile_activate(addon: str) -> Dict[str, Any]:
+    """Activates addon and splits the time into module imports and register().
+
+    Parameters:
+    -----------
+    addon : str
+        Name of the addon.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Timings of the addon.
+    """
+    with ImportProfiler() as prof:
+        t0 = time.perf_counter()
+        try_activate(addon, True)
+        total = time.perf_counter() - t0
+
+    imports = sum(r["cumulative"] for r in prof.records if r["depth"] == 0)
+
+    return {
+        "addon": addon,
+        "total": total,
+        "import": imports,
+        # addon_utils.enable only imports the module and calls register()
+        "register": max(total - imports, 0.0),
+        "imports": sorted(prof.records, key=lambda r: r["self"], reverse=True),
+    }
+
+
+def report_profile(
+    report: List[Dict[str, Any]],
+    path: str,
+    budget: float,
+    budgets: Dict[str, float],
+) -> bool:
+    """Writes JSON report and prints summary sorted by activation time.
+
+    Returns:
+    --------
+    bool
+        All addons fit into their budgets.
+    """
+    fits = True
+
+    for r in report:
+        r["budget"] = budgets.get(r["addon"], budget)
+        r["over_budget"] = r["budget"] > 0 and r["total"] > r["budget"]
+        fits = fits and not r["over_budget"]
+
+    report.sort(key=lambda r: r["total"], reverse=True)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    with open(path, "wt") as f:
+        json.dump({"blender": bpy.app.version_string, "addons": report}, f, indent=1)
+
+    print("Addon startup profile (seconds):")
+    print(f"{'total':>8} {'import':>8} {'register':>8}  addon / slowest imports")
+
+    for r in report:
+        mark = "  OVER BUDGET" if r["over_budget"] else ""
+        print(
+            f"{r['total']:8.3f} {r['import']:8.3f} {r['register']:8.3f}  "
+            f"{r['addon']}{mark}"
+        )
+
+        for imp in r["imports"][:5]:
+            print(f"{'':27}  {imp['self']:8.3f} {imp['module']}")
+
+    print(f"Profile report: {path}")
+
+    return fits
+
 
 def try_activate(addon: str, activate: bool):
     """Activates or deactivates addon. Prints message in case of failure.
@@ -40,19 +224,20 @@ def try_activate(addon: str, activate: bool):
         Activate addon.
     """
     try:
-        if activate:
-            addon_utils.enable(
-                addon,
-                default_set=activate,
-                persistent=True,
-                handle_error=None,
-            )
-        else:
-            addon_utils.disable(
-                addon,
-                default_set=activate,
-                handle_error=None,
-            )
+        with span(f"{'activate' if activate else 'deactivate'} {addon}", "blender"):
+            if activate:
+                addon_utils.enable(
+                    addon,
+                    default_set=activate,
+                    persistent=True,
+                    handle_error=None,
+                )
+            else:
+                addon_utils.disable(
+                    addon,
+                    default_set=activate,
+                    handle_error=None,
+                )
 
     except Exception as e:
         if activate:
@@ -61,14 +246,90 @@ def try_activate(addon: str, activate: bool):
             print(f"Could not deactivate: {addon}: {e}")
 
 
-def setup_compute_devices():
+@traced("compute devices", "blender")
+def setup_compute_devices(
+    cache_path: Optional[str] = None,
+    cpu_tuning: bool = False,
+    numa_node: Optional[int] = None,
+    save_startup: bool = False,
+):
     """
     If system has compatible GPU, setup this GPU support.
     Selects the most performant option out of the list.
+    Probing of every backend is slow, so if cache_path is provided, result is
+    stored there keyed by hardware fingerprint and nodes with unchanged
+    hardware, drivers and Blender apply the saved backend directly.
+
+    Parameters:
+    -----------
+    cache_path : Optional[str]
+        JSON file with enumeration results.
+    cpu_tuning : bool
+        Tune Cycles for the CPU if no GPU is available.
+    numa_node : Optional[int]
+        NUMA node to tune for.
+    save_startup : bool
+        Save tuned settings to the startup file.
     """
     # Update devices first, sometimes the list is incorrect/ empty
     context = bpy.context
     cycles_pref = context.preferences.addons["cycles"].preferences
+    fingerprint = None
+    cache: Dict[str, Any] = {}
+
+    if cache_path is not None:
+        fingerprint = hardware_fingerprint(bpy.app.version_string)
+        cache = load_device_cache(cache_path)
+        entry = cache.get(fingerprint)
+
+        if entry is not None:
+            print("Compute devices are known for this hardware, probing skipped:")
+            print(entry["dev_info"])
+            apply_compute_backend(
+                cycles_pref, entry["backend"], cpu_tuning, numa_node, save_startup
+            )
+            return
+
+    dev_info = probe_compute_devices(context, cycles_pref)
+    dev_priority = pick_compute_backend(dev_info)
+
+    if fingerprint is not None:
+        cache[fingerprint] = {"dev_info": dev_info, "backend": dev_priority}
+        save_device_cache(cache_path, cache)
+
+    apply_compute_backend(
+        cycles_pref, dev_priority, cpu_tuning, numa_node, save_startup
+    )
+
+
+def load_device_cache(cache_path: str) -> Dict[str, Any]:
+    """Loads enumeration results, empty dict if cache is missing or damaged."""
+    try:
+        with open(cache_path, "rt") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_device_cache(cache_path: str, cache: Dict[str, Any]):
+    """Atomically writes enumeration results."""
+    os.makedirs(os.path.dirname(os.path.abspath(cache_path)), exist_ok=True)
+    tmp = f"{cache_path}.tmp"
+
+    with open(tmp, "wt") as f:
+        json.dump(cache, f, indent=1, sort_keys=True)
+
+    os.replace(tmp, cache_path)
+
+
+def probe_compute_devices(context, cycles_pref) -> Dict[str, int]:
+    """Switches Cycles to every backend and counts its devices.
+
+    Returns:
+    --------
+    Dict[str, int]
+        Backend -> number of devices.
+    """
     # Blender detects devices itself, it's needed to pick the most
     # performant option out of all, just calculate number of devices
     dev_info = {}
@@ -84,6 +345,18 @@ def setup_compute_devices():
 
     print("Detected compute devices:")
     print(dev_info)
+
+    return dev_info
+
+
+def pick_compute_backend(dev_info: Dict[str, int]) -> Optional[str]:
+    """Picks the most performant backend.
+
+    Returns:
+    --------
+    Optional[str]
+        Backend, "NONE" if only CPU is available, None if nothing is found.
+    """
     no_devices_found = True
 
     for k, v in dev_info.items():
@@ -92,8 +365,7 @@ def setup_compute_devices():
             break
 
     if no_devices_found:
-        print("No GPUs found, skipping further setup")
-        return
+        return None
 
     # In case CUDA devices selected and OptiX is available
     # prefer OptiX, other devices are automatially set to
@@ -115,12 +387,49 @@ def setup_compute_devices():
     elif dev_priority == "CPU":
         dev_priority = "NONE"
 
+    return dev_priority
+
+
+def apply_compute_backend(
+    cycles_pref,
+    dev_priority: Optional[str],
+    cpu_tuning: bool = False,
+    numa_node: Optional[int] = None,
+    save_startup: bool = False,
+):
+    """Activates all devices of the backend and saves user preferences.
+
+    Parameters:
+    -----------
+    cycles_pref : CyclesPreferences
+        Preferences of Cycles addon.
+    dev_priority : Optional[str]
+        Result of pick_compute_backend.
+    cpu_tuning : bool
+        Tune Cycles for the CPU if no GPU is available.
+    numa_node : Optional[int]
+        NUMA node to tune for.
+    save_startup : bool
+        Save tuned settings to the startup file.
+    """
+    if dev_priority is None:
+        print("No GPUs found, skipping further setup")
+
+        if cpu_tuning:
+            tune_cpu_rendering(numa_node, save_startup)
+
+        return
+
     # Don't change anything if device is already set
     print(f"Setting compute device: {dev_priority}")
     # Don't set up anything if only CPU is available
     # Blender picks CPU as default device anyway
     if dev_priority == "NONE":
         print("Only CPU is available, no compute devices will be configured")
+
+        if cpu_tuning:
+            tune_cpu_rendering(numa_node, save_startup)
+
         bpy.ops.wm.save_userpref()
         return
 
@@ -144,6 +453,57 @@ def setup_compute_devices():
     bpy.ops.wm.save_userpref()
 
 
+def tune_cpu_rendering(
+    numa_node: Optional[int] = None, save_startup: bool = False
+) -> Dict[str, Any]:
+    """Sets render threads, tile size and persistent data of Cycles to match
+    cores and memory of the node. These are scene settings, they apply to new
+    files only if saved to the startup file. If NUMA node is provided, settings
+    match the node and renders should be launched with the printed numactl
+    prefix, Blender itself is not pinned.
+
+    Parameters:
+    -----------
+    numa_node : Optional[int]
+        NUMA node to tune for.
+    save_startup : bool
+        Save settings to the startup file, it replaces startup file of the user.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Applied settings.
+    """
+    topology = get_cpu_topology()
+    settings = cpu_render_settings(topology, numa_node)
+
+    print(
+        f"CPU: {topology['cores']} cores, {topology['logical']} threads, "
+        f"SMT: {topology['smt']}, NUMA nodes: {len(topology['numa'])}, "
+        f"available memory: {topology['mem_available'] / 1024 ** 3:.1f} GB"
+    )
+
+    if settings["cpus"]:
+        print(f"Tuned for NUMA node {numa_node}, launch renders with:")
+        print(f"numactl --cpunodebind={numa_node} --membind={numa_node}")
+
+    for scene in bpy.data.scenes:
+        scene.render.threads_mode = "FIXED"
+        scene.render.threads = settings["threads"]
+        scene.render.use_persistent_data = settings["use_persistent_data"]
+        scene.cycles.device = "CPU"
+        scene.cycles.use_auto_tile = True
+        scene.cycles.tile_size = settings["tile_size"]
+
+    print(f"Cycles CPU settings: {settings}")
+
+    if save_startup:
+        print("Saving Cycles CPU settings to the startup file")
+        bpy.ops.wm.save_homefile()
+
+    return settings
+
+
 if __name__ == "__main__":
     argv = sys.argv
 
@@ -163,18 +523,66 @@ if __name__ == "__main__":
         action="store_true",
         help="Configure graphics/compute devices",
     )
+    parser.add_argument(
+        "-c",
+        "--device-cache",
+        type=str,
+        help="Cache of compute device enumeration keyed by hardware fingerprint",
+    )
+    parser.add_argument(
+        "-t",
+        "--cpu-tuning",
+        action="store_true",
+        help="Tune Cycles for CPU-only nodes",
+    )
+    parser.add_argument(
+        "-s",
+        "--save-startup",
+        action="store_true",
+        help="Save Cycles CPU settings to the startup file",
+    )
+    parser.add_argument(
+        "-n",
+        "--numa-node",
+        type=int,
+        help="NUMA node to tune Cycles for",
+    )
     parser.add_argument(
         "-a",
         "--addons",
         type=str,
         help="Comma-separated list of addons to activate",
     )
+    parser.add_argument(
+        "-p",
+        "--profile",
+        type=str,
+        help="Profile activation of every addon and write JSON report to the path",
+    )
+    parser.add_argument(
+        "-b",
+        "--budget",
+        type=float,
+        default=0.0,
+        help="Startup budget of every addon in seconds, fails if exceeded",
+    )
+    parser.add_argument(
+        "--budgets",
+        type=str,
+        default="",
+        help="Comma-separated budgets of specific addons: name=seconds",
+    )
 
     args = parser.parse_args(argv)
 
     if "graphics" in args:
         if args.graphics:
-            setup_compute_devices()
+            setup_compute_devices(
+                args.device_cache,
+                args.cpu_tuning,
+                args.numa_node,
+                args.save_startup,
+            )
 
     addons: List[str] = []
     # Extract comma-separated addon names
@@ -182,7 +590,16 @@ if __name__ == "__main__":
         addons = args.addons.split(",")
         addons = [a.strip() for a in addons]
 
+    budgets: Dict[str, float] = {}
+    # Extract comma-separated addon=seconds pairs
+    for b in args.budgets.split(","):
+        if "=" in b:
+            name, sec = b.split("=", 1)
+            budgets[name.strip()] = float(sec)
+
     if len(addons) > 0:
-        activate_addons(addons)
+        if not activate_addons(addons, args.profile, args.budget, budgets):
+            print("Some addons exceeded their startup budget")
+            sys.exit(EC.ADDON_STARTUP_BUDGET_EXCEEDED.value)
 
     print("Finished addon configuration")
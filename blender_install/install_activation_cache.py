@@ -0,0 +1,210 @@
+import os
+import ast
+import json
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Optional
+from install_config import InstallConfig
+from install_hardware import hardware_fingerprint
+
+USERPREF_NAME = "userpref.blend"
+META_NAME = "meta.json"
+
+
+def hash_file(path: Path) -> str:
+    """Computes sha256 of file content."""
+    h = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def read_bl_info_version(init_file: Path) -> Optional[str]:
+    """Reads bl_info["version"] of the addon without importing it.
+
+    Parameters:
+    -----------
+    init_file : Path
+        __init__.py of the addon package or single file addon.
+
+    Returns:
+    --------
+    Optional[str]
+        Version, e.g. "0.1.0", None if bl_info is not found.
+    """
+    try:
+        tree = ast.parse(init_file.read_bytes())
+    except (OSError, SyntaxError, ValueError):
+        return None
+
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+            isinstance(t, ast.Name) and t.id == "bl_info" for t in node.targets
+        ):
+            try:
+                bl_info = ast.literal_eval(node.value)
+                return ".".join(str(v) for v in bl_info.get("version", ()))
+            except (ValueError, AttributeError):
+                return None
+
+    return None
+
+
+def get_addon_version(cfg: InstallConfig, addon: str) -> str:
+    """Finds version of the addon in the addons folder, addons bundled with
+    Blender are covered by Blender version.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Object with parsed and verified configuration.
+    addon : str
+        Name of the addon.
+
+    Returns:
+    --------
+    str
+        Version of the addon or "bundled" if it's not found.
+    """
+    if addon == cfg.addon_name:
+        candidates = [Path(cfg.current_folder, "__init__.py")]
+    else:
+        addons_dir = cfg.addon_path.parent
+        candidates = [
+            Path(addons_dir, addon, "__init__.py"),
+            Path(addons_dir, f"{addon}.py"),
+        ]
+
+    for c in candidates:
+        if c.is_file():
+            return read_bl_info_version(c) or "unknown"
+
+    return "bundled"
+
+
+def get_activation_key(cfg: InstallConfig) -> str:
+    """Builds key of activation result. userpref.blend produced by
+    install_activate.py is determined by these inputs only, compute devices
+    also depend on hardware.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Object with parsed and verified configuration.
+
+    Returns:
+    --------
+    str
+        Hex digest of the inputs.
+    """
+    addons = sorted(cfg.activate_addons)
+    inputs: Dict[str, Any] = {
+        "blender_version": cfg.blender_version,
+        "activate_addons": addons,
+        "addon_versions": {a: get_addon_version(cfg, a) for a in addons},
+        "setup_compute_devices": cfg.setup_compute_devices,
+    }
+
+    # Saved compute devices are only valid for the same hardware
+    if cfg.setup_compute_devices:
+        inputs["hardware"] = hardware_fingerprint(cfg.blender_version)
+
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True).encode("utf8")).hexdigest()
+
+
+def restore_activation(cfg: InstallConfig, key: str) -> bool:
+    """Restores cached userpref.blend, so Blender doesn't need to be started.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Object with parsed and verified configuration.
+    key : str
+        Result of get_activation_key.
+
+    Returns:
+    --------
+    bool
+        Preferences are restored and verified.
+    """
+    entry = Path(cfg.activation_cache_path, key)
+
+    try:
+        with open(Path(entry, META_NAME), "rt") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    target = Path(cfg.blender_config_path, USERPREF_NAME)
+    tmp = Path(f"{target}.tmp")
+
+    # Entry without userpref.blend or meta of older layout is a cache miss,
+    # addons are activated in Blender then
+    try:
+        os.makedirs(target.parent, exist_ok=True)
+        shutil.copy2(Path(entry, USERPREF_NAME), tmp)
+
+        # Size check is free, hash of the few hundred KB file is cheap enough
+        if tmp.stat().st_size != meta["size"] or hash_file(tmp) != meta["sha256"]:
+            print("Cached userpref.blend is damaged, activating addons in Blender")
+            os.unlink(tmp)
+            return False
+
+        os.replace(tmp, target)
+    except (OSError, KeyError, TypeError) as e:
+        print(f"Cached activation is not usable, activating addons in Blender: {e}")
+
+        if tmp.exists():
+            os.unlink(tmp)
+
+        return False
+
+    return True
+
+
+def store_activation(cfg: InstallConfig, key: str):
+    """Captures userpref.blend saved by install_activate.py.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Object with parsed and verified configuration.
+    key : str
+        Result of get_activation_key.
+    """
+    source = Path(cfg.blender_config_path, USERPREF_NAME)
+
+    if not source.is_file():
+        print(f"No {USERPREF_NAME} found in {source.parent}, nothing to cache")
+        return
+
+    entry = Path(cfg.activation_cache_path, key)
+    tmp = Path(f"{entry}.tmp")
+
+    if tmp.exists():
+        shutil.rmtree(tmp, True)
+
+    os.makedirs(tmp)
+    shutil.copy2(source, Path(tmp, USERPREF_NAME))
+
+    with open(Path(tmp, META_NAME), "wt") as f:
+        json.dump(
+            {
+                "size": Path(tmp, USERPREF_NAME).stat().st_size,
+                "sha256": hash_file(Path(tmp, USERPREF_NAME)),
+                "blender_version": cfg.blender_version,
+                "activate_addons": sorted(cfg.activate_addons),
+            },
+            f,
+            indent=1,
+        )
+
+    if entry.exists():
+        shutil.rmtree(entry, True)
+
+    os.replace(tmp, entry)
+    print(f"Activation result cached: {entry}")
@@ -0,0 +1,261 @@
+import os
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+from install_platform import PLATFORM
+
+MANIFEST_VERSION = 1
+MANIFEST_NAME = ".binaries_manifest.json"
+
+# Linux uses either no extension or AppImage or other ways to publish apps
+# Mac uses app format
+# Windows has exe and dlls
+# Sets can be extended in the future
+# Precompiled binary Python modules are pyd
+BIN_EXT: Dict[str, Set[str]] = {
+    "Linux": {"so", "d", "AppImage"},
+    "Darwin": {"app", "dylib", "so"},
+    "Windows": {"exe", "dll"},
+    "All": {
+        "pyd",
+    },
+}
+# Bundles that are copied as a whole, their content is not scanned
+BIN_DIR_EXT = {"app"}
+ELF_MAGIC = b"\x7fELF"
+
+
+def is_binary_file(path: str, name: str, executable: bool) -> bool:
+    """Decides whether file is a binary for current platform. Files without
+    extension are only accepted on Linux if they are executable ELF files,
+    so READMEs, LICENSEs and checksum leftovers are not copied.
+
+    Parameters:
+    -----------
+    path : str
+        Full path of the file.
+    name : str
+        Name of the file.
+    executable : bool
+        File has executable bit set.
+
+    Returns:
+    --------
+    bool
+        File should be copied.
+    """
+    from checksum_file import CHK_FMTS
+
+    suffixes = Path(name).suffixes
+    exts = [s[1::] for s in suffixes]
+    bin_ext = BIN_EXT.get(PLATFORM, set()) | BIN_EXT["All"]
+
+    # Hashfiles of binaries, e.g. libfoo.so.sha256, are checksum sidecars
+    if len(exts) > 0 and exts[-1] in CHK_FMTS:
+        return False
+
+    if len(exts) > 0 and exts[-1] in bin_ext:
+        return True
+
+    # Versioned shared libraries, e.g. libfoo.so.1.2: library extension
+    # followed by numeric parts only
+    for i, ext in enumerate(exts):
+        if ext in bin_ext & {"so", "dylib"} and all(e.isdigit() for e in exts[i + 1 :]):
+            return True
+
+    if PLATFORM == "Linux" and (not suffixes or executable):
+        try:
+            with open(path, "rb") as f:
+                return f.read(4) == ELF_MAGIC
+        except OSError:
+            return False
+
+    return False
+
+
+def classify_dir(path: str) -> Tuple[Dict[str, str], List[str]]:
+    """Lists directory once and classifies its entries.
+
+    Parameters:
+    -----------
+    path : str
+        Directory to classify.
+
+    Returns:
+    --------
+    Dict[str, str]
+        Name -> kind ("file" or "dir") of candidate binaries.
+    List[str]
+        Names of subdirectories to scan.
+    """
+    entries: Dict[str, str] = {}
+    subdirs: List[str] = []
+
+    with os.scandir(path) as it:
+        for e in it:
+            if e.is_dir():
+                if Path(e.name).suffix[1::] in BIN_DIR_EXT & (
+                    BIN_EXT.get(PLATFORM, set()) | BIN_EXT["All"]
+                ):
+                    entries[e.name] = "dir"
+                else:
+                    subdirs.append(e.name)
+
+            elif e.is_file():
+                st = e.stat()
+                if is_binary_file(e.path, e.name, bool(st.st_mode & 0o111)):
+                    entries[e.name] = "file"
+
+    return entries, sorted(subdirs)
+
+
+def load_manifest(manifest_path: Path, source: Path) -> Dict[str, Any]:
+    """Loads manifest of previous scan, empty manifest is returned if it's
+    missing, damaged or was made for another platform/source.
+
+    Parameters:
+    -----------
+    manifest_path : Path
+        Path of the manifest file.
+    source : Path
+        Scanned folder.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Manifest.
+    """
+    empty = {
+        "version": MANIFEST_VERSION,
+        "platform": PLATFORM,
+        "source": str(source),
+        "dirs": {},
+        "files": {},
+    }
+
+    try:
+        with open(manifest_path, "rt") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return empty
+
+    if any(
+        (
+            manifest.get("version") != MANIFEST_VERSION,
+            manifest.get("platform") != PLATFORM,
+            manifest.get("source") != str(source),
+        )
+    ):
+        return empty
+
+    return manifest
+
+
+def save_manifest(manifest_path: Path, manifest: Dict[str, Any]):
+    """Atomically writes manifest."""
+    os.makedirs(manifest_path.parent, exist_ok=True)
+    tmp = Path(f"{manifest_path}.tmp")
+
+    with open(tmp, "wt") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+
+    os.replace(tmp, manifest_path)
+
+
+def scan_binaries(
+    source: Path, manifest: Dict[str, Any]
+) -> Dict[str, Tuple[str, int, int]]:
+    """Recursively builds index of candidate binaries. Directories with unchanged
+    mtime reuse classification stored in the manifest, so only changed
+    directories are listed and classified again. Manifest "dirs" is updated.
+
+    Parameters:
+    -----------
+    source : Path
+        Folder with precompiled binaries.
+    manifest : Dict[str, Any]
+        Manifest of previous scan.
+
+    Returns:
+    --------
+    Dict[str, Tuple[str, int, int]]
+        Relative posix path -> (kind, size, mtime_ns) of candidates.
+    """
+    cached: Dict[str, Any] = manifest.get("dirs", {})
+    dirs: Dict[str, Any] = {}
+    index: Dict[str, Tuple[str, int, int]] = {}
+    stack = [""]
+
+    while stack:
+        rel = stack.pop()
+        path = os.path.join(source, rel)
+
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+
+        prev = cached.get(rel)
+
+        if prev is not None and prev["mtime_ns"] == mtime:
+            entries, subdirs = prev["entries"], prev["subdirs"]
+        else:
+            entries, subdirs = classify_dir(path)
+
+        dirs[rel] = {"mtime_ns": mtime, "entries": entries, "subdirs": subdirs}
+        stack.extend(f"{rel}/{d}" if rel else d for d in subdirs)
+
+        for name, kind in entries.items():
+            try:
+                st = os.stat(os.path.join(path, name))
+            except OSError:
+                continue
+
+            index[f"{rel}/{name}" if rel else name] = (
+                kind,
+                st.st_size,
+                st.st_mtime_ns,
+            )
+
+    manifest["dirs"] = dirs
+
+    return index
+
+
+def diff_index(
+    index: Dict[str, Tuple[str, int, int]],
+    manifest: Dict[str, Any],
+    target: Path,
+) -> Tuple[List[str], List[str]]:
+    """Compares index with files copied during previous runs.
+
+    Parameters:
+    -----------
+    index : Dict[str, Tuple[str, int, int]]
+        Result of scan_binaries.
+    manifest : Dict[str, Any]
+        Manifest of previous scan.
+    target : Path
+        Folder binaries are copied to.
+
+    Returns:
+    --------
+    List[str]
+        Relative paths of new or changed binaries.
+    List[str]
+        Relative paths of binaries removed from the source.
+    """
+    copied: Dict[str, List[Any]] = manifest.get("files", {})
+    changed = sorted(
+        rel
+        for rel, ent in index.items()
+        if copied.get(rel) != list(ent) or not Path(target, rel).exists()
+    )
+    removed = sorted(rel for rel in copied.keys() if rel not in index)
+
+    return changed, removed
+
+
+def get_manifest_path(target: Path, manifest: Optional[Path]) -> Path:
+    """Defaults manifest to the folder binaries are copied to."""
+    return manifest if manifest is not None else Path(target, MANIFEST_NAME)
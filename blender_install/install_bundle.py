@@ -0,0 +1,344 @@
+import os
+import sys
+import shutil
+import zipfile
+import argparse
+import tempfile
+import sysconfig
+import py_compile
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Make it possible to import modules
+dircur = os.path.dirname(__file__)
+if dircur not in sys.path:
+    sys.path.append(os.path.dirname(__file__))
+
+from install_proc_utils import run_process
+from install_platform import EC, BUNDLE_MARKER, python_keyed
+from install_trace import traced
+
+# Fixed timestamp of zip entries, so identical inputs give identical bundles
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+# Files that can't be loaded by zipimport
+NATIVE_SUFFIXES = (".so", ".pyd", ".dll", ".dylib")
+# Top level of the addon has to stay loose: Blender imports __init__.py itself
+# and installer scripts are run by path
+ADDON_SKIP = ["__init__.py", "install*.py", "checksum_file.py", "*.zip"]
+
+
+def is_pure_python(path: Path) -> bool:
+    """Checks that module or package has no native extensions."""
+    if path.is_file():
+        return path.suffix == ".py"
+
+    for rt, drs, fls in os.walk(path):
+        if any(fl.endswith(NATIVE_SUFFIXES) for fl in fls):
+            return False
+
+    return True
+
+
+def compile_source(source: Path, dfile: str, tmp: str) -> bytes:
+    """Compiles module to pyc with unchecked hash, so zipimport loads it without
+    comparing timestamps with the source stored next to it.
+
+    Parameters:
+    -----------
+    source : Path
+        Module source.
+    dfile : str
+        Name of the module shown in tracebacks.
+    tmp : str
+        Temporary folder for compiled file.
+
+    Returns:
+    --------
+    bytes
+        Content of pyc file.
+    """
+    cfile = Path(tmp, "module.pyc")
+    py_compile.compile(
+        str(source),
+        cfile=str(cfile),
+        dfile=dfile,
+        doraise=True,
+        invalidation_mode=py_compile.PycInvalidationMode.UNCHECKED_HASH,
+    )
+
+    return cfile.read_bytes()
+
+
+def collect_tree(root: Path, skip: List[str], top_skip: List[str]) -> List[Path]:
+    """Lists files to bundle in deterministic order.
+
+    Parameters:
+    -----------
+    root : Path
+        Folder to collect files from.
+    skip : List[str]
+        Glob patterns of names skipped at any level.
+    top_skip : List[str]
+        Glob patterns of names skipped at the top level only.
+
+    Returns:
+    --------
+    List[Path]
+        Paths relative to root.
+    """
+    files: List[Path] = []
+
+    for rt, drs, fls in os.walk(root):
+        drs[:] = sorted(d for d in drs if not any(fnmatch(d, p) for p in skip))
+        rel_dir = Path(rt).relative_to(root)
+
+        for fl in sorted(fls):
+            if any(fnmatch(fl, p) for p in skip):
+                continue
+
+            if rel_dir == Path(".") and any(fnmatch(fl, p) for p in top_skip):
+                continue
+
+            files.append(Path(rel_dir, fl))
+
+    return files
+
+
+def write_marker(output: Path, addon_dir: Path, files: List[Path]):
+    """Records name of the bundle and signatures of the bundled addon sources
+    next to it, marker is keyed by Python version like the bundle."""
+    lines = [output.name]
+
+    for rel in files:
+        st = os.stat(Path(addon_dir, rel))
+        lines.append(f"{st.st_size} {st.st_mtime_ns} {rel.as_posix()}")
+
+    marker = Path(output.parent, python_keyed(BUNDLE_MARKER))
+    tmp = Path(f"{marker}.{os.getpid()}.tmp")
+    tmp.write_text("\n".join(lines) + "\n")
+    os.replace(tmp, marker)
+
+
+def write_bundle(sources: List[Tuple[Path, List[Path]]], output: Path) -> int:
+    """Writes zip with sources and their precompiled bytecode. Compiled modules
+    are placed next to sources as module.pyc, where zipimport looks for them.
+
+    Parameters:
+    -----------
+    sources : List[Tuple[Path, List[Path]]]
+        Pairs of root folder and relative paths of files to bundle.
+    output : Path
+        Path of the bundle.
+
+    Returns:
+    --------
+    int
+        Number of bundled modules.
+    """
+    tmp = Path(f"{output}.{os.getpid()}.tmp")
+    entries: Dict[str, Tuple[Path, Optional[bytes]]] = {}
+
+    with tempfile.TemporaryDirectory() as ctmp:
+        for root, files in sources:
+            for rel in files:
+                src = Path(root, rel)
+                entries[rel.as_posix()] = (src, None)
+
+                if rel.suffix == ".py":
+                    entries[rel.with_suffix(".pyc").as_posix()] = (
+                        src,
+                        compile_source(src, f"{output.name}/{rel.as_posix()}", ctmp),
+                    )
+
+    with zipfile.ZipFile(tmp, "w", zipfile.ZIP_STORED) as zf:
+        for name in sorted(entries.keys()):
+            src, data = entries[name]
+            zi = zipfile.ZipInfo(name, ZIP_DATE_TIME)
+            zi.external_attr = 0o644 << 16
+            # Stored entries are read without decompression on every import
+            zf.writestr(zi, data if data is not None else src.read_bytes())
+
+    os.replace(tmp, output)
+
+    return sum(1 for n in entries.keys() if n.endswith(".pyc"))
+
+
+def install_vendor(
+    python: str, modules: List[str], target: Path, timeout: float
+) -> bool:
+    """Installs pip modules to the separate folder.
+
+    Returns:
+    --------
+    bool
+        All modules are installed.
+    """
+    pip_cmd = [
+        python,
+        "-m",
+        "pip",
+        "install",
+        "--no-compile",
+        "-U",
+        "-t",
+        str(target),
+    ] + modules
+
+    ec, so, se, er = run_process(
+        pip_cmd,
+        f"Could not install pip modules: {modules}",
+        timeout * max(len(modules), 1),
+        str(target),
+        True,
+    )
+
+    return ec == 0
+
+
+def split_vendor(vendor: Path, site_packages: Path) -> List[Path]:
+    """Moves distributions with native extensions to site-packages, they can't
+    be imported from zip.
+
+    Returns:
+    --------
+    List[Path]
+        Top level names left to bundle.
+    """
+    pure: List[Path] = []
+
+    for item in sorted(vendor.iterdir()):
+        if item.name in {"bin", "__pycache__"}:
+            continue
+
+        if item.name.endswith((".dist-info", ".egg-info")) or is_pure_python(item):
+            pure.append(Path(item.name))
+            continue
+
+        print(f"{item.name} has native extensions, installed to site-packages")
+        dst = Path(site_packages, item.name)
+
+        if dst.exists():
+            shutil.rmtree(dst, True)
+
+        shutil.move(str(item), str(dst))
+
+    return pure
+
+
+@traced("bundle build", "blender")
+def build_bundle(
+    addon_dir: Path,
+    output: Path,
+    modules: List[str],
+    timeout: float,
+    python: str,
+    site_packages: Path,
+) -> int:
+    """Builds single zip with addon submodules and pure Python pip modules, so
+    imports cost a lookup in the zip directory instead of stat calls along the
+    whole sys.path, which is slow on network home directories.
+
+    Parameters:
+    -----------
+    addon_dir : Path
+        Addon sources.
+    output : Path
+        Path of the bundle, keyed by Python version, see python_keyed.
+    modules : List[str]
+        Pip modules in format supported by pip.
+    timeout : float
+        Timeout of single module installation.
+    python : str
+        Python of Blender, bytecode is compiled for it.
+    site_packages : Path
+        Target of modules that can't be bundled.
+
+    Returns:
+    --------
+    int
+        Number of bundled modules.
+    """
+    skip = ["__pycache__", "*.pyc", ".git*", "*.tmp"]
+    # Data files of the addon stay loose, they are usually opened by path
+    sources = [
+        (
+            addon_dir,
+            [f for f in collect_tree(addon_dir, skip, ADDON_SKIP) if f.suffix == ".py"],
+        )
+    ]
+
+    with tempfile.TemporaryDirectory(prefix="bundle_vendor_") as vendor:
+        if len(modules) > 0:
+            if not install_vendor(python, modules, Path(vendor), timeout):
+                raise Exception("Failed to install bundled pip modules")
+
+            for top in split_vendor(Path(vendor), site_packages):
+                if Path(vendor, top).is_file():
+                    sources.append((Path(vendor), [top]))
+                else:
+                    sources.append(
+                        (
+                            Path(vendor),
+                            [
+                                Path(top, f)
+                                for f in collect_tree(Path(vendor, top), skip, [])
+                            ],
+                        )
+                    )
+
+        n = write_bundle(sources, output)
+
+    write_marker(output, addon_dir, sources[0][1])
+
+    return n
+
+
+if __name__ == "__main__":
+    argv = sys.argv
+
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1 :]
+
+    parser = argparse.ArgumentParser(
+        description="Bundle addon submodules and pure Python pip modules into zip",
+        add_help=True,
+    )
+    parser.add_argument(
+        "-s", "--source", type=Path, required=True, help="Addon sources folder"
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, required=True, help="Path of the bundle"
+    )
+    parser.add_argument(
+        "-m",
+        "--modules",
+        default="",
+        type=str,
+        help="Comma-separated list of pip modules in format supported by pip",
+    )
+    parser.add_argument(
+        "-t",
+        "--timeout",
+        type=float,
+        default=60.0,
+        help="Timeout to install every pip module",
+    )
+
+    args = parser.parse_args(argv)
+    pip_modules = [m.strip() for m in args.modules.split(",") if m.strip()]
+
+    try:
+        n = build_bundle(
+            args.source.resolve(),
+            Path(args.output.resolve().parent, python_keyed(args.output.name)),
+            pip_modules,
+            args.timeout,
+            str(Path(sys.executable).resolve(True)),
+            Path(sysconfig.get_paths()["purelib"]),
+        )
+    except Exception as e:
+        print(f"Bundle is not built: {e}")
+        sys.exit(EC.PIP_MODULES_NOT_INSTALLED.value)
+
+    print(f"Bundled {n} modules to: {python_keyed(str(args.output))}")
@@ -0,0 +1,187 @@
+import os
+import shutil
+import hashlib
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+from install_config import InstallConfig
+from install_platform import PLATFORM
+from install_proc_utils import run_process
+
+
+def get_compiler_version(compiler: str, versions: Dict[str, str]) -> str:
+    """Runs compiler once per installation to get its version, it's part of the
+    cache key, so toolchain updates invalidate the cache.
+
+    Parameters:
+    -----------
+    compiler : str
+        Compiler executable.
+    versions : Dict[str, str]
+        Already known versions, updated in place.
+
+    Returns:
+    --------
+    str
+        Version output of the compiler.
+    """
+    if compiler not in versions:
+        ec, so, se, er = run_process(
+            [compiler, "--version"],
+            f"Failed to get version of compiler: {compiler}",
+            10,
+            print_std=False,
+        )
+
+        if ec != 0:
+            raise Exception(f"Compiler is not available: {compiler}\n{se}\n{er}")
+
+        versions[compiler] = f"{shutil.which(compiler)}\n{so}"
+
+    return versions[compiler]
+
+
+def hash_target(target: Dict[str, Any], compiler_version: str) -> str:
+    """Computes cache key of the target from its sources, dependencies, flags
+    and compiler version.
+
+    Parameters:
+    -----------
+    target : Dict[str, Any]
+        Validated build target.
+    compiler_version : str
+        Output of get_compiler_version.
+
+    Returns:
+    --------
+    str
+        Hex digest.
+    """
+    h = hashlib.sha256()
+
+    for part in (
+        PLATFORM,
+        compiler_version,
+        target["compiler"],
+        *target["flags"],
+        "\0ldflags",
+        *target["ldflags"],
+    ):
+        h.update(part.encode("utf8"))
+        h.update(b"\0")
+
+    for src in (*target["sources"], "\0depends", *target["depends"]):
+        # Only names are hashed, so cache survives moving the repository
+        h.update((src.name if isinstance(src, Path) else src).encode("utf8"))
+
+        if isinstance(src, Path):
+            with open(src, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 20), b""):
+                    h.update(chunk)
+
+    return h.hexdigest()
+
+
+def build_target(
+    target: Dict[str, Any], key: str, cache_dir: Path, out_dir: Path
+) -> Tuple[str, str]:
+    """Restores target from the cache or builds it and stores to the cache.
+
+    Parameters:
+    -----------
+    target : Dict[str, Any]
+        Validated build target.
+    key : str
+        Cache key of the target.
+    cache_dir : Path
+        Root of the build cache.
+    out_dir : Path
+        Folder for built binaries.
+
+    Returns:
+    --------
+    str
+        Name of the target.
+    str
+        "cached" or "built".
+    """
+    cached = Path(cache_dir, key[:2], key, target["output"].name)
+    output = Path(out_dir, target["output"])
+    os.makedirs(output.parent, exist_ok=True)
+
+    if cached.is_file():
+        shutil.copy2(cached, output)
+        return target["name"], "cached"
+
+    os.makedirs(cached.parent, exist_ok=True)
+
+    # Build in the cache folder and rename, so interrupted build doesn't leave
+    # broken binary in the cache
+    with tempfile.TemporaryDirectory(dir=cached.parent) as tmp:
+        tmp_out = Path(tmp, target["output"].name)
+        cmd = [
+            target["compiler"],
+            *target["flags"],
+            *(str(s) for s in target["sources"]),
+            "-o",
+            str(tmp_out),
+            *target["ldflags"],
+        ]
+
+        print(f"Compiling {target['name']}: {cmd}")
+        ec, so, se, er = run_process(
+            cmd,
+            f"Failed to compile: {target['name']}",
+            target["timeout"],
+            print_std=False,
+        )
+
+        if ec != 0 or not tmp_out.is_file():
+            raise Exception(f"Failed to compile {target['name']}: {ec}\n{se}\n{er}")
+
+        os.replace(tmp_out, cached)
+
+    shutil.copy2(cached, output)
+
+    return target["name"], "built"
+
+
+def compile_binaries(cfg: InstallConfig):
+    """Compiles binaries_targets in parallel. Targets whose sources, flags and
+    compiler didn't change are restored from binaries_cache_path.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Object with parsed and verified configuration.
+    """
+    targets = cfg.binaries_targets
+
+    if len(targets) == 0:
+        print("No binaries_targets provided, nothing to compile")
+        return
+
+    versions: Dict[str, str] = {}
+    jobs: List[Tuple[Dict[str, Any], str]] = [
+        (t, hash_target(t, get_compiler_version(t["compiler"], versions)))
+        for t in targets
+    ]
+    workers: Optional[int] = cfg.binaries_compile_jobs or os.cpu_count()
+    errors: List[str] = []
+
+    with ThreadPoolExecutor(workers) as ex:
+        futures = [
+            ex.submit(build_target, t, key, cfg.binaries_cache_path, cfg.binaries_path)
+            for t, key in jobs
+        ]
+
+        for f in futures:
+            try:
+                name, res = f.result()
+                print(f"Binary {name}: {res}")
+            except Exception as e:
+                errors.append(str(e))
+
+    if len(errors) > 0:
+        raise Exception("\n".join(errors))
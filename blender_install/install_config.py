@@ -1,13 +1,30 @@
 import os
-import sys
-import toml
-import shutil
-from pprint import pprint
 from pathlib import Path
 from typing import Dict, Set, List, Optional, Union, Any
 from install_platform import PLATFORM
-from install_proc_utils import run_process, executable_exists, rmtree_protected
-from checksum_file import checksum_file
+from install_trace import traced
+from install_config_snapshot import (
+    snapshot_path,
+    snapshot_key,
+    load_snapshot,
+    save_snapshot,
+    remove_snapshot,
+)
+
+# Compilers picked by the language of binaries_targets if not set explicitly
+DEFAULT_COMPILERS = {
+    "c": "cc",
+    "c++": "c++",
+}
+
+# symlink - link the whole folder, copy - copy files byte by byte,
+# link - reflink/hardlink every file, falls back to copy per file,
+# zip - package addon to addon_zip_path for Blender's "Install from file"
+ADDON_INSTALL_MODES = {"symlink", "copy", "link", "zip"}
+
+# Written to the Blender folder after every extraction, it's an input of the
+# stages, so pip modules are installed again into the fresh site-packages
+UNPACK_MARKER = ".blender_install_unpacked"
 
 
 class InstallConfig:
@@ -18,16 +35,25 @@ class InstallConfig:
     blender_packed: Optional[Path]
     blender_unpack: bool
     blender_overwrite: bool
+    blender_dedup: bool
+    blender_store_path: Path
+    blender_unpack_cache: bool
+    blender_unpack_cache_path: Path
+    blender_extract_profile: Dict[str, Any]
     blender_path: Path
     blender_python_dir: Path
     blender_python_version: str
     blender_version: str
+    blender_config_path: Path
 
     addon_path_autodetect: bool
     addon_path_user: bool
     addon_name: str
     addon_path: Path
     addon_create_link: bool
+    addon_install_mode: str
+    addon_zip_path: Path
+    addon_zip_level: int
     addon_allowed_paths: Set[Path]
 
     use_ignore: bool
@@ -36,15 +62,30 @@ class InstallConfig:
     binaries_precompiled_path: Path
     binaries_path: Path
     binaries_checksum: bool
+    binaries_manifest: Optional[Path]
     binaries_copy: bool
     binaries_compile: bool
+    binaries_targets: List[Dict[str, Any]]
+    binaries_cache_path: Path
+    binaries_compile_jobs: int
+    checksum_cache: bool
+    checksum_cache_path: Path
 
     current_folder: Path
     install_pip_script: Optional[Path]
     install_pip_timeout: float
     pip_modules: Optional[str]
+    pip_bundle: bool
+    pip_bundle_name: str
+    pip_cache_path: Optional[Path]
     install_activate_script: Optional[Path]
     activate_addons: List[str]
+    activation_cache: bool
+    activation_cache_path: Path
+    activate_profile: bool
+    activate_profile_report: Path
+    activate_budget: float
+    activate_budgets: Dict[str, float]
     install_custom_script: Optional[Path]
     install_custom_timeout: float
     install_custom_args: List[str]
@@ -53,15 +94,78 @@ class InstallConfig:
     install_exclude: Optional[Path]
 
     setup_compute_devices: bool
+    compute_device_cache: bool
+    compute_device_cache_path: Path
+    cpu_tuning: bool
+    cpu_tuning_save_startup: bool
+    cpu_numa_node: int
+
+    watch_interval: float
+    watch_reload_port: int
+
+    config_cache: bool
+
+    target_name: Optional[str]
+    targets_log_path: Path
+
+    fleet_nodes: List[Path]
+    fleet_jobs: int
+    fleet_retries: int
+    fleet_retry_delay: float
+    fleet_straggler_factor: float
+    fleet_report: Path
+    fleet_wheelhouse: Path
+
+    def __init__(
+        self, cfg_file: Path, use_snapshot: bool = True, target: Optional[int] = None
+    ):
+        """
+        Parameters:
+        -----------
+        cfg_file : Path
+            Path to toml file.
+        use_snapshot : bool
+            Load validated config from snapshot if inputs are unchanged.
+        target : Optional[int]
+            Index in [[targets]], values of the target override top level ones.
+        """
+        raw = Path(cfg_file).read_bytes()
+        snapshot = snapshot_path(Path(cfg_file), target)
+        key = snapshot_key(raw if target is None else raw + f"\0{target}".encode())
+
+        if use_snapshot and (fields := load_snapshot(snapshot, key)) is not None:
+            print(f"Config is loaded from snapshot: {snapshot}")
+            self.__dict__.update(fields)
+            return
+
+        # Paths the config is resolved from, path -> "stat" if content matters,
+        # "exists" if only existence is checked
+        self._deps: Dict[Path, str] = {Path(__file__).resolve(): "stat"}
+
+        # Parser is only needed when snapshot is not used
+        import toml
+
+        cfg: Dict[str, Any] = toml.loads(raw.decode("utf8"))
+
+        if target is not None:
+            cfg = merge_target(cfg, target)
 
-    def __init__(self, cfg_file: Path):
-        cfg: Dict[str, Any] = toml.load(cfg_file)
         self.validate_config(cfg)
 
+        deps = self.get_snapshot_deps()
+        del self._deps
+
+        if self.config_cache:
+            save_snapshot(snapshot, key, dict(vars(self)), deps)
+        else:
+            remove_snapshot(snapshot)
+
     def validate_config(self, cfg: Dict[str, Any]):
         """Extracts and validates values from cfg file. Falls back to sane defaults.
         Unpacks blender executable from the archive if needed.
         """
+        from install_proc_utils import executable_exists
+
         self.addon_name = cfg.get("blender_install", "blender_install")
         self.addon_path_autodetect = cfg.get("addon_path_autodetect", True)
         self.addon_path_user = cfg.get("addon_path_user", True)
@@ -70,11 +174,27 @@ class InstallConfig:
         self.blender_unpack = cfg.get("blender_unpack", True)
         self.blender_packed = cfg.get("blender_packed")
         self.blender_overwrite = cfg.get("blender_overwrite", True)
+        self.blender_dedup = cfg.get("blender_dedup", False)
+        self.blender_store_path = self.resolve_to_path(
+            cfg.get("blender_store_path", "../blender_store"), False
+        )
+        self.blender_unpack_cache = cfg.get("blender_unpack_cache", True)
+        self.blender_unpack_cache_path = self.resolve_to_path(
+            cfg.get("blender_unpack_cache_path", "../unpack_cache"), False
+        )
+        self.blender_extract_profile = self.get_blender_extract_profile(cfg)
+        self.checksum_cache = cfg.get("checksum_cache", True)
+        self.checksum_cache_path = self.resolve_to_path(
+            cfg.get("checksum_cache_path", "../checksum_cache"), False
+        )
 
         self.blender_path = self.get_blender_path(cfg)
         self.binaries_precompiled_path = self.get_binaries_precompiled_path(cfg)
         self.binaries_path = self.get_binaries_path(cfg)
         self.binaries_checksum = cfg.get("binaries_checksum", True)
+        self.binaries_manifest = self.resolve_to_path(
+            cfg.get("binaries_manifest"), False
+        )
 
         if not executable_exists(self.blender_path):
             if self.blender_unpack:
@@ -101,22 +221,47 @@ class InstallConfig:
         self.blender_python_dir = self.get_blender_python_dir()
         self.blender_python_version = self.get_blender_python_version()
         self.addon_path = self.get_addon_path(cfg)
+        self.blender_config_path = self.get_blender_config_path()
 
         # These fields do not require specific methods (yet)
         self.addon_create_link = cfg.get("addon_create_link", True)
+        self.addon_install_mode = self.get_addon_install_mode(cfg)
+        self.addon_zip_path = self.resolve_to_path(
+            cfg.get("addon_zip_path", f"../dist/{self.addon_name}.zip"), False
+        )
+        self.addon_zip_level = cfg.get("addon_zip_level", 6)
         self.use_ignore = cfg.get("use_ignore", True)
         self.use_include = cfg.get("use_include", True)
         self.binaries_copy = cfg.get("binaries_copy", False)
         self.binaries_compile = cfg.get("binaries_compile", False)
+        self.binaries_targets = self.get_binaries_targets(cfg)
+        self.binaries_cache_path = self.resolve_to_path(
+            cfg.get("binaries_cache_path", "../build_cache"), False
+        )
+        self.binaries_compile_jobs = cfg.get("binaries_compile_jobs", 0)
 
         # Get custom scripts for installation of additional components
         self.install_pip_script = self.get_script_file(cfg, "install_pip_script")
         self.install_pip_timeout = cfg.get("install_pip_timeout", 30.0)
         self.pip_modules = cfg.get("pip_modules", [])
+        self.pip_bundle = cfg.get("pip_bundle", False)
+        self.pip_bundle_name = cfg.get("pip_bundle_name", "addon_bundle.zip")
+        self.pip_cache_path = self.resolve_to_path(cfg.get("pip_cache_path"), False)
         self.install_activate_script = self.get_script_file(
             cfg, "install_activate_script"
         )
         self.activate_addons = cfg.get("activate_addons", [])
+        self.activation_cache = cfg.get("activation_cache", True)
+        self.activation_cache_path = self.resolve_to_path(
+            cfg.get("activation_cache_path", "../activation_cache"), False
+        )
+        self.activate_profile = cfg.get("activate_profile", False)
+        self.activate_profile_report = self.resolve_to_path(
+            cfg.get("activate_profile_report", "../reports/activate_profile.json"),
+            False,
+        )
+        self.activate_budget = cfg.get("activate_budget", 0.0)
+        self.activate_budgets = cfg.get("activate_budgets", {})
         self.install_custom_script = self.get_script_file(cfg, "install_custom_script")
         self.install_custom_timeout = cfg.get("install_custom_script", 30.0)
         self.install_custom_args = cfg.get("install_custom_args", [])
@@ -131,6 +276,69 @@ class InstallConfig:
             self.install_exclude = Path(self.install_exclude).resolve(True)
 
         self.setup_compute_devices = cfg.get("setup_compute_devices", True)
+        self.compute_device_cache = cfg.get("compute_device_cache", True)
+        self.compute_device_cache_path = self.resolve_to_path(
+            cfg.get("compute_device_cache_path", "../activation_cache/devices.json"),
+            False,
+        )
+        self.cpu_tuning = cfg.get("cpu_tuning", False)
+        self.cpu_tuning_save_startup = cfg.get("cpu_tuning_save_startup", False)
+        self.cpu_numa_node = cfg.get("cpu_numa_node", -1)
+
+        self.watch_interval = cfg.get("watch_interval", 0.2)
+        self.watch_reload_port = cfg.get("watch_reload_port", 0)
+
+        self.config_cache = cfg.get("config_cache", True)
+        self.state_db = cfg.get("state_db", True)
+        self.state_db_path = self.resolve_to_path(
+            cfg.get("state_db_path", "../install_state.sqlite"), False
+        )
+        self.target_name = cfg.get("target_name")
+        self.targets_log_path = self.resolve_to_path(
+            cfg.get("targets_log_path", "../reports/targets"), False
+        )
+
+        self.fleet_nodes = [
+            self.resolve_to_path(p, False) for p in cfg.get("fleet_nodes", [])
+        ]
+        self.fleet_jobs = cfg.get("fleet_jobs", 8)
+        self.fleet_retries = cfg.get("fleet_retries", 2)
+        self.fleet_retry_delay = cfg.get("fleet_retry_delay", 5.0)
+        self.fleet_straggler_factor = cfg.get("fleet_straggler_factor", 2.0)
+        self.fleet_report = self.resolve_to_path(
+            cfg.get("fleet_report", "../reports/fleet.json"), False
+        )
+        self.fleet_wheelhouse = self.resolve_to_path(
+            cfg.get("fleet_wheelhouse", "../wheelhouse"), False
+        )
+
+    def get_snapshot_deps(self) -> Dict[Path, str]:
+        """Collects paths validated values depend on: executable Blender
+        version is read from, Python folders of Blender and all the paths
+        checked for existence while resolving.
+
+        Returns:
+        --------
+        Dict[Path, str]
+            Path -> "stat" or "exists".
+        """
+        deps = dict(self._deps)
+        deps[self.current_folder] = "exists"
+        deps[self.blender_path] = "stat"
+        deps[self.binaries_path] = "exists"
+        deps[Path(self.blender_python_dir, "bin")] = "stat"
+
+        for p in (
+            self.install_pip_script,
+            self.install_activate_script,
+            self.install_custom_script,
+            self.install_include,
+            self.install_exclude,
+        ):
+            if p is not None:
+                deps[p] = "stat"
+
+        return deps
 
     def get_blender_path(self, cfg: Dict[str, Any]) -> Path:
         return Path(
@@ -161,6 +369,56 @@ class InstallConfig:
             )
         ).resolve(True)
 
+    def get_binaries_targets(self, cfg: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Validates build targets of native helpers.
+
+        Parameters:
+        -----------
+        cfg : Dict[str, Any]
+            Parsed toml file.
+
+        Returns:
+        --------
+        List[Dict[str, Any]]
+            Targets with resolved sources and defaults filled in.
+        """
+        targets: List[Dict[str, Any]] = []
+
+        for t in cfg.get("binaries_targets", []):
+            name = t.get("name")
+            lang = t.get("lang", "c")
+
+            if name is None:
+                raise Exception(f"Build target has no name: {t}")
+
+            if lang not in DEFAULT_COMPILERS:
+                raise Exception(f"Build target {name} has unsupported lang: {lang}")
+
+            sources = [self.resolve_to_path(s, True) for s in t.get("sources", [])]
+            depends = [self.resolve_to_path(s, True) for s in t.get("depends", [])]
+
+            if len(sources) == 0 or None in sources or None in depends:
+                raise Exception(f"Build target {name} has missing sources")
+
+            targets.append(
+                {
+                    "name": name,
+                    "compiler": t.get("compiler", DEFAULT_COMPILERS[lang]),
+                    "sources": sources,
+                    "depends": depends,
+                    "flags": t.get("flags", ["-O2"]),
+                    "ldflags": t.get("ldflags", []),
+                    "output": Path(
+                        t.get(
+                            "output", f"{name}.exe" if PLATFORM == "Windows" else name
+                        )
+                    ),
+                    "timeout": t.get("timeout", 120.0),
+                }
+            )
+
+        return targets
+
     def get_addon_path(self, cfg: Dict[str, Any]) -> Path:
         default_path: Optional[Path]
         path: Optional[Path]
@@ -224,6 +482,81 @@ class InstallConfig:
         else:
             raise OSError("Incorrect addon path")
 
+    def get_addon_install_mode(self, cfg: Dict[str, Any]) -> str:
+        """Picks the way addon tree is installed. Falls back to addon_create_link
+        if mode is not set explicitly.
+
+        Parameters:
+        -----------
+        cfg : Dict[str, Any]
+            Parsed toml file.
+
+        Returns:
+        --------
+        str
+            One of the ADDON_INSTALL_MODES.
+        """
+        mode = cfg.get(
+            "addon_install_mode", "symlink" if self.addon_create_link else "copy"
+        )
+
+        if mode not in ADDON_INSTALL_MODES:
+            raise Exception(
+                f"Unknown addon_install_mode: {mode}, "
+                f"supported: {sorted(ADDON_INSTALL_MODES)}"
+            )
+
+        # Keep both fields consistent, symlink checks rely on addon_create_link
+        self.addon_create_link = mode == "symlink"
+
+        return mode
+
+    def get_blender_extract_profile(self, cfg: Dict[str, Any]) -> Dict[str, Any]:
+        """Resolves blender_extract_profile against built-in profiles and
+        blender_extract_profiles of the config.
+
+        Parameters:
+        -----------
+        cfg : Dict[str, Any]
+            Parsed toml file.
+
+        Returns:
+        --------
+        Dict[str, Any]
+            name, include and exclude globs.
+        """
+        from install_sparse import get_profile
+
+        return get_profile(
+            cfg.get("blender_extract_profile", "full"),
+            cfg.get("blender_extract_profiles", {}),
+        )
+
+    def get_blender_config_path(self) -> Path:
+        """Finds folder Blender saves userpref.blend to. Follows addon_path_user
+        the same way addon path autodetection does.
+
+        Returns:
+        --------
+        Path
+            Blender config folder, it may not exist yet.
+        """
+        if not self.addon_path_user:
+            return Path(self.blender_path.parent, self.blender_version, "config")
+
+        if PLATFORM == "Linux":
+            base = Path(Path.home(), ".config", "blender")
+        elif PLATFORM == "Darwin":
+            base = Path(Path.home(), "Library", "Application Support", "Blender")
+        elif PLATFORM == "Windows":
+            base = Path(
+                Path.home(), "AppData", "Roaming", "Blender Foundation", "Blender"
+            )
+        else:
+            raise Exception(f"Platform: {PLATFORM} is not supported")
+
+        return Path(base, self.blender_version, "config")
+
     def get_allowed_paths(self, cfg: Dict[str, Any]) -> Set[Path]:
         return set(
             (
@@ -266,6 +599,9 @@ class InstallConfig:
             p = path.absolute()
 
         if strict:
+            if hasattr(self, "_deps"):
+                self._deps.setdefault(p, "exists")
+
             return p if p.exists() else None
         else:
             return p
@@ -278,6 +614,8 @@ class InstallConfig:
         str
             Version of Blender in x.x format.
         """
+        from install_proc_utils import run_process
+
         ec, so, se, er = run_process(
             [str(self.blender_path), "--version"],
             "Failed to get Blender version",
@@ -315,6 +653,9 @@ class InstallConfig:
 
         if script_file is not None:
             script_file = Path(script_file)
+            # Script may appear later in any of the looked up locations
+            self._deps.setdefault(script_file.absolute(), "exists")
+            self._deps.setdefault(Path(self.current_folder, script_file), "exists")
 
             if script_file.is_file():
                 return script_file
@@ -394,6 +735,65 @@ class InstallConfig:
         return ver
 
 
+def get_targets(cfg_file: Path) -> List[Dict[str, Any]]:
+    """Reads [[targets]] of the config. Config without targets is not parsed,
+    so single target runs can still use the snapshot.
+
+    Parameters:
+    -----------
+    cfg_file : Path
+        Path to toml file.
+
+    Returns:
+    --------
+    List[Dict[str, Any]]
+        Targets, empty if config has a single target.
+    """
+    raw = Path(cfg_file).read_bytes()
+
+    if b"targets" not in raw:
+        return []
+
+    import toml
+
+    return toml.loads(raw.decode("utf8")).get("targets", [])
+
+
+def merge_target(cfg: Dict[str, Any], target: int) -> Dict[str, Any]:
+    """Overrides top level values with values of the target.
+
+    Parameters:
+    -----------
+    cfg : Dict[str, Any]
+        Parsed toml file.
+    target : int
+        Index in [[targets]].
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Config of the single target.
+    """
+    targets = cfg.get("targets", [])
+
+    if target >= len(targets):
+        raise Exception(f"Target {target} is not found, config has {len(targets)}")
+
+    merged = {k: v for k, v in cfg.items() if k != "targets"}
+    merged.update({k: v for k, v in targets[target].items() if k != "name"})
+    merged["target_name"] = targets[target].get("name", f"target_{target}")
+
+    # Explicit addon path of the target wins over autodetection
+    if (
+        "addon_path" in targets[target]
+        and "addon_path_autodetect" not in targets[target]
+    ):
+        merged["addon_path_autodetect"] = False
+
+    return merged
+
+
+@traced("unpack")
 def unpack_portable_blender(cfg: InstallConfig):
     """Depending on the platform, archive with portable blender will be extracted.
     If binaries_checksum is active in cfg, archive will be checked before extraction.
@@ -402,6 +802,9 @@ def unpack_portable_blender(cfg: InstallConfig):
         print("Portable unpaking is skipped")
         return
 
+    from install_proc_utils import executable_exists, rmtree_protected
+    from checksum_file import checksum_file
+
     source = cfg.blender_packed
     target = cfg.blender_path.parent
     bin_chk = cfg.binaries_checksum
@@ -412,61 +815,228 @@ def unpack_portable_blender(cfg: InstallConfig):
             return
 
         if bin_chk:
-            if not checksum_file(source):
+            cache = cfg.checksum_cache_path if cfg.checksum_cache else None
+
+            if not checksum_file(source, cache):
                 print("Archive is damaged or checksum is not provided")
                 return
 
-        if cfg.blender_overwrite:
-            rmtree_protected(target, cfg.addon_allowed_paths)
+        from install_lock import file_lock, lock_path
 
-        if source.suffix in {".xz", ".gz", "bz2"}:
-            import tarfile
+        # Concurrent installs into the same folder wait for the first one and
+        # use Blender it has unpacked
+        with file_lock(lock_path(target)):
+            if executable_exists(cfg.blender_path):
+                print("Portable Blender was unpacked by other install")
+                return
 
-            with tarfile.open(str(source)) as f:
-                try:
-                    ms = f.getmembers()
-                    # Remove the name of the root folder
-                    m0 = len(ms[0].path)
+            from install_seekable import find_seekable
 
-                    for m in ms:
-                        m.path = m.path[m0 + 1 : :]
+            # Seekable archive repairs existing folder in place, only missing
+            # and changed files are read from it. The cache looks it up itself
+            seekable = None if cfg.blender_unpack_cache else find_seekable(source)
+            delta = seekable is not None
 
-                    f.extractall(str(target), ms)
+            # With overwrite delta removes files which are not in the archive
+            # or not wanted by the profile, the tree is the same as after
+            # removal and full extraction. Without it delta only repairs
+            overwrite = cfg.blender_overwrite and bool(
+                set(target.parents).intersection(cfg.addon_allowed_paths)
+            )
 
-                except Exception as e:
-                    print(f"Failed to extract: {e}")
+            if cfg.blender_overwrite and not delta:
+                rmtree_protected(target, cfg.addon_allowed_paths)
 
-        elif source.suffix in {
-            ".zip",
-        }:
-            import zipfile
+            profile = cfg.blender_extract_profile
+            created = not target.exists()
 
-            with zipfile.ZipFile(str(source)) as f:
-                try:
-                    root = f.namelist()[0]
+            if cfg.blender_unpack_cache:
+                from install_unpack_cache import unpack_cached
+
+                unpack_cached(source, target, cfg.blender_unpack_cache_path, profile)
+            else:
+                extract_portable(
+                    source, target, profile, delta, seekable, prune=overwrite
+                )
+
+            print("Portable Blender extracted")
 
-                    for member in f.namelist():
-                        if member == root:
+            from install_sparse import is_full, check_blender_starts
+
+            if not is_full(profile) and not check_blender_starts(cfg.blender_path):
+                # Next run extracts again instead of using the broken folder,
+                # folder which existed before only loses the executable
+                if created:
+                    import shutil
+
+                    shutil.rmtree(target, True)
+                elif cfg.blender_path.exists():
+                    os.unlink(cfg.blender_path)
+
+                raise Exception(
+                    f"Blender does not start after extraction with profile "
+                    f"{profile['name']}, keep more files or use full profile"
+                )
+
+            if cfg.blender_dedup:
+                from install_dedup import dedup_portable_blender
+
+                dedup_portable_blender(target, cfg.blender_store_path)
+
+            import time
+
+            Path(target, UNPACK_MARKER).write_text(str(time.time_ns()))
+
+    else:
+        print("Unpacking requested, but no blender_packed archive provided")
+
+
+def extract_portable(
+    source: Path,
+    target: Path,
+    profile: Optional[Dict[str, Any]] = None,
+    delta: bool = False,
+    seekable: Optional[Path] = None,
+    prune: bool = False,
+) -> Dict[str, int]:
+    """Extracts archive with portable Blender to target folder, the root folder
+    of the archive is stripped. Tar archives are read once as a stream and
+    members not wanted by the profile are skipped on the way. If seekable copy
+    of the archive (install_seekable.py) is provided, it's used instead, only
+    blocks of wanted files are read from it. Errors are raised, target
+    may be left partially extracted.
+
+    Parameters:
+    -----------
+    source : Path
+        tar.xz, tar.gz, tar.bz2 or zip archive.
+    target : Path
+        Folder with Blender executable.
+    profile : Optional[Dict[str, Any]]
+        Extraction profile, see install_sparse.get_profile, everything is
+        extracted without it.
+    delta : bool
+        Write only missing and changed files of existing tree, supported with
+        seekable archive only.
+    seekable : Optional[Path]
+        Up to date seekable copy of the archive, see
+        install_seekable.find_seekable.
+    prune : bool
+        Remove files of existing tree which are not wanted members of the
+        seekable archive.
+
+    Returns:
+    --------
+    Dict[str, int]
+        Number and size of extracted files and of all files of the archive.
+    """
+    import shutil
+    from install_progress import Progress
+    from install_sparse import get_profile, is_full, is_wanted, report_sizes
+
+    from install_seekable import extract_seekable
+
+    profile = profile or get_profile("full", {})
+    stats = {"files": 0, "bytes": 0, "total_files": 0, "total_bytes": 0}
+
+    if seekable is not None:
+        stats = extract_seekable(seekable, target, profile, delta, prune)
+
+    elif source.suffix in {".xz", ".gz", "bz2"}:
+        import tarfile
+        from install_sparse import CountingReader
+
+        os.makedirs(target, exist_ok=True)
+
+        # Uncompressed size is unknown until the end, progress is reported in
+        # bytes of the archive
+        with open(source, "rb") as raw, Progress(
+            f"Extracting {source.name}", source.stat().st_size
+        ) as progress:
+            try:
+                with tarfile.open(
+                    fileobj=CountingReader(raw, progress), mode="r|*"
+                ) as f:
+                    m0 = None
+
+                    for m in f:
+                        # Remove the name of the root folder
+                        if m0 is None:
+                            m0 = len(m.path)
+
+                        m.path = m.path[m0 + 1 : :]
+
+                        if m.islnk():
+                            m.linkname = m.linkname[m0 + 1 : :]
+
+                        if m.isfile():
+                            stats["total_files"] += 1
+                            stats["total_bytes"] += m.size
+
+                        if m.path == "" or not is_wanted(m.path, m.isdir(), profile):
                             continue
 
-                        if member.endswith("/"):
+                        # Stream is read forward only, data of the member
+                        # follows its header
+                        f.extract(m, str(target))
+
+                        if m.isfile():
+                            stats["files"] += 1
+                            stats["bytes"] += m.size
+                            progress.update(0)
+
+            except Exception as e:
+                raise Exception(f"Failed to extract {source}: {e}") from e
+
+    elif source.suffix in {
+        ".zip",
+    }:
+        import zipfile
+
+        os.makedirs(target, exist_ok=True)
+
+        with zipfile.ZipFile(str(source)) as f:
+            root = f.namelist()[0]
+            wanted = []
+
+            for i in f.infolist():
+                member = i.filename.removeprefix(root)
+
+                if not i.is_dir():
+                    stats["total_files"] += 1
+                    stats["total_bytes"] += i.file_size
+
+                if member != "" and is_wanted(member.rstrip("/"), i.is_dir(), profile):
+                    wanted.append(i)
+
+            with Progress(
+                f"Extracting {source.name}",
+                sum(i.file_size for i in wanted),
+                sum(not i.is_dir() for i in wanted),
+            ) as progress:
+                try:
+                    for i in wanted:
+                        member = i.filename.removeprefix(root)
+
+                        if i.is_dir():
                             os.makedirs(
-                                os.path.join(str(target), member.removeprefix(root)),
-                                exist_ok=True,
+                                os.path.join(str(target), member), exist_ok=True
                             )
                             continue
 
                         # copy file (taken from zipfile's extract)
-                        ef = f.open(member)
-                        with open(
-                            os.path.join(str(target), member.removeprefix(root)), "wb"
-                        ) as tgt:
+                        ef = f.open(i)
+                        with open(os.path.join(str(target), member), "wb") as tgt:
                             shutil.copyfileobj(ef, tgt)
 
+                        stats["files"] += 1
+                        stats["bytes"] += i.file_size
+                        progress.update(i.file_size)
+
                 except Exception as e:
-                    print(f"Failed to extract: {e}")
+                    raise Exception(f"Failed to extract {source}: {e}") from e
 
-        print("Portable Blender extracted")
+    if not is_full(profile):
+        report_sizes(stats, profile)
 
-    else:
-        print("Unpacking requested, but no blender_packed archive provided")
+    return stats
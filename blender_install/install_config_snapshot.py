@@ -0,0 +1,164 @@
+import os
+import sys
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+# Bump when layout of the snapshot changes
+SNAPSHOT_VERSION = 1
+SNAPSHOT_SUFFIX = ".snapshot.json"
+
+
+def snapshot_path(cfg_file: Path, target: Optional[int] = None) -> Path:
+    """Snapshot is stored next to the config as hidden file, so it's found
+    before the config is parsed. Every target has its own snapshot."""
+    name = cfg_file.name if target is None else f"{cfg_file.name}.{target}"
+    return Path(cfg_file.parent, f".{name}{SNAPSHOT_SUFFIX}")
+
+
+def snapshot_key(raw: bytes) -> str:
+    """Digest of config content and environment the config is resolved in:
+    relative paths depend on the current folder, autodetected addon path on
+    the home folder.
+
+    Parameters:
+    -----------
+    raw : bytes
+        Content of the toml file.
+
+    Returns:
+    --------
+    str
+        Hex digest.
+    """
+    h = hashlib.sha256(raw)
+    env = [
+        SNAPSHOT_VERSION,
+        os.getcwd(),
+        str(Path.home()),
+        sys.platform,
+        sys.version,
+    ]
+    h.update(json.dumps(env).encode("utf8"))
+
+    return h.hexdigest()
+
+
+def stat_signature(path: str) -> Optional[Tuple[int, int, int, int]]:
+    """Signature of file or folder, None if it does not exist. Folder mtime
+    changes when entries are added or removed, which covers listings."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    return (st.st_ino, st.st_dev, st.st_size, st.st_mtime_ns)
+
+
+def encode(value: Any) -> Any:
+    """Converts config values to JSON, Paths and sets are tagged."""
+    if isinstance(value, Path):
+        return {"__path__": str(value)}
+    elif isinstance(value, (set, frozenset)):
+        return {"__set__": sorted((encode(v) for v in value), key=json.dumps)}
+    elif isinstance(value, dict):
+        return {"__dict__": [[encode(k), encode(v)] for k, v in value.items()]}
+    elif isinstance(value, (list, tuple)):
+        return [encode(v) for v in value]
+
+    return value
+
+
+def decode(value: Any) -> Any:
+    """Restores values converted by encode."""
+    if isinstance(value, dict):
+        if "__path__" in value:
+            return Path(value["__path__"])
+        elif "__set__" in value:
+            return set(decode(v) for v in value["__set__"])
+        elif "__dict__" in value:
+            return {decode(k): decode(v) for k, v in value["__dict__"]}
+    elif isinstance(value, list):
+        return [decode(v) for v in value]
+
+    return value
+
+
+def path_signature(path: str, mode: str) -> Any:
+    """Signature of the dependency: stat data or existence flag."""
+    if mode == "exists":
+        return os.path.exists(path)
+
+    sig = stat_signature(path)
+
+    return list(sig) if sig is not None else None
+
+
+def load_snapshot(path: Path, key: str) -> Optional[Dict[str, Any]]:
+    """Loads validated fields if key matches and none of the paths the config
+    was resolved from has changed.
+
+    Parameters:
+    -----------
+    path : Path
+        Snapshot file.
+    key : str
+        Result of snapshot_key.
+
+    Returns:
+    --------
+    Optional[Dict[str, Any]]
+        Attributes of InstallConfig, None if snapshot is missing or stale.
+    """
+    try:
+        with open(path, "rt") as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if snapshot.get("key") != key:
+        print("Config snapshot is stale: config or environment changed")
+        return None
+
+    for dep, (mode, sig) in snapshot.get("deps", {}).items():
+        if path_signature(dep, mode) != sig:
+            print(f"Config snapshot is stale: {dep} changed")
+            return None
+
+    return decode(snapshot["fields"])
+
+
+def save_snapshot(path: Path, key: str, fields: Dict[str, Any], deps: Dict[Path, str]):
+    """Atomically writes validated fields with signatures of their inputs.
+
+    Parameters:
+    -----------
+    path : Path
+        Snapshot file.
+    key : str
+        Result of snapshot_key.
+    fields : Dict[str, Any]
+        Attributes of InstallConfig.
+    deps : Dict[Path, str]
+        Paths the fields were resolved from -> "stat" or "exists".
+    """
+    sigs = {str(p): [m, path_signature(str(p), m)] for p, m in deps.items()}
+    snapshot = {"key": key, "deps": sigs, "fields": encode(fields)}
+    tmp = Path(f"{path}.tmp")
+
+    try:
+        with open(tmp, "wt") as f:
+            json.dump(snapshot, f, indent=1)
+
+        os.replace(tmp, path)
+    except OSError as e:
+        print(f"Could not save config snapshot: {e}")
+
+
+def remove_snapshot(path: Path):
+    """Removes snapshot, e.g. if caching is disabled in the config."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
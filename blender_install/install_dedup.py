@@ -0,0 +1,215 @@
+import os
+import sys
+import json
+import argparse
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+INDEX_VERSION = 1
+INDEX_NAME = "index.json"
+OBJECTS_DIR = "objects"
+
+
+def hash_file(path: str) -> str:
+    """Computes sha256 of file content."""
+    h = hashlib.sha256()
+
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+
+    return h.hexdigest()
+
+
+def load_index(store: Path) -> Dict[str, List[Any]]:
+    """Loads index of already hashed files: path -> [size, mtime_ns, ino, object].
+    Files that didn't change since previous pass are not hashed again."""
+    try:
+        with open(Path(store, INDEX_NAME), "rt") as f:
+            index = json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+    if index.get("version") != INDEX_VERSION:
+        return {}
+
+    return index.get("files", {})
+
+
+def save_index(store: Path, files: Dict[str, List[Any]]):
+    """Atomically writes index of the store."""
+    tmp = Path(store, f"{INDEX_NAME}.tmp")
+
+    with open(tmp, "wt") as f:
+        json.dump({"version": INDEX_VERSION, "files": files}, f)
+
+    os.replace(tmp, Path(store, INDEX_NAME))
+
+
+def link_to_object(path: str, obj: Path):
+    """Atomically replaces file with hardlink to the store object."""
+    tmp = f"{path}.dedup"
+
+    if os.path.lexists(tmp):
+        os.unlink(tmp)
+
+    os.link(obj, tmp)
+    os.replace(tmp, path)
+
+
+def gc_store(store: Path) -> Tuple[int, int]:
+    """Removes objects nothing links to anymore, e.g. after old Blender version
+    was removed or overwritten.
+
+    Returns:
+    --------
+    int
+        Number of removed objects.
+    int
+        Bytes saved by all links to the remaining objects.
+    """
+    removed = 0
+    saved = 0
+
+    for rt, drs, fls in os.walk(Path(store, OBJECTS_DIR)):
+        for fl in fls:
+            p = os.path.join(rt, fl)
+            st = os.stat(p)
+
+            if st.st_nlink <= 1:
+                os.unlink(p)
+                removed += 1
+            else:
+                # One link is the object itself, one is the first real file
+                saved += st.st_size * (st.st_nlink - 2)
+
+    return removed, saved
+
+
+def dedup_tree(tree: Path, store: Path) -> Dict[str, int]:
+    """Replaces files of extracted portable Blender with hardlinks to content
+    addressed objects of the store, so identical files of different Blender
+    versions occupy disk space once. Files already present in the index with
+    unchanged stat are not hashed again, so only new versions are hashed.
+    Store must be on the same device with the tree.
+
+    Linked files share content, so they must be treated as read only, which is
+    the case for Blender datafiles, fonts, locales and Python stdlib.
+
+    Parameters:
+    -----------
+    tree : Path
+        Root of extracted portable Blender.
+    store : Path
+        Root of the store.
+
+    Returns:
+    --------
+    Dict[str, int]
+        Statistics of the pass.
+    """
+    objects = Path(store, OBJECTS_DIR)
+    os.makedirs(objects, exist_ok=True)
+
+    if os.stat(objects).st_dev != os.stat(tree).st_dev:
+        raise OSError(f"Store {store} and {tree} are on different devices")
+
+    index = load_index(store)
+    stats = {"files": 0, "hashed": 0, "linked": 0, "stored": 0, "saved": 0}
+    tree_prefix = os.path.join(str(tree), "")
+
+    # Drop entries of files removed from this tree since previous pass
+    for p in [p for p in index.keys() if p.startswith(tree_prefix)]:
+        if not os.path.lexists(p):
+            del index[p]
+
+    for rt, drs, fls in os.walk(tree):
+        for fl in fls:
+            path = os.path.join(rt, fl)
+            st = os.lstat(path)
+
+            if not os.path.isfile(path) or os.path.islink(path) or st.st_size == 0:
+                continue
+
+            stats["files"] += 1
+            prev = index.get(path)
+
+            if prev is not None and prev[:3] == [
+                st.st_size,
+                st.st_mtime_ns,
+                st.st_ino,
+            ]:
+                name = prev[3]
+            else:
+                # Mode is part of the object, hardlinks share permissions
+                name = f"{hash_file(path)}-{st.st_mode & 0o7777:o}"
+                stats["hashed"] += 1
+
+            obj = Path(objects, name[:2], name)
+
+            try:
+                ost = os.stat(obj)
+            except FileNotFoundError:
+                os.makedirs(obj.parent, exist_ok=True)
+                os.link(path, obj)
+                stats["stored"] += 1
+                ost = os.stat(obj)
+
+            if ost.st_ino != st.st_ino:
+                link_to_object(path, obj)
+                stats["linked"] += 1
+                stats["saved"] += st.st_size
+
+            index[path] = [ost.st_size, ost.st_mtime_ns, ost.st_ino, name]
+
+    save_index(store, index)
+    stats["gc"], stats["saved_total"] = gc_store(store)
+
+    return stats
+
+
+def dedup_portable_blender(tree: Path, store: Path):
+    """Runs dedup pass and reports saved space, failures are not fatal as the
+    tree stays fully usable without links."""
+    try:
+        stats = dedup_tree(tree, store)
+    except OSError as e:
+        print(f"Dedup of {tree} skipped: {e}")
+        return
+
+    mb = 1024 * 1024
+    print(
+        f"Dedup of {tree}: {stats['files']} files, {stats['hashed']} hashed, "
+        f"{stats['linked']} linked, {stats['saved'] / mb:.1f} MB saved by this "
+        f"pass, {stats['saved_total'] / mb:.1f} MB saved by the store"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Deduplicate extracted portable Blender trees with hardlinks",
+        add_help=True,
+    )
+    parser.add_argument(
+        "-s",
+        "--store",
+        type=Path,
+        required=True,
+        help="Store folder, must be on the same device with trees",
+    )
+    parser.add_argument(
+        "trees",
+        type=Path,
+        nargs="+",
+        help="Extracted portable Blender folders",
+    )
+
+    args = parser.parse_args()
+
+    for tree in args.trees:
+        if not tree.is_dir():
+            print(f"Not a folder: {tree}")
+            sys.exit(1)
+
+        dedup_portable_blender(tree.resolve(), args.store.resolve())
@@ -0,0 +1,506 @@
+import os
+import re
+import csv
+import json
+import time
+import shutil
+import zipfile
+import statistics
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from install_config import InstallConfig
+from install_platform import PLATFORM, EC
+from install_proc_utils import run_process, report_usage, rmtree_protected
+from install_trace import span, traced
+
+# Marker in the Blender folder of the node with the cache key of its archive
+ARCHIVE_MARKER = ".blender_install_archive"
+
+print_lock = threading.Lock()
+
+
+def log(node: str, message: str):
+    """Prints message prefixed with the node, lines of nodes don't interleave."""
+    with print_lock:
+        for line in message.splitlines():
+            print(f"[{node}] {line}", flush=True)
+
+
+def load_nodes(cfg: InstallConfig, nodes_file: Optional[Path]) -> List[Path]:
+    """Reads node roots from the file (one per line, # comments) or from
+    fleet_nodes of the config.
+
+    Returns:
+    --------
+    List[Path]
+        Root folders of the nodes, e.g. NFS mounts of their file systems.
+    """
+    if nodes_file is None:
+        return list(cfg.fleet_nodes)
+
+    nodes: List[Path] = []
+
+    with open(nodes_file, "rt") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+
+            if line:
+                nodes.append(Path(line).expanduser().absolute())
+
+    return nodes
+
+
+def node_path(root: Path, path: Path) -> Path:
+    """Maps absolute path of the config to the same path under node root."""
+    return Path(root, *path.absolute().parts[1:])
+
+
+def get_blender_python(cfg: InstallConfig) -> Path:
+    """Python executable of Blender."""
+    if PLATFORM == "Windows":
+        return Path(cfg.blender_python_dir, "bin", "python.exe")
+
+    return Path(cfg.blender_python_dir, "bin", f"python{cfg.blender_python_version}")
+
+
+def get_site_packages(cfg: InstallConfig) -> Path:
+    """site-packages of Blender Python."""
+    if PLATFORM == "Windows":
+        return Path(cfg.blender_python_dir, "lib", "site-packages")
+
+    return Path(
+        cfg.blender_python_dir,
+        "lib",
+        f"python{cfg.blender_python_version}",
+        "site-packages",
+    )
+
+
+def build_wheels(cfg: InstallConfig) -> List[Path]:
+    """Builds or downloads wheels of pip_modules once with Python of Blender,
+    so they match Python version and platform of the nodes.
+
+    Returns:
+    --------
+    List[Path]
+        Wheels in fleet_wheelhouse.
+    """
+    if len(cfg.pip_modules) == 0:
+        return []
+
+    python = str(get_blender_python(cfg))
+    wheelhouse = cfg.fleet_wheelhouse
+    os.makedirs(wheelhouse, exist_ok=True)
+
+    ec, so, se, er = run_process(
+        [python, "-m", "pip", "--version"], "pip is not found", 30, print_std=False
+    )
+
+    if ec != 0:
+        ec, so, se, er = run_process(
+            [python, "-m", "ensurepip", "-U"], "PIP installation failed", 120
+        )
+
+        if ec != 0:
+            raise Exception("pip is not available in Blender Python")
+
+    ec, so, se, er = run_process(
+        [python, "-m", "pip", "wheel", "-w", str(wheelhouse)] + cfg.pip_modules,
+        f"Could not build wheels: {cfg.pip_modules}",
+        cfg.install_pip_timeout * len(cfg.pip_modules),
+        print_std=False,
+    )
+
+    if ec != 0:
+        raise Exception(f"Could not build wheels:\n{se}")
+
+    # pip prints saved and already present wheels, everything in the
+    # wheelhouse may be stale, so take only the wheels of this run
+    wheels = []
+
+    for line in so.splitlines():
+        line = line.strip()
+
+        for prefix in ("Saved ", "File was already downloaded "):
+            if line.startswith(prefix) and line.endswith(".whl"):
+                wheels.append(Path(line[len(prefix) :].strip()).absolute())
+
+    return sorted(set(wheels)) if wheels else sorted(wheelhouse.glob("*.whl"))
+
+
+@traced("fleet central")
+def prepare_central(cfg: InstallConfig) -> Dict[str, Any]:
+    """Does the heavy work once: verifies and extracts Blender archive, builds
+    wheels and packages the addon.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Extracted Blender folder with its archive key, wheels and addon zip.
+    """
+    from install_package import package_addon_zip
+
+    central: Dict[str, Any] = {"blender": None, "archive_key": None}
+    t0 = time.perf_counter()
+
+    if cfg.blender_packed is not None and cfg.blender_unpack:
+        from checksum_file import checksum_file
+        from install_unpack_cache import get_cache_key, get_unpacked
+
+        source = Path(cfg.blender_packed)
+
+        if cfg.binaries_checksum:
+            cache = cfg.checksum_cache_path if cfg.checksum_cache else None
+
+            if not checksum_file(source, cache):
+                raise Exception("Archive is damaged or checksum is not provided")
+
+        profile = cfg.blender_extract_profile
+        central["blender"] = get_unpacked(
+            source, cfg.blender_unpack_cache_path, profile
+        )
+        central["archive_key"] = get_cache_key(source, profile)
+
+    central["wheels"] = build_wheels(cfg)
+    central["addon_zip"] = package_addon_zip(cfg)
+    central["time"] = time.perf_counter() - t0
+
+    print(
+        f"Central preparation done in {central['time']:.1f} s: "
+        f"{len(central['wheels'])} wheels, addon: {central['addon_zip']}"
+    )
+
+    return central
+
+
+def sync_blender(cfg: InstallConfig, central: Dict[str, Any], root: Path) -> bool:
+    """Materializes extracted Blender on the node, skipped if the node already
+    has Blender from the same archive.
+
+    Returns:
+    --------
+    bool
+        Files were copied.
+    """
+    if central["blender"] is None:
+        return False
+
+    target = node_path(root, cfg.blender_path.parent)
+    marker = Path(target, ARCHIVE_MARKER)
+
+    try:
+        if marker.read_text().strip() == central["archive_key"]:
+            return False
+    except OSError:
+        pass
+
+    if target.exists() and cfg.blender_overwrite:
+        # Same guard as local installs: only folders under allowed paths of
+        # the config, mapped to the node, are removed
+        allowed = {node_path(root, p) for p in cfg.addon_allowed_paths}
+        rmtree_protected(target, allowed)
+
+    from install_unpack_cache import materialize_tree
+
+    materialize_tree(central["blender"], target)
+    # Marker goes last, interrupted copy is repeated on the next run
+    marker.write_text(central["archive_key"])
+
+    return True
+
+
+def normalize_name(name: str) -> str:
+    """Project name as compared by pip, wheel file names escape - as _."""
+    return re.sub(r"[-_.]+", "_", name).lower()
+
+
+def remove_distribution(dist_info: Path, site_packages: Path):
+    """Uninstalls distribution by files listed in RECORD of its dist-info,
+    the way pip does on upgrade. Hardlinked files are unlinked, so trees
+    shared with the unpack cache are not modified."""
+    record = Path(dist_info, "RECORD")
+    files: List[Path] = []
+
+    if record.is_file():
+        with open(record, "rt", newline="") as f:
+            files = [Path(site_packages, row[0]) for row in csv.reader(f) if row]
+
+    root = Path(os.path.normpath(site_packages.absolute()))
+    dirs = set()
+
+    for fp in files:
+        fp = Path(os.path.normpath(fp.absolute()))
+
+        # Scripts are recorded relative to site-packages, they were not installed
+        if root not in fp.parents:
+            continue
+
+        if fp.is_file() or fp.is_symlink():
+            os.unlink(fp)
+
+        dirs.update(p for p in fp.parents if root in p.parents)
+
+    shutil.rmtree(dist_info, True)
+
+    # Deepest first, folders shared with other distributions stay
+    for d in sorted(dirs, key=lambda p: len(p.parts), reverse=True):
+        try:
+            os.rmdir(d)
+        except OSError:
+            pass
+
+
+def install_wheel(wheel: Path, site_packages: Path) -> bool:
+    """Installs wheel by extracting it to site-packages, the way pip does for
+    purelib/platlib. Scripts and headers of the wheel are not installed. Other
+    installed version of the project is removed first. Files are written
+    through temporary files, so files hardlinked to the unpack cache are
+    replaced rather than modified.
+
+    Returns:
+    --------
+    bool
+        Wheel was installed, False if it's already installed.
+    """
+    # name-version-...whl -> name-version.dist-info
+    name, version = wheel.name.split("-")[0:2]
+    dist_info = Path(site_packages, f"{name}-{version}.dist-info")
+
+    if dist_info.is_dir():
+        return False
+
+    for old in site_packages.glob("*.dist-info"):
+        if normalize_name(old.stem.rsplit("-", 1)[0]) == normalize_name(name):
+            remove_distribution(old, site_packages)
+
+    with zipfile.ZipFile(wheel) as zf:
+        # dist-info goes last, it marks the wheel as installed
+        members = sorted(zf.infolist(), key=lambda m: ".dist-info/" in m.filename)
+
+        for member in members:
+            parts = member.filename.split("/")
+
+            if len(parts) > 2 and parts[0].endswith(".data"):
+                if parts[1] not in ("purelib", "platlib"):
+                    continue
+
+                parts = parts[2:]
+
+            dst = Path(site_packages, *parts)
+
+            if member.is_dir():
+                os.makedirs(dst, exist_ok=True)
+                continue
+
+            os.makedirs(dst.parent, exist_ok=True)
+
+            tmp = f"{dst}.{os.getpid()}.tmp"
+
+            with zf.open(member) as src, open(tmp, "wb") as out:
+                shutil.copyfileobj(src, out)
+
+            # Keep executable bit of native helpers
+            mode = (member.external_attr >> 16) & 0o777
+
+            if mode:
+                os.chmod(tmp, mode)
+
+            os.replace(tmp, dst)
+
+    return True
+
+
+def sync_addon(cfg: InstallConfig, zip_path: Path, root: Path):
+    """Extracts packaged addon next to the addon folder of the node and swaps
+    it in, so Blender on the node never sees partially copied addon."""
+    target = node_path(root, cfg.addon_path)
+    parent = target.parent
+    tmp = Path(parent, f".{target.name}.fleet.tmp")
+    old = Path(parent, f".{target.name}.fleet.old")
+
+    os.makedirs(parent, exist_ok=True)
+    shutil.rmtree(tmp, True)
+    shutil.rmtree(old, True)
+
+    with zipfile.ZipFile(zip_path) as zf:
+        zf.extractall(tmp)
+
+    # Zip contains <addon_name>/..., addon folder of the node may be named
+    # differently
+    extracted = Path(tmp, cfg.addon_name)
+
+    if target.is_symlink() or target.is_file():
+        os.unlink(target)
+    elif target.exists():
+        os.rename(target, old)
+
+    os.rename(extracted, target)
+    shutil.rmtree(tmp, True)
+    shutil.rmtree(old, True)
+
+
+def install_node(
+    cfg: InstallConfig, central: Dict[str, Any], root: Path
+) -> Dict[str, Any]:
+    """Installs to a single node with retries.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Node root, status, attempts, time of every step and the last error.
+    """
+    node = root.name or str(root)
+    result: Dict[str, Any] = {"node": str(root), "ok": False, "attempts": 0}
+    t0 = time.perf_counter()
+
+    with span("fleet node", "fleet", node=str(root)) as args:
+        for attempt in range(cfg.fleet_retries + 1):
+            result["attempts"] = args["attempts"] = attempt + 1
+            steps: Dict[str, float] = {}
+
+            try:
+                if not root.is_dir():
+                    raise OSError(f"Node root is not available: {root}")
+
+                ts = time.perf_counter()
+                copied = sync_blender(cfg, central, root)
+                steps["blender"] = time.perf_counter() - ts
+
+                ts = time.perf_counter()
+                site_packages = node_path(root, get_site_packages(cfg))
+                n_wheels = sum(
+                    install_wheel(w, site_packages) for w in central["wheels"]
+                )
+                steps["wheels"] = time.perf_counter() - ts
+
+                ts = time.perf_counter()
+                sync_addon(cfg, central["addon_zip"], root)
+                steps["addon"] = time.perf_counter() - ts
+
+                result["ok"] = True
+                result.pop("error", None)
+                log(
+                    node,
+                    f"installed in {sum(steps.values()):.1f} s "
+                    f"(blender {'copied' if copied else 'up to date'}, "
+                    f"{n_wheels} wheels installed)",
+                )
+                break
+
+            except Exception as e:
+                result["error"] = f"{type(e).__name__}: {e}"
+                log(node, f"attempt {attempt + 1} failed: {result['error']}")
+
+                if attempt < cfg.fleet_retries:
+                    time.sleep(cfg.fleet_retry_delay * (attempt + 1))
+
+            finally:
+                result["steps"] = steps
+
+    result["time"] = time.perf_counter() - t0
+
+    return result
+
+
+def report_stragglers(results: List[Dict[str, Any]], factor: float) -> List[str]:
+    """Prints per-node timings sorted by time and marks nodes slower than
+    factor * median, they usually point to slow mounts or overloaded nodes.
+
+    Returns:
+    --------
+    List[str]
+        Stragglers.
+    """
+    times = [r["time"] for r in results if r["ok"]]
+    median = statistics.median(times) if times else 0.0
+    stragglers = []
+
+    print(f"{'node':40} {'status':6} {'tries':>5} {'time, s':>8} {'steps, s':>24}")
+
+    for r in sorted(results, key=lambda r: r["time"], reverse=True):
+        straggler = r["ok"] and median > 0 and r["time"] > factor * median
+        status = ("SLOW" if straggler else "OK") if r["ok"] else "FAIL"
+        steps = " ".join(f"{k[0]}:{v:.1f}" for k, v in r["steps"].items())
+        print(
+            f"{r['node'][-40:]:40} {status:6} {r['attempts']:5} "
+            f"{r['time']:8.1f} {steps:>24}"
+        )
+
+        if straggler:
+            stragglers.append(r["node"])
+
+        if not r["ok"]:
+            print(f"    {r.get('error', '')}")
+
+    print(
+        f"Nodes: {len(results)}, failed: {sum(not r['ok'] for r in results)}, "
+        f"median: {median:.1f} s, stragglers (> {factor:g}x median): "
+        f"{len(stragglers)}"
+    )
+
+    return stragglers
+
+
+def run_fleet(cfg: InstallConfig, nodes: List[Path]) -> int:
+    """Prepares installation centrally and pushes it to every node root with
+    at most fleet_jobs nodes at a time.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Parsed and validated config, paths are mapped to node roots.
+    nodes : List[Path]
+        Root folders of the nodes.
+
+    Returns:
+    --------
+    int
+        0 if all nodes are installed.
+    """
+    if len(nodes) == 0:
+        print("No fleet nodes provided")
+        return EC.CONFIG_NOT_PROVIDED.value
+
+    try:
+        central = prepare_central(cfg)
+    except Exception as e:
+        print(f"Central preparation failed: {e}")
+        return EC.INSTALLATION_FAILED.value
+
+    t0 = time.perf_counter()
+    jobs = max(1, min(cfg.fleet_jobs, len(nodes)))
+    print(f"Installing to {len(nodes)} nodes, {jobs} at a time")
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(lambda n: install_node(cfg, central, n), nodes))
+
+    stragglers = report_stragglers(results, cfg.fleet_straggler_factor)
+    # Children run only in the central preparation
+    report_usage()
+    wall = time.perf_counter() - t0
+    print(f"Fleet installation finished in {wall:.1f} s")
+
+    os.makedirs(cfg.fleet_report.parent, exist_ok=True)
+
+    with open(cfg.fleet_report, "wt") as f:
+        json.dump(
+            {
+                "central": central["time"],
+                "wall": wall,
+                "jobs": jobs,
+                "nodes": results,
+                "stragglers": stragglers,
+            },
+            f,
+            indent=1,
+        )
+
+    print(f"Fleet report: {cfg.fleet_report}")
+
+    if all(r["ok"] for r in results):
+        return 0
+
+    return EC.INSTALLATION_FAILED.value
@@ -0,0 +1,246 @@
+import os
+import glob
+import json
+import hashlib
+import platform
+from typing import Any, Dict, List, Optional
+
+DIR_PCI = "/sys/bus/pci/devices"
+# PCI classes of display controllers (0x03) and processing accelerators (0x12)
+PCI_COMPUTE_CLASSES = ("0x03", "0x12")
+# Files holding versions of GPU drivers, missing ones are skipped
+DRIVER_VERSION_FILES = (
+    "/sys/module/nvidia/version",
+    "/proc/driver/nvidia/version",
+    "/sys/module/amdgpu/version",
+    "/sys/module/i915/version",
+    "/sys/module/xe/version",
+)
+
+
+def read_text(path: str) -> Optional[str]:
+    """Reads small sysfs/procfs file, None if it's not available."""
+    try:
+        with open(path, "rt") as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def get_pci_devices() -> List[Dict[str, str]]:
+    """Lists GPUs and accelerators from /sys/bus/pci, empty list on systems
+    without sysfs.
+
+    Returns:
+    --------
+    List[Dict[str, str]]
+        Address, vendor, device, class and bound driver of every device.
+    """
+    devices: List[Dict[str, str]] = []
+
+    for dev in sorted(glob.glob(os.path.join(DIR_PCI, "*"))):
+        cls = read_text(os.path.join(dev, "class")) or ""
+
+        if not cls.startswith(PCI_COMPUTE_CLASSES):
+            continue
+
+        driver = os.path.join(dev, "driver")
+        devices.append(
+            {
+                "address": os.path.basename(dev),
+                "vendor": read_text(os.path.join(dev, "vendor")) or "",
+                "device": read_text(os.path.join(dev, "device")) or "",
+                "class": cls,
+                "driver": (
+                    os.path.basename(os.readlink(driver))
+                    if os.path.islink(driver)
+                    else ""
+                ),
+            }
+        )
+
+    return devices
+
+
+def get_driver_versions() -> Dict[str, str]:
+    """Reads versions of loaded GPU drivers."""
+    versions: Dict[str, str] = {}
+
+    for path in DRIVER_VERSION_FILES:
+        ver = read_text(path)
+
+        if ver is not None:
+            versions[path] = ver
+
+    return versions
+
+
+def hardware_fingerprint(blender_version: str) -> str:
+    """Fingerprint of everything compute device enumeration of Blender depends
+    on: GPUs on the PCI bus, their drivers and Blender version. Systems without
+    sysfs fall back to platform information.
+
+    Parameters:
+    -----------
+    blender_version : str
+        Version of Blender.
+
+    Returns:
+    --------
+    str
+        Hex digest.
+    """
+    info: Dict[str, Any] = {
+        "blender": blender_version,
+        "pci": get_pci_devices(),
+        "drivers": get_driver_versions(),
+    }
+
+    if not os.path.isdir(DIR_PCI):
+        info["platform"] = platform.platform()
+        info["machine"] = platform.machine()
+
+    return hashlib.sha256(json.dumps(info, sort_keys=True).encode("utf8")).hexdigest()
+
+
+def parse_cpu_list(cpulist: str) -> List[int]:
+    """Parses sysfs CPU list format, e.g. "0-3,8-11"."""
+    cpus: List[int] = []
+
+    for part in cpulist.strip().split(","):
+        if not part:
+            continue
+
+        if "-" in part:
+            lo, hi = part.split("-", 1)
+            cpus.extend(range(int(lo), int(hi) + 1))
+        else:
+            cpus.append(int(part))
+
+    return cpus
+
+
+def read_meminfo(path: str = "/proc/meminfo") -> Dict[str, int]:
+    """Reads meminfo file, values are in bytes."""
+    info: Dict[str, int] = {}
+    text = read_text(path) or ""
+
+    for line in text.splitlines():
+        # Node meminfo lines are prefixed with "Node N"
+        parts = line.replace("Node ", "").split()
+
+        if len(parts) >= 2 and parts[-1] == "kB":
+            info[parts[-3].rstrip(":")] = int(parts[-2]) * 1024
+
+    return info
+
+
+def get_cpu_topology(
+    proc: str = "/proc", sys_cpu: str = "/sys/devices/system"
+) -> Dict[str, Any]:
+    """Detects CPU cores, SMT, NUMA nodes and memory of the node. Paths can be
+    pointed to a copy of /proc and /sys to test the logic on other machines.
+
+    Parameters:
+    -----------
+    proc : str
+        Root of procfs.
+    sys_cpu : str
+        Root of /sys/devices/system.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        logical, cores, smt, numa (node -> CPUs), numa_memory (node -> bytes),
+        mem_total and mem_available (bytes).
+    """
+    if hasattr(os, "sched_getaffinity") and proc == "/proc":
+        logical = len(os.sched_getaffinity(0))
+    else:
+        logical = os.cpu_count() or 1
+
+    # Unique (physical id, core id) pairs are physical cores
+    cores = set()
+    phys = "0"
+
+    for line in (read_text(os.path.join(proc, "cpuinfo")) or "").splitlines():
+        key, _, value = line.partition(":")
+        key = key.strip()
+
+        if key == "physical id":
+            phys = value.strip()
+        elif key == "core id":
+            cores.add((phys, value.strip()))
+
+    smt_active = read_text(os.path.join(sys_cpu, "cpu", "smt", "active"))
+    n_cores = len(cores) if len(cores) > 0 else logical
+
+    numa: Dict[int, List[int]] = {}
+    numa_memory: Dict[int, int] = {}
+
+    for node in sorted(glob.glob(os.path.join(sys_cpu, "node", "node[0-9]*"))):
+        idx = int(os.path.basename(node)[4:])
+        numa[idx] = parse_cpu_list(read_text(os.path.join(node, "cpulist")) or "")
+        numa_memory[idx] = read_meminfo(os.path.join(node, "meminfo")).get(
+            "MemTotal", 0
+        )
+
+    meminfo = read_meminfo(os.path.join(proc, "meminfo"))
+
+    return {
+        "logical": logical,
+        "cores": n_cores,
+        "smt": smt_active == "1" if smt_active is not None else logical > n_cores,
+        "numa": numa,
+        "numa_memory": numa_memory,
+        "mem_total": meminfo.get("MemTotal", 0),
+        "mem_available": meminfo.get("MemAvailable", meminfo.get("MemTotal", 0)),
+    }
+
+
+def cpu_render_settings(
+    topology: Dict[str, Any], numa_node: Optional[int] = None
+) -> Dict[str, Any]:
+    """Derives Cycles settings for CPU-only render node.
+
+    Cycles benefits from SMT, so all logical CPUs (of the NUMA node if it's
+    picked) are used. Tiles and persistent data trade memory for speed, so
+    they follow available memory: small tiles limit memory of the render
+    buffers, persistent data keeps scene between frames of animation.
+
+    Parameters:
+    -----------
+    topology : Dict[str, Any]
+        Result of get_cpu_topology.
+    numa_node : Optional[int]
+        NUMA node renders are launched on.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        threads, tile_size, use_persistent_data and cpus of the NUMA node.
+    """
+    gb = 1024**3
+    cpus: List[int] = []
+    memory = topology["mem_available"]
+
+    if numa_node is not None and numa_node in topology["numa"]:
+        cpus = topology["numa"][numa_node]
+        # Memory of the other nodes is remote, don't count on it
+        memory = min(memory, topology["numa_memory"].get(numa_node) or memory)
+
+    threads = len(cpus) if cpus else topology["logical"]
+
+    if memory < 8 * gb:
+        tile_size = 512
+    elif memory < 16 * gb:
+        tile_size = 1024
+    else:
+        tile_size = 2048
+
+    return {
+        "threads": threads,
+        "tile_size": tile_size,
+        "use_persistent_data": memory >= 16 * gb,
+        "cpus": cpus,
+    }
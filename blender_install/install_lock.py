@@ -0,0 +1,131 @@
+import os
+import time
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Iterator
+
+from install_platform import PLATFORM
+from install_trace import span
+
+# Set BLENDER_INSTALL_NO_LOCKS=1 to disable locks, e.g. for caches on
+# filesystems without working flock, inherited by target workers
+LOCKS_ENV = "BLENDER_INSTALL_NO_LOCKS"
+
+
+def lock_path(path: Path) -> Path:
+    """Lock file of a folder or file: hidden file next to it, so the lock
+    outlives removal and recreation of the folder itself."""
+    return Path(path.parent, f".{path.name}.lock")
+
+
+if PLATFORM == "Windows":
+    import msvcrt
+    import ctypes
+    from ctypes import wintypes
+
+    LOCKFILE_FAIL_IMMEDIATELY = 0x1
+    LOCKFILE_EXCLUSIVE_LOCK = 0x2
+    ERROR_LOCK_VIOLATION = 33
+
+    class OVERLAPPED(ctypes.Structure):
+        _fields_ = [
+            ("Internal", ctypes.c_void_p),
+            ("InternalHigh", ctypes.c_void_p),
+            ("Offset", wintypes.DWORD),
+            ("OffsetHigh", wintypes.DWORD),
+            ("hEvent", wintypes.HANDLE),
+        ]
+
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+
+    def lock_fd(fd: int, shared: bool, blocking: bool) -> bool:
+        # LockFileEx blocks in the kernel like flock, msvcrt.locking would
+        # retry every second and has no shared mode
+        flags = 0 if shared else LOCKFILE_EXCLUSIVE_LOCK
+
+        if not blocking:
+            flags |= LOCKFILE_FAIL_IMMEDIATELY
+
+        ok = kernel32.LockFileEx(
+            wintypes.HANDLE(msvcrt.get_osfhandle(fd)),
+            flags,
+            0,
+            0xFFFFFFFF,
+            0xFFFFFFFF,
+            ctypes.byref(OVERLAPPED()),
+        )
+
+        if ok:
+            return True
+
+        error = ctypes.get_last_error()
+
+        if not blocking and error == ERROR_LOCK_VIOLATION:
+            return False
+
+        raise ctypes.WinError(error)
+
+    def unlock_fd(fd: int):
+        kernel32.UnlockFileEx(
+            wintypes.HANDLE(msvcrt.get_osfhandle(fd)),
+            0,
+            0xFFFFFFFF,
+            0xFFFFFFFF,
+            ctypes.byref(OVERLAPPED()),
+        )
+
+else:
+    import fcntl
+
+    def lock_fd(fd: int, shared: bool, blocking: bool) -> bool:
+        op = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+
+        try:
+            fcntl.flock(fd, op if blocking else op | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+
+        return True
+
+    def unlock_fd(fd: int):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+@contextmanager
+def file_lock(path: Path, shared: bool = False) -> Iterator[None]:
+    """Holds advisory lock of the file for the block: exclusive for writers,
+    shared for readers, so readers of a cache run concurrently and a writer
+    waits for them. Waiting processes sleep in the kernel until the lock is
+    released, locks of crashed processes are released by the OS.
+
+    Parameters:
+    -----------
+    path : Path
+        Lock file, created if missing and never removed, see lock_path.
+    shared : bool
+        Take shared lock instead of exclusive one.
+    """
+    if os.environ.get(LOCKS_ENV):
+        yield
+        return
+
+    os.makedirs(path.parent, exist_ok=True)
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o666)
+
+    try:
+        if not lock_fd(fd, shared, False):
+            mode = "shared" if shared else "exclusive"
+            print(f"Waiting for {mode} lock held by other install: {path}")
+            t0 = time.perf_counter()
+
+            with span("lock wait", "lock", lock=str(path), shared=shared):
+                lock_fd(fd, shared, True)
+
+            print(f"Lock acquired after {time.perf_counter() - t0:.1f} s")
+
+        try:
+            yield
+        finally:
+            unlock_fd(fd)
+    finally:
+        os.close(fd)
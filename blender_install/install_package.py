@@ -0,0 +1,285 @@
+import os
+import zlib
+import struct
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Deque, List, NamedTuple, Tuple
+from install_config import InstallConfig
+from install_utils import get_ignore_patterns
+
+# Already compressed formats, deflating them again only burns CPU
+STORED_SUFFIXES = {
+    ".zip",
+    ".whl",
+    ".gz",
+    ".tgz",
+    ".xz",
+    ".bz2",
+    ".zst",
+    ".7z",
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".webp",
+    ".mp3",
+    ".ogg",
+    ".mp4",
+    ".mkv",
+    ".webm",
+}
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+# Fixed timestamp (1980-01-01 00:00) in DOS format, earliest time zip supports
+DOS_TIME = 0
+DOS_DATE = (1 << 5) | 1
+# Bit 11 - file names are UTF-8
+ZIP_FLAGS = 0x0800
+ZIP_VERSION = 20
+# Made by Unix, so external attributes carry file permissions
+ZIP_VERSION_MADE_BY = (3 << 8) | ZIP_VERSION
+ZIP_MAX = 0xFFFFFFFF
+CHUNK_SIZE = 1 << 20
+
+
+class ZipEntry(NamedTuple):
+    """Compressed member of the archive waiting to be written."""
+
+    name: bytes
+    method: int
+    crc: int
+    size: int
+    csize: int
+    data: bytes
+    mode: int
+
+
+def collect_addon_files(root: Path, ignore: List[str]) -> List[str]:
+    """Lists files of the addon tree in deterministic order, names matching
+    ignore patterns are skipped the same way shutil.copytree skips them.
+
+    Parameters:
+    -----------
+    root : Path
+        Root of the addon.
+    ignore : List[str]
+        Glob patterns of names to skip.
+
+    Returns:
+    --------
+    List[str]
+        Sorted relative posix paths of files.
+    """
+    files: List[str] = []
+
+    for rt, drs, fls in os.walk(root):
+        drs[:] = [d for d in drs if not any(fnmatch(d, pat) for pat in ignore)]
+
+        for fl in fls:
+            if any(fnmatch(fl, pat) for pat in ignore):
+                continue
+
+            files.append(Path(rt, fl).relative_to(root).as_posix())
+
+    return sorted(files)
+
+
+def compress_file(path: Path, arcname: str, level: int) -> ZipEntry:
+    """Reads and compresses single file. zlib releases GIL, so it's run in
+    parallel in threads.
+
+    Parameters:
+    -----------
+    path : Path
+        File to compress.
+    arcname : str
+        Name of the file inside the archive.
+    level : int
+        Deflate compression level.
+
+    Returns:
+    --------
+    ZipEntry
+        Entry ready to be written.
+    """
+    store = path.suffix.lower() in STORED_SUFFIXES
+    comp = None if store else zlib.compressobj(level, zlib.DEFLATED, -15)
+    crc = 0
+    size = 0
+    chunks: List[bytes] = []
+    raw: List[bytes] = []
+
+    with open(path, "rb") as f:
+        while chunk := f.read(CHUNK_SIZE):
+            crc = zlib.crc32(chunk, crc)
+            size += len(chunk)
+
+            if comp is not None:
+                chunks.append(comp.compress(chunk))
+
+            raw.append(chunk)
+
+    data = b"".join(raw)
+    method = ZIP_STORED
+
+    if comp is not None:
+        chunks.append(comp.flush())
+        deflated = b"".join(chunks)
+
+        # Incompressible data is stored as is
+        if len(deflated) < size:
+            data = deflated
+            method = ZIP_DEFLATED
+
+    # Only the executable bit is kept, so umask and checkout don't change output
+    mode = 0o100755 if os.stat(path).st_mode & 0o100 else 0o100644
+
+    return ZipEntry(arcname.encode("utf8"), method, crc, size, len(data), data, mode)
+
+
+def write_entry(out, entry: ZipEntry) -> Tuple[int, ZipEntry]:
+    """Writes local header and data of the entry.
+
+    Returns:
+    --------
+    int
+        Offset of the local header.
+    ZipEntry
+        Written entry without data, only metadata is kept for central directory.
+    """
+    if max(entry.size, entry.csize, out.tell()) >= ZIP_MAX:
+        raise Exception(f"{entry.name.decode()}: zip64 archives are not supported")
+
+    offset = out.tell()
+    out.write(
+        struct.pack(
+            "<IHHHHHIIIHH",
+            0x04034B50,
+            ZIP_VERSION,
+            ZIP_FLAGS,
+            entry.method,
+            DOS_TIME,
+            DOS_DATE,
+            entry.crc,
+            entry.csize,
+            entry.size,
+            len(entry.name),
+            0,
+        )
+    )
+    out.write(entry.name)
+    out.write(entry.data)
+
+    return offset, entry._replace(data=b"")
+
+
+def write_central_directory(out, written: List[Tuple[int, ZipEntry]]):
+    """Writes central directory and end of central directory record."""
+    cd_offset = out.tell()
+
+    for offset, e in written:
+        out.write(
+            struct.pack(
+                "<IHHHHHHIIIHHHHHII",
+                0x02014B50,
+                ZIP_VERSION_MADE_BY,
+                ZIP_VERSION,
+                ZIP_FLAGS,
+                e.method,
+                DOS_TIME,
+                DOS_DATE,
+                e.crc,
+                e.csize,
+                e.size,
+                len(e.name),
+                0,
+                0,
+                0,
+                0,
+                e.mode << 16,
+                offset,
+            )
+        )
+        out.write(e.name)
+
+    cd_size = out.tell() - cd_offset
+    out.write(
+        struct.pack(
+            "<IHHHHIIH",
+            0x06054B50,
+            0,
+            0,
+            len(written),
+            len(written),
+            cd_size,
+            cd_offset,
+            0,
+        )
+    )
+
+
+def package_addon_zip(cfg: InstallConfig) -> Path:
+    """Streams filtered addon tree into zip that can be installed with Blender's
+    "Install from file". Nothing is staged on disk, entries are compressed in
+    parallel but written in sorted order with fixed timestamps and permissions,
+    so identical inputs produce byte-identical archives.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Object with parsed and verified configuration.
+
+    Returns:
+    --------
+    Path
+        Path of the created archive.
+    """
+    root = cfg.current_folder
+    target = cfg.addon_zip_path
+    ignore = get_ignore_patterns(cfg)
+    files = collect_addon_files(root, ignore)
+
+    # Archive may be placed inside the addon folder, don't pack it into itself
+    try:
+        arc_self = target.resolve().relative_to(root).as_posix()
+        files = [f for f in files if f not in {arc_self, f"{arc_self}.tmp"}]
+    except ValueError:
+        pass
+
+    if len(files) >= 0xFFFF:
+        raise Exception("Too many files for zip without zip64 support")
+
+    os.makedirs(target.parent, exist_ok=True)
+    tmp = Path(f"{target}.tmp")
+    workers = os.cpu_count() or 1
+    written: List[Tuple[int, ZipEntry]] = []
+    pending: Deque[Future] = deque()
+
+    print(f"Packaging {len(files)} files to: {target}")
+
+    with ThreadPoolExecutor(workers) as ex, open(tmp, "wb") as out:
+        for rel in files:
+            pending.append(
+                ex.submit(
+                    compress_file,
+                    Path(root, rel),
+                    f"{cfg.addon_name}/{rel}",
+                    cfg.addon_zip_level,
+                )
+            )
+
+            # Bounded window keeps memory usage low for large trees
+            if len(pending) >= workers * 2:
+                written.append(write_entry(out, pending.popleft().result()))
+
+        while pending:
+            written.append(write_entry(out, pending.popleft().result()))
+
+        write_central_directory(out, written)
+
+    os.replace(tmp, target)
+    print(f"Addon packaged: {target} ({target.stat().st_size} bytes)")
+
+    return target
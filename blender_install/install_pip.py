@@ -11,6 +11,7 @@ if dircur not in sys.path:
 
 from install_proc_utils import run_process
 from install_platform import EC
+from install_trace import traced
 
 # Get the data about Python from sys environment
 python_blender = str(Path(sys.executable).resolve(True))
@@ -19,6 +20,7 @@ blend_cwd = str(os.path.dirname(python_blender))
 python_target = str(Path(sys.prefix, "lib", python_dir, "site-packages"))
 
 
+@traced("ensurepip", "blender")
 def install_pip(timeout: float) -> Tuple[Optional[int], str, str, Optional[Exception]]:
     """Picks environment of the blender instance that run it and runs ensurepip for
     this environment.
@@ -78,6 +80,7 @@ def install_pip_modules(modules: List[str], timeout: float) -> bool:
     return False
 
 
+@traced("pip module", "blender")
 def install_module(module: str, target: str, timeout: float) -> Optional[int]:
     """Installs PIP module to the target environment.
 
@@ -1,4 +1,5 @@
-import platform
+import os
+import sys
 from enum import Enum, unique
 
 
@@ -15,8 +16,34 @@ class EC(Enum):
     PLATFORM_NOT_SUPPORTED = 5
     ADDON_ACTIVATION_FAILED = 6
     CONFIG_NOT_PROVIDED = 7
+    ADDON_STARTUP_BUDGET_EXCEEDED = 8
     CUSTOM_SCRIPT_FAILED = 10
     UNKNOWN_ERROR = 42
 
 
-PLATFORM = platform.system()
+# Written next to the import bundle by install_bundle.py, both are keyed by
+# Python version, see python_keyed: name of the bundle on the first line, then
+# "size mtime_ns path" of every bundled addon source. The addon loads the
+# bundle only while its sources are unchanged, see __init__.py
+BUNDLE_MARKER = "addon_bundle.txt"
+
+
+def python_keyed(
+    name: str, version: str = f"{sys.version_info[0]}{sys.version_info[1]}"
+) -> str:
+    """Name of file built for the Python version, e.g. addon_bundle-py311.zip.
+    Targets with different Blender versions share the addon folder, bytecode
+    of one Python is not loaded by another. Pass version="*" for a glob."""
+    root, ext = os.path.splitext(name)
+    return f"{root}-py{version}{ext}"
+
+
+# sys.platform covers supported systems, platform module is slow to import
+PLATFORMS = {"linux": "Linux", "darwin": "Darwin", "win32": "Windows"}
+
+if sys.platform in PLATFORMS:
+    PLATFORM = PLATFORMS[sys.platform]
+else:
+    import platform
+
+    PLATFORM = platform.system()
@@ -1,9 +1,30 @@
 import os
+import time
 import shutil
+import threading
 from subprocess import Popen, PIPE
 from pathlib import Path
-from typing import List, Tuple, Union, Set, Optional
+from typing import Dict, List, NamedTuple, Tuple, Union, Set, Optional
 from install_platform import PLATFORM
+from install_trace import span, current_stage
+
+# Resources of the children summed by stage, see record_usage
+child_usage: Dict[str, Dict[str, float]] = {}
+usage_lock = threading.Lock()
+
+
+class ProcResult(NamedTuple):
+    """Result of run_process_ex, the first four fields are the result of
+    run_process."""
+
+    exit_code: Optional[int]
+    stdout: str
+    stderr: str
+    error: Optional[Exception]
+    # user, sys (s), max_rss, read_bytes, write_bytes (bytes), None if the
+    # platform doesn't report them
+    usage: Optional[Dict[str, float]] = None
+    wall: float = 0.0
 
 
 def executable_exists(name: Union[str, Path]) -> bool:
@@ -23,6 +44,68 @@ def executable_exists(name: Union[str, Path]) -> bool:
     return shutil.which(str(name), mode=os.X_OK) is not None
 
 
+class AccountedPopen(Popen):
+    """Popen which collects resource usage of the child when it is reaped.
+    rusage of wait4 includes the descendants waited by the child (e.g. pip run
+    by Blender), /proc/<pid>/io is read on Linux while the exited child is not
+    reaped yet. usage stays None on platforms without wait4."""
+
+    usage: Optional[Dict[str, float]] = None
+
+    def _try_wait(self, wait_flags):
+        # Every wait of Popen (wait, poll, communicate) reaps the child here
+        if not hasattr(os, "wait4"):
+            return super()._try_wait(wait_flags)
+
+        io: Dict[str, float] = {}
+
+        if hasattr(os, "waitid"):
+            try:
+                exited = os.waitid(
+                    os.P_PID, self.pid, os.WEXITED | os.WNOWAIT | wait_flags
+                )
+            except ChildProcessError:
+                exited = None
+
+            if exited is not None:
+                io = read_proc_io(self.pid)
+
+        try:
+            pid, status, ru = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            # Same as Popen: the child was reaped elsewhere (SIGCLD ignored)
+            return (self.pid, 0)
+
+        if pid == self.pid:
+            self.usage = {
+                "user": ru.ru_utime,
+                "sys": ru.ru_stime,
+                # Kilobytes on Linux, bytes on macOS
+                "max_rss": ru.ru_maxrss * (1 if PLATFORM == "Darwin" else 1024),
+                **io,
+            }
+
+        return (pid, status)
+
+
+def read_proc_io(pid: int) -> Dict[str, float]:
+    """Bytes read from and written to storage by the process and its waited
+    descendants, empty if /proc is not available."""
+    io: Dict[str, float] = {}
+
+    try:
+        with open(f"/proc/{pid}/io", "rt") as f:
+            for line in f:
+                key, value = line.split(":")
+
+                if key in ("read_bytes", "write_bytes"):
+                    io[key] = int(value)
+    except OSError:
+        pass
+
+    return io
+
+
 def run_popen(
     command: List[str], wd=os.getcwd(), stdin=PIPE, stdout=PIPE, stderr=PIPE
 ) -> Popen:
@@ -46,7 +129,7 @@ def run_popen(
     Popen
         Popen instance.
     """
-    return Popen(
+    return AccountedPopen(
         args=command,
         cwd=wd,
         stdin=stdin,
@@ -84,6 +167,19 @@ def comm_popen(
     exception : Optional[Exception]
         Exception that occured during the run.
     """
+    return comm_popen_ex(proc, error_message, t, print_std)[:4]
+
+
+def comm_popen_ex(
+    proc: Popen, error_message: Optional[str], t=360, print_std=True
+) -> ProcResult:
+    """comm_popen which also returns resource usage of the child.
+
+    Returns:
+    --------
+    ProcResult
+        Exit code, stdout, stderr, exception and usage of the child.
+    """
     exit_code = None
     outs = ("", "")
     error = None
@@ -114,11 +210,12 @@ def comm_popen(
             if error is not None:
                 print(f"ERROR: {error}")
 
-        return (
+        return ProcResult(
             int(exit_code) if exit_code is not None else None,
             outs[0],
             outs[1],
             error,
+            getattr(proc, "usage", None),
         )
 
 
@@ -158,7 +255,137 @@ def run_process(
     exception : Optional[Exception]
         Exception that occured during the run.
     """
-    return comm_popen(run_popen(command, wd), error_message, timeout, print_std)
+    return run_process_ex(command, error_message, timeout, wd, print_std)[:4]
+
+
+def run_process_ex(
+    command: List[str],
+    error_message="Could not run program",
+    timeout=360,
+    wd=os.getcwd(),
+    print_std=True,
+) -> ProcResult:
+    """run_process which also returns resource usage of the child and adds it
+    to the usage of the current stage.
+
+    Returns:
+    --------
+    ProcResult
+        Exit code, stdout, stderr, exception, usage and wall time of the child.
+    """
+    stage = current_stage()
+    t0 = time.perf_counter()
+
+    with span(
+        process_name(command), "process", command=" ".join(str(c) for c in command)
+    ) as args:
+        result = comm_popen_ex(
+            run_popen(command, wd), error_message, timeout, print_std
+        )
+        result = result._replace(wall=time.perf_counter() - t0)
+        args["exit_code"] = result.exit_code
+        args["usage"] = result.usage
+
+    record_usage(stage, result)
+
+    return result
+
+
+def record_usage(stage: str, result: ProcResult):
+    """Adds usage of the child to the stage: times and bytes are summed, max
+    RSS is the maximum over the children."""
+    with usage_lock:
+        total = child_usage.setdefault(
+            stage,
+            {
+                "children": 0,
+                "wall": 0.0,
+                "user": 0.0,
+                "sys": 0.0,
+                "max_rss": 0,
+                "read_bytes": 0,
+                "write_bytes": 0,
+            },
+        )
+        total["children"] += 1
+        total["wall"] += result.wall
+
+        for key, value in (result.usage or {}).items():
+            if key == "max_rss":
+                total[key] = max(total[key], value)
+            else:
+                total[key] += value
+
+
+def reset_usage():
+    """Forgets resources of the children, e.g. of targets installed before by
+    the same worker process."""
+    with usage_lock:
+        child_usage.clear()
+
+
+def get_usage() -> Dict[str, Dict[str, float]]:
+    """Copy of resources of the children by stage."""
+    with usage_lock:
+        return {stage: dict(u) for stage, u in child_usage.items()}
+
+
+def merge_usage(total: Dict[str, Dict[str, float]], usage: Dict[str, Dict[str, float]]):
+    """Adds usage by stage (result of get_usage) to total the way record_usage
+    does: max RSS is the maximum, everything else is summed."""
+    for stage, u in usage.items():
+        if stage not in total:
+            total[stage] = dict(u)
+            continue
+
+        for key, value in u.items():
+            if key == "max_rss":
+                total[stage][key] = max(total[stage][key], value)
+            else:
+                total[stage][key] += value
+
+
+def report_usage(usage: Optional[Dict[str, Dict[str, float]]] = None):
+    """Prints resources of the children by stage, nothing if no child ran.
+
+    Parameters:
+    -----------
+    usage : Optional[Dict[str, Dict[str, float]]]
+        Usage by stage, children of this process if not provided.
+    """
+    if usage is None:
+        usage = get_usage()
+
+    rows = sorted(usage.items(), key=lambda kv: kv[1]["wall"], reverse=True)
+
+    if len(rows) == 0:
+        return
+
+    mb = 1024 * 1024
+    print("Child processes by stage:")
+    print(
+        f"{'stage':20} {'count':>5} {'wall, s':>8} {'user, s':>8} {'sys, s':>8} "
+        f"{'max RSS, MB':>11} {'read, MB':>9} {'write, MB':>9}"
+    )
+
+    for stage, u in rows:
+        print(
+            f"{stage[:20]:20} {u['children']:5} {u['wall']:8.2f} {u['user']:8.2f} "
+            f"{u['sys']:8.2f} {u['max_rss'] / mb:11.1f} "
+            f"{u['read_bytes'] / mb:9.1f} {u['write_bytes'] / mb:9.1f}"
+        )
+
+
+def process_name(command: List[str]) -> str:
+    """Short name of the command for traces: executable and the script run by
+    Blender (-P) or Python (-m)."""
+    name = Path(str(command[0])).name
+
+    for flag in ("-P", "-m"):
+        if flag in command[:-1]:
+            return f"{name} {Path(str(command[command.index(flag) + 1])).name}"
+
+    return name
 
 
 def rmtree_protected(target: Path, allowed_paths: Set[Path]):
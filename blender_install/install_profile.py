@@ -0,0 +1,138 @@
+import os
+import cProfile
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Iterator, List, Optional
+
+# Folder for .pstats files, set by --profile and inherited by Blender scripts
+# and target workers, which profile themselves
+PROFILE_ENV = "BLENDER_INSTALL_PROFILE"
+
+# Replaces -P <script> in Blender command line, so any script (custom ones
+# too) runs under cProfile without changes. sys.argv is untouched
+BOOTSTRAP = (
+    "import sys; sys.path.insert(0, {folder!r}); "
+    "import install_profile; install_profile.run_script({script!r})"
+)
+
+# Profiler of the orchestrator and its pid. Forked workers inherit it enabled,
+# since Python 3.12 only one profiler may be active, so they disable it first
+orchestrator: Optional[cProfile.Profile] = None
+orchestrator_pid: Optional[int] = None
+
+
+def get_folder() -> Optional[Path]:
+    folder = os.environ.get(PROFILE_ENV)
+    return Path(folder) if folder else None
+
+
+def output_path(name: str) -> Path:
+    """Unique .pstats path in the profile folder for this process."""
+    return Path(get_folder() or ".", f"{name}-{os.getpid()}.pstats")
+
+
+def enable(folder: Path) -> cProfile.Profile:
+    """Starts profiling of the orchestrator, stats of the previous run are
+    removed, children started later profile themselves into the same folder.
+
+    Parameters:
+    -----------
+    folder : Path
+        Folder for .pstats files.
+
+    Returns:
+    --------
+    cProfile.Profile
+        Running profiler, see finish.
+    """
+    os.makedirs(folder, exist_ok=True)
+
+    for f in folder.glob("*.pstats"):
+        f.unlink()
+
+    global orchestrator, orchestrator_pid
+
+    os.environ[PROFILE_ENV] = str(folder)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    orchestrator, orchestrator_pid = profiler, os.getpid()
+
+    return profiler
+
+
+@contextmanager
+def profiled(name: str) -> Iterator[None]:
+    """Profiles the block if profiling is requested by the orchestrator, used
+    by target workers. Profiler of the orchestrator inherited by a forked
+    worker is disabled, it would collide with the new one."""
+    if get_folder() is None:
+        yield
+        return
+
+    if orchestrator is not None and os.getpid() != orchestrator_pid:
+        orchestrator.disable()
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(str(output_path(name)))
+
+
+def run_script(script: str):
+    """Runs Blender script as -P does under cProfile, stats are written even if
+    the script exits with sys.exit."""
+    import runpy
+
+    with profiled(Path(script).stem):
+        runpy.run_path(script, run_name="__main__")
+
+
+def script_args(script: Path) -> List[str]:
+    """Blender arguments to run the script: -P <script>, or the bootstrap
+    which profiles it if profiling is requested."""
+    if get_folder() is None:
+        return ["-P", str(script)]
+
+    code = BOOTSTRAP.format(
+        folder=str(Path(__file__).resolve().parent), script=str(script)
+    )
+
+    return ["--python-expr", code]
+
+
+def finish(profiler: cProfile.Profile, folder: Path, top: int):
+    """Stops profiling of the orchestrator, merges stats of all processes into
+    merged.pstats and prints functions with the largest own time.
+
+    Parameters:
+    -----------
+    profiler : cProfile.Profile
+        Profiler returned by enable.
+    folder : Path
+        Folder for .pstats files.
+    top : int
+        Number of printed functions.
+    """
+    import pstats
+
+    profiler.disable()
+    profiler.dump_stats(str(output_path("install")))
+
+    merged = Path(folder, "merged.pstats")
+    files = sorted(str(f) for f in folder.glob("*.pstats") if f != merged)
+    stats = pstats.Stats(*files)
+    stats.dump_stats(str(merged))
+
+    rows = sorted(stats.stats.items(), key=lambda kv: kv[1][2], reverse=True)
+    print(f"Profiles of {len(files)} processes merged: {merged}")
+    print(f"{'ncalls':>9} {'tottime':>8} {'cumtime':>8}  function")
+
+    for (file, line, func), (cc, nc, tt, ct, _) in rows[:top]:
+        calls = str(nc) if cc == nc else f"{nc}/{cc}"
+        # Builtins have no file
+        where = f" ({Path(file).name}:{line})" if line else ""
+        print(f"{calls:>9} {tt:8.3f} {ct:8.3f}  {func}{where}")
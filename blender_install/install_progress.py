@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import time
+import threading
+from typing import Any, Callable, Dict, Optional
+
+# Mode of runs started without --progress, e.g. BLENDER_INSTALL_PROGRESS=json
+# in CI, inherited by target workers
+PROGRESS_ENV = "BLENDER_INSTALL_PROGRESS"
+MODES = ("auto", "tty", "json", "off")
+
+_mode: Optional[str] = None
+_interval = 0.5
+
+
+def configure(mode: str, interval: float = 0.5):
+    """Sets how progress is reported.
+
+    Parameters:
+    -----------
+    mode : str
+        auto - tty if stdout is a terminal, off otherwise; tty - single updated
+        line; json - JSON lines on stdout; off - nothing.
+    interval : float
+        Minimal time between two reports of a task in seconds.
+    """
+    global _mode, _interval
+
+    if mode not in MODES:
+        raise ValueError(f"Unknown progress mode: {mode}")
+
+    _mode = mode
+    _interval = interval
+    os.environ[PROGRESS_ENV] = mode
+
+
+def get_mode() -> str:
+    """Mode with auto resolved against current stdout, which is redirected in
+    target workers."""
+    mode = _mode or os.environ.get(PROGRESS_ENV, "auto")
+
+    if mode == "auto":
+        isatty = getattr(sys.stdout, "isatty", None)
+        return "tty" if isatty is not None and isatty() else "off"
+
+    return mode if mode in MODES else "off"
+
+
+def format_eta(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "--"
+
+    m, s = divmod(int(seconds), 60)
+    return f"{m}m{s:02d}s" if m > 0 else f"{s}s"
+
+
+class Progress:
+    """Progress of a task in bytes and files, reported at most every interval
+    seconds and once on close. Totals are optional, ETA needs one of them.
+    Safe for concurrent updates, no-op when reporting is off.
+    """
+
+    def __init__(self, task: str, total_bytes: int = 0, total_files: int = 0):
+        self.task = task
+        self.total_bytes = total_bytes
+        self.total_files = total_files
+        self.bytes = 0
+        self.files = 0
+        self.mode = get_mode()
+        self.enabled = self.mode != "off"
+        self.started = time.monotonic()
+        self.reported = self.started
+        self.lock = threading.Lock()
+
+    def __enter__(self) -> "Progress":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def update(self, nbytes: int = 0, files: int = 1):
+        """Adds processed bytes and files, reports if interval has passed."""
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.bytes += nbytes
+            self.files += files
+            now = time.monotonic()
+
+            if now - self.reported >= _interval:
+                self.reported = now
+                self.report("progress", now)
+
+    def close(self):
+        """Reports the final state, called once at the end of the task."""
+        if not self.enabled:
+            return
+
+        with self.lock:
+            self.report("done", time.monotonic())
+            self.enabled = False
+
+    def metrics(self, now: float) -> Dict[str, Any]:
+        elapsed = max(now - self.started, 1e-9)
+        mb_s = self.bytes / elapsed / (1024 * 1024)
+        files_s = self.files / elapsed
+        eta = None
+
+        if self.total_bytes > 0 and self.bytes > 0:
+            eta = max(self.total_bytes - self.bytes, 0) * elapsed / self.bytes
+        elif self.total_files > 0 and self.files > 0:
+            eta = max(self.total_files - self.files, 0) * elapsed / self.files
+
+        return {
+            "task": self.task,
+            "bytes": self.bytes,
+            "total_bytes": self.total_bytes,
+            "files": self.files,
+            "total_files": self.total_files,
+            "elapsed": round(elapsed, 3),
+            "mb_s": round(mb_s, 2),
+            "files_s": round(files_s, 1),
+            "eta": round(eta, 1) if eta is not None else None,
+        }
+
+    def report(self, event: str, now: float):
+        m = self.metrics(now)
+
+        if self.mode == "json":
+            print(json.dumps({"event": event, **m}), flush=True)
+            return
+
+        mb = self.bytes / (1024 * 1024)
+        total = ""
+
+        if self.total_bytes > 0:
+            total = f"/{self.total_bytes / (1024 * 1024):.1f}"
+            total += f" MB ({100 * self.bytes / self.total_bytes:3.0f}%)"
+        else:
+            total = " MB"
+
+        line = (
+            f"{self.task}: {mb:.1f}{total}, {self.files} files, "
+            f"{m['mb_s']:.1f} MB/s, {m['files_s']:.0f} files/s"
+        )
+
+        if event == "progress":
+            line += f", ETA {format_eta(m['eta'])}"
+            sys.stdout.write(f"\r{line}\033[K")
+        else:
+            line += f", {m['elapsed']:.1f} s"
+            sys.stdout.write(f"\r{line}\033[K\n")
+
+        sys.stdout.flush()
+
+
+def counting(copy_function: Callable, progress: Progress) -> Callable:
+    """Wraps copy_function of shutil.copytree to count copied files and bytes,
+    returns it unchanged when reporting is off."""
+    if not progress.enabled:
+        return copy_function
+
+    def copy(src, dst, *args, **kwargs):
+        result = copy_function(src, dst, *args, **kwargs)
+        progress.update(os.lstat(src).st_size)
+        return result
+
+    return copy
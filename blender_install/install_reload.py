@@ -0,0 +1,170 @@
+import os
+import sys
+import json
+import socket
+import argparse
+import importlib
+from typing import Any, Dict, List, Optional
+
+# Reload server lives outside of the addon package, so reloading the addon
+# doesn't drop the listening socket
+_server: Optional[socket.socket] = None
+POLL_INTERVAL = 0.1
+
+
+def reload_addon_modules(addon: str, modules: List[str]) -> Dict[str, Any]:
+    """Reloads changed modules of the addon and registers it again.
+
+    Parameters:
+    -----------
+    addon : str
+        Name of the addon package.
+    modules : List[str]
+        Names of changed modules, deepest first.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Result to send back to the watcher.
+    """
+    import addon_utils
+
+    reloaded = []
+    errors = []
+
+    # addon_utils only prints failures of enable/disable without handle_error
+    def handle_error(e: Exception):
+        errors.append(str(e))
+
+    # Sources were edited, bytecode of the import bundle (see __init__.py) is
+    # stale from now on and would be reloaded instead of them
+    bundle = getattr(sys.modules.get(addon), "bundle", None)
+
+    if bundle is not None and bundle in sys.path:
+        sys.path.remove(bundle)
+        sys.path_importer_cache.pop(bundle, None)
+
+    try:
+        addon_utils.disable(addon, default_set=False, handle_error=handle_error)
+
+        try:
+            for name in modules:
+                mod = sys.modules.get(name)
+
+                if mod is not None:
+                    importlib.reload(mod)
+                    reloaded.append(name)
+        finally:
+            # Broken module must not leave the addon disabled in running Blender
+            addon_utils.enable(addon, default_set=False, handle_error=handle_error)
+
+    except Exception as e:
+        errors.append(str(e))
+
+    if len(errors) > 0:
+        return {"ok": False, "error": "; ".join(errors), "reloaded": reloaded}
+
+    return {"ok": True, "reloaded": reloaded}
+
+
+def handle_client(conn: socket.socket):
+    """Reads single JSON request and answers with reload result."""
+    conn.setblocking(True)
+    conn.settimeout(2.0)
+
+    with conn:
+        try:
+            req = json.loads(conn.makefile("r", encoding="utf8").readline())
+            res = reload_addon_modules(req["addon"], req.get("modules", []))
+        except Exception as e:
+            res = {"ok": False, "error": str(e), "reloaded": []}
+
+        conn.sendall((json.dumps(res) + "\n").encode("utf8"))
+
+
+def poll_server() -> Optional[float]:
+    """bpy.app.timers callback, accepts pending connections without blocking UI."""
+    if _server is None:
+        return None
+
+    while True:
+        try:
+            conn, _ = _server.accept()
+        except (BlockingIOError, OSError):
+            break
+
+        handle_client(conn)
+
+    return POLL_INTERVAL
+
+
+def start_reload_server(port: int) -> bool:
+    """Starts listening for reload requests of install.py --watch on localhost.
+    Safe to call multiple times, e.g. from addon's register().
+
+    Parameters:
+    -----------
+    port : int
+        Local port to listen on.
+
+    Returns:
+    --------
+    bool
+        Server is running.
+    """
+    global _server
+
+    if _server is not None:
+        return True
+
+    import bpy
+
+    try:
+        s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        s.bind(("127.0.0.1", port))
+        s.listen()
+        s.setblocking(False)
+    except OSError as e:
+        print(f"Could not start reload server on port {port}: {e}")
+        return False
+
+    _server = s
+    bpy.app.timers.register(poll_server, persistent=True)
+    print(f"Addon reload server is listening on port {port}")
+
+    return True
+
+
+def start_from_env() -> bool:
+    """Starts reload server if BLENDER_INSTALL_RELOAD_PORT is set."""
+    port = os.environ.get("BLENDER_INSTALL_RELOAD_PORT")
+
+    if port is None or not port.isdigit():
+        return False
+
+    return start_reload_server(int(port))
+
+
+if __name__ == "__main__":
+    argv = sys.argv
+
+    if "--" in argv:
+        argv = argv[argv.index("--") + 1 :]
+    else:
+        argv = []
+
+    parser = argparse.ArgumentParser(
+        description="Addon reload server for install.py --watch",
+        add_help=True,
+    )
+    parser.add_argument(
+        "-p",
+        "--port",
+        type=int,
+        default=int(os.environ.get("BLENDER_INSTALL_RELOAD_PORT", 5890)),
+        help="Local port to listen on",
+    )
+
+    args = parser.parse_args(argv)
+    start_reload_server(args.port)
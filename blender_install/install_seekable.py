@@ -0,0 +1,632 @@
+import os
+import sys
+import json
+import lzma
+import time
+import zlib
+import struct
+import bisect
+import argparse
+import shutil
+import hashlib
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Set, Tuple
+
+# Layout: MAGIC, blocks, compressed index, footer. Data of all files is
+# concatenated in archive order and cut into blocks which are compressed
+# independently, so a file is read by decompressing only the blocks it spans.
+# Index holds offsets of the blocks and of every member in the data
+MAGIC = b"BLSEEK1\n"
+FOOTER = struct.Struct("<Q8s")
+INDEX_VERSION = 1
+SEEKABLE_SUFFIX = ".seekable"
+BLOCK_SIZE = 4 * 1024 * 1024
+CHUNK_SIZE = 1 << 20
+
+
+def get_seekable_path(source: Path) -> Path:
+    return Path(f"{source}{SEEKABLE_SUFFIX}")
+
+
+def get_source_signature(source: Path) -> List[Any]:
+    """Archive is identified by name, size and modification time like in the
+    unpack cache, replaced archive makes its seekable copy stale."""
+    st = source.stat()
+    return [source.name, st.st_size, st.st_mtime_ns]
+
+
+def iter_members(source: Path) -> Iterator[Tuple[Dict[str, Any], Optional[BinaryIO]]]:
+    """Reads archive once as a stream and yields members with the root folder
+    stripped, file members with their data.
+
+    Parameters:
+    -----------
+    source : Path
+        tar.xz, tar.gz, tar.bz2 or zip archive.
+
+    Returns:
+    --------
+    Iterator[Tuple[Dict[str, Any], Optional[BinaryIO]]]
+        Entry of the index without data offsets and file object of the data,
+        valid until the next member is requested.
+    """
+    if source.suffix == ".zip":
+        import zipfile
+
+        with zipfile.ZipFile(str(source)) as f:
+            root = f.namelist()[0]
+
+            for i in f.infolist():
+                path = i.filename.removeprefix(root).rstrip("/")
+
+                if path == "":
+                    continue
+
+                mode = (i.external_attr >> 16) & 0o7777
+                entry = {
+                    "path": path,
+                    "type": "dir" if i.is_dir() else "file",
+                    "mode": mode or (0o755 if i.is_dir() else 0o644),
+                    "mtime": int(time.mktime(i.date_time + (0, 0, -1))),
+                    "size": 0 if i.is_dir() else i.file_size,
+                }
+
+                if i.is_dir():
+                    yield entry, None
+                else:
+                    with f.open(i) as data:
+                        yield entry, data
+
+        return
+
+    import tarfile
+
+    with tarfile.open(str(source), mode="r|*") as f:
+        m0 = None
+
+        for m in f:
+            # Remove the name of the root folder
+            if m0 is None:
+                m0 = len(m.path)
+
+            path = m.path[m0 + 1 : :]
+
+            if path == "":
+                continue
+
+            entry = {
+                "path": path,
+                "type": "file",
+                "mode": m.mode,
+                "mtime": int(m.mtime),
+                "size": 0,
+            }
+
+            if m.isdir():
+                entry["type"] = "dir"
+            elif m.issym():
+                entry["type"] = "symlink"
+                entry["link"] = m.linkname
+            elif m.islnk():
+                entry["type"] = "hardlink"
+                entry["link"] = m.linkname[m0 + 1 : :]
+            elif m.isfile():
+                entry["size"] = m.size
+                yield entry, f.extractfile(m)
+                continue
+            else:
+                # Devices and fifos have no place in portable Blender
+                continue
+
+            yield entry, None
+
+
+class BlockWriter:
+    """Cuts concatenated data of files into blocks of equal uncompressed size
+    and writes them compressed independently."""
+
+    def __init__(self, out: BinaryIO, block_size: int, preset: int):
+        self.out = out
+        self.block_size = block_size
+        self.preset = preset
+        self.buffer = bytearray()
+        self.offset = 0
+        self.blocks: List[List[int]] = []
+
+    def write(self, data: bytes):
+        self.buffer += data
+        self.offset += len(data)
+
+        while len(self.buffer) >= self.block_size:
+            self.flush_block(bytes(self.buffer[: self.block_size]))
+            del self.buffer[: self.block_size]
+
+    def flush_block(self, data: bytes):
+        packed = lzma.compress(data, format=lzma.FORMAT_XZ, preset=self.preset)
+        self.blocks.append([self.out.tell(), len(packed), len(data)])
+        self.out.write(packed)
+
+    def close(self):
+        if len(self.buffer) > 0:
+            self.flush_block(bytes(self.buffer))
+            self.buffer.clear()
+
+
+def convert_archive(
+    source: Path,
+    output: Optional[Path] = None,
+    block_size: int = BLOCK_SIZE,
+    preset: int = 6,
+) -> Path:
+    """Re-encodes archive with portable Blender into seekable format. Archive
+    is read once, the result is written to temporary file and renamed, so
+    readers never see partial file.
+
+    Parameters:
+    -----------
+    source : Path
+        Verified tar.xz, tar.gz, tar.bz2 or zip archive.
+    output : Optional[Path]
+        Seekable file, <source>.seekable by default, where installer finds it.
+    block_size : int
+        Uncompressed size of a block, smaller blocks read less for single files
+        and compress worse.
+    preset : int
+        xz preset of the blocks.
+
+    Returns:
+    --------
+    Path
+        Path of the seekable file.
+    """
+    from install_progress import Progress
+
+    output = output or get_seekable_path(source)
+    tmp = Path(f"{output}.{os.getpid()}.tmp")
+    members: List[Dict[str, Any]] = []
+
+    with open(tmp, "wb") as out, Progress(f"Converting {source.name}") as progress:
+        out.write(MAGIC)
+        writer = BlockWriter(out, block_size, preset)
+
+        for entry, data in iter_members(source):
+            if data is not None:
+                h = hashlib.sha256()
+                entry["offset"] = writer.offset
+
+                for chunk in iter(lambda: data.read(CHUNK_SIZE), b""):
+                    h.update(chunk)
+                    writer.write(chunk)
+
+                entry["sha256"] = h.hexdigest()
+                progress.update(entry["size"])
+
+            members.append(entry)
+
+        writer.close()
+        index = {
+            "version": INDEX_VERSION,
+            "source": get_source_signature(source),
+            "block_size": block_size,
+            "blocks": writer.blocks,
+            "members": members,
+        }
+        index_offset = out.tell()
+        out.write(zlib.compress(json.dumps(index).encode("utf8")))
+        out.write(FOOTER.pack(index_offset, MAGIC))
+
+    os.replace(tmp, output)
+
+    return output
+
+
+class SeekableArchive:
+    """Reader of seekable file, decompresses only blocks of requested files.
+    The last decompressed block is kept, so files read in archive order
+    decompress every block once.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.f = open(path, "rb")
+        self.f.seek(-FOOTER.size, os.SEEK_END)
+        end = self.f.tell()
+        index_offset, magic = FOOTER.unpack(self.f.read(FOOTER.size))
+
+        if magic != MAGIC:
+            self.f.close()
+            raise ValueError(f"Not a seekable archive: {path}")
+
+        self.f.seek(index_offset)
+        self.index = json.loads(zlib.decompress(self.f.read(end - index_offset)))
+
+        if self.index.get("version") != INDEX_VERSION:
+            self.f.close()
+            raise ValueError(f"Unsupported version of seekable archive: {path}")
+
+        self.blocks: List[List[int]] = self.index["blocks"]
+        self.members: List[Dict[str, Any]] = self.index["members"]
+        # Uncompressed offsets of the blocks, for bisect
+        self.starts = []
+        offset = 0
+
+        for _, _, usize in self.blocks:
+            self.starts.append(offset)
+            offset += usize
+
+        self.cached: Tuple[int, bytes] = (-1, b"")
+        self.blocks_read = 0
+
+    def __enter__(self) -> "SeekableArchive":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    def get_member(self, path: str) -> Dict[str, Any]:
+        for m in self.members:
+            if m["path"] == path:
+                return m
+
+        raise KeyError(f"No member {path} in {self.path}")
+
+    def read_block(self, i: int) -> bytes:
+        if self.cached[0] != i:
+            offset, csize, _ = self.blocks[i]
+            self.f.seek(offset)
+            self.cached = (i, lzma.decompress(self.f.read(csize)))
+            self.blocks_read += 1
+
+        return self.cached[1]
+
+    def read_member(self, member: Dict[str, Any]) -> Iterator[bytes]:
+        """Yields data of the file member, reading only the blocks it spans."""
+        start = member["offset"]
+        end = start + member["size"]
+        i = bisect.bisect_right(self.starts, start) - 1
+
+        while start < end:
+            block = self.read_block(i)
+            lo = start - self.starts[i]
+            hi = min(end - self.starts[i], len(block))
+            yield block[lo:hi]
+            start += hi - lo
+            i += 1
+
+    def verify_member(self, member: Dict[str, Any]) -> bool:
+        """Checks data of the file member against its digest in the index."""
+        h = hashlib.sha256()
+
+        for chunk in self.read_member(member):
+            h.update(chunk)
+
+        return h.hexdigest() == member["sha256"]
+
+    def extract(
+        self,
+        target: Path,
+        profile: Optional[Dict[str, Any]] = None,
+        delta: bool = False,
+        progress=None,
+        prune: bool = False,
+    ) -> Dict[str, int]:
+        """Extracts members wanted by the profile to target folder, data of
+        every file is checked against its digest while written.
+
+        Parameters:
+        -----------
+        target : Path
+            Folder with Blender executable.
+        profile : Optional[Dict[str, Any]]
+            Extraction profile, see install_sparse.get_profile.
+        delta : bool
+            Keep files of existing tree with the size and modification time of
+            the member, only missing and changed files are read and written.
+        progress : Optional[Progress]
+            Receives bytes and files written.
+        prune : bool
+            Remove files and folders of existing tree which are not wanted
+            members, e.g. left by other archive or wider profile, so delta
+            gives the same tree as extraction into empty folder.
+
+        Returns:
+        --------
+        Dict[str, int]
+            Number and size of extracted files and of all files of the archive,
+            files kept by delta, paths pruned, blocks read and blocks of the
+            archive.
+        """
+        from install_sparse import is_wanted
+
+        stats = {
+            "files": 0,
+            "bytes": 0,
+            "total_files": 0,
+            "total_bytes": 0,
+            "kept": 0,
+            "pruned": 0,
+            "blocks": 0,
+            "total_blocks": len(self.blocks),
+        }
+        root = os.path.realpath(target)
+        links = []
+        keep = set()
+        reads_before = self.blocks_read
+        os.makedirs(target, exist_ok=True)
+
+        for m in self.members:
+            if m["type"] == "file":
+                stats["total_files"] += 1
+                stats["total_bytes"] += m["size"]
+
+            wanted = profile is None or is_wanted(
+                m["path"], m["type"] == "dir", profile
+            )
+            dst = os.path.join(root, m["path"])
+
+            if not wanted:
+                continue
+
+            keep.add(os.path.normpath(m["path"]))
+
+            # Index is trusted as much as the archive, but never writes outside
+            if os.path.commonpath([root, os.path.realpath(dst)]) != root:
+                raise ValueError(f"Member outside of target: {m['path']}")
+
+            if m["type"] == "dir":
+                os.makedirs(dst, exist_ok=True)
+            elif m["type"] == "file":
+                if delta and is_unchanged(dst, m):
+                    stats["kept"] += 1
+                    continue
+
+                write_member(self, m, dst)
+                stats["files"] += 1
+                stats["bytes"] += m["size"]
+
+                if progress is not None:
+                    progress.update(m["size"])
+            else:
+                # Links go last, targets of hardlinks must exist
+                links.append((m, dst))
+
+        for m, dst in links:
+            if m["type"] == "symlink":
+                if os.path.islink(dst) and os.readlink(dst) == m["link"]:
+                    continue
+
+                if os.path.lexists(dst):
+                    os.unlink(dst)
+
+                os.symlink(m["link"], dst)
+            elif os.path.exists(os.path.join(root, m["link"])):
+                if os.path.lexists(dst):
+                    os.unlink(dst)
+
+                os.link(os.path.join(root, m["link"]), dst)
+
+        if prune:
+            stats["pruned"] = prune_tree(root, keep)
+
+        stats["blocks"] = self.blocks_read - reads_before
+
+        return stats
+
+
+def prune_tree(root: str, keep: Set[str]) -> int:
+    """Removes everything under root except kept relative paths and their
+    parent folders.
+
+    Returns:
+    --------
+    int
+        Number of removed files, links and folders.
+    """
+    keep = set(keep)
+
+    for path in list(keep):
+        keep.update(str(p) for p in Path(path).parents if str(p) != ".")
+
+    removed = 0
+
+    for rt, drs, fls in os.walk(root):
+        rel_dir = os.path.relpath(rt, root)
+
+        for d in list(drs):
+            rel = os.path.normpath(os.path.join(rel_dir, d))
+
+            if rel not in keep:
+                path = os.path.join(rt, d)
+
+                if os.path.islink(path):
+                    os.unlink(path)
+                else:
+                    shutil.rmtree(path)
+
+                drs.remove(d)
+                removed += 1
+
+        for f in fls:
+            if os.path.normpath(os.path.join(rel_dir, f)) not in keep:
+                os.unlink(os.path.join(rt, f))
+                removed += 1
+
+    return removed
+
+
+def is_unchanged(path: str, member: Dict[str, Any]) -> bool:
+    """File of extracted tree matches the member by size and mtime, which are
+    set from the index on extraction."""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+
+    return st.st_size == member["size"] and int(st.st_mtime) == member["mtime"]
+
+
+def write_member(archive: SeekableArchive, member: Dict[str, Any], dst: str):
+    """Writes file member through temporary file, so a file hardlinked to the
+    dedup store or the unpack cache is replaced rather than modified."""
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    h = hashlib.sha256()
+
+    with open(tmp, "wb") as f:
+        for chunk in archive.read_member(member):
+            h.update(chunk)
+            f.write(chunk)
+
+    if h.hexdigest() != member["sha256"]:
+        os.unlink(tmp)
+        raise ValueError(f"Seekable archive is damaged: {member['path']}")
+
+    os.chmod(tmp, member["mode"])
+    os.utime(tmp, (member["mtime"], member["mtime"]))
+    os.replace(tmp, dst)
+
+
+def find_seekable(source: Path) -> Optional[Path]:
+    """Returns seekable copy of the archive if it was converted from the
+    current archive."""
+    path = get_seekable_path(source)
+
+    if not path.is_file():
+        return None
+
+    try:
+        with SeekableArchive(path) as archive:
+            if archive.index["source"] == get_source_signature(source):
+                return path
+    except (OSError, ValueError, zlib.error) as e:
+        print(f"Seekable archive {path} is not usable: {e}")
+        return None
+
+    print(f"Seekable archive {path} is stale, archive changed since conversion")
+    return None
+
+
+def extract_seekable(
+    seekable: Path,
+    target: Path,
+    profile: Optional[Dict[str, Any]] = None,
+    delta: bool = False,
+    prune: bool = False,
+) -> Dict[str, int]:
+    """Extracts seekable archive, see SeekableArchive.extract, and reports
+    blocks read."""
+    from install_progress import Progress
+
+    with SeekableArchive(seekable) as archive, Progress(
+        f"Extracting {seekable.name}"
+    ) as progress:
+        stats = archive.extract(target, profile, delta, progress, prune)
+
+    print(
+        f"Read {stats['blocks']} of {stats['total_blocks']} blocks of {seekable.name}"
+        + (f", {stats['kept']} unchanged files kept" if delta else "")
+        + (f", {stats['pruned']} stale paths removed" if prune else "")
+    )
+
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Re-encode portable Blender archive into seekable format "
+        "with independently compressed blocks and member index, installer uses "
+        "<archive>.seekable next to blender_packed automatically",
+        add_help=True,
+    )
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    convert = commands.add_parser("convert", help="Verify and convert archive")
+    convert.add_argument("archive", type=Path, help="tar.xz, tar.gz or zip")
+    convert.add_argument("-o", "--output", type=Path, help="Seekable file")
+    convert.add_argument(
+        "--block-size", type=float, default=4, help="Uncompressed block size, MB"
+    )
+    convert.add_argument("--preset", type=int, default=6, help="xz preset")
+    convert.add_argument(
+        "--no-verify",
+        action="store_true",
+        help="Convert without checking the archive against its hashfile",
+    )
+
+    verify = commands.add_parser(
+        "verify", help="Check files against the index, reading only their blocks"
+    )
+    verify.add_argument("seekable", type=Path)
+    verify.add_argument("members", nargs="*", help="Paths, all files if omitted")
+
+    extract = commands.add_parser("extract", help="Extract to folder")
+    extract.add_argument("seekable", type=Path)
+    extract.add_argument("target", type=Path)
+    extract.add_argument("--profile", default="full", help="Extraction profile")
+    extract.add_argument(
+        "--delta", action="store_true", help="Write only missing and changed files"
+    )
+    extract.add_argument(
+        "--prune",
+        action="store_true",
+        help="Remove files of the target which are not in the archive or profile",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "convert":
+        if not args.no_verify:
+            from checksum_file import checksum_file
+
+            if not checksum_file(args.archive.resolve()):
+                print("Archive is damaged or checksum is not provided")
+                sys.exit(1)
+
+        output = convert_archive(
+            args.archive.resolve(),
+            args.output,
+            int(args.block_size * 1024 * 1024),
+            args.preset,
+        )
+        mb = 1024 * 1024
+        print(
+            f"Converted {args.archive.name} ({args.archive.stat().st_size / mb:.1f}"
+            f" MB) to {output} ({output.stat().st_size / mb:.1f} MB)"
+        )
+
+    elif args.command == "verify":
+        failed = 0
+
+        with SeekableArchive(args.seekable) as archive:
+            if len(args.members) > 0:
+                members = [archive.get_member(p) for p in args.members]
+            else:
+                members = archive.members
+
+            # Only files have data and digests
+            members = [m for m in members if m["type"] == "file"]
+
+            for m in members:
+                if not archive.verify_member(m):
+                    print(f"Damaged: {m['path']}")
+                    failed += 1
+
+            print(
+                f"Verified {len(members)} files, {failed} damaged, read "
+                f"{archive.blocks_read} of {len(archive.blocks)} blocks"
+            )
+
+        sys.exit(1 if failed > 0 else 0)
+
+    elif args.command == "extract":
+        from install_sparse import get_profile
+
+        extract_seekable(
+            args.seekable,
+            args.target,
+            get_profile(args.profile, {}),
+            args.delta,
+            args.prune,
+        )
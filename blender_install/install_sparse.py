@@ -0,0 +1,176 @@
+import json
+import hashlib
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, BinaryIO, Dict, List
+
+# Globs match paths relative to the root folder of the archive, * matches /.
+# Members matching any exclude glob are skipped, with include globs only the
+# matching files are extracted. Folders are created unless excluded
+EXTRACT_PROFILES: Dict[str, Dict[str, List[str]]] = {
+    "full": {"include": [], "exclude": []},
+    # Background renders and batch scripts: no UI translations and icons,
+    # script templates, docs and the test suite of the bundled Python
+    "headless-render": {
+        "include": [],
+        "exclude": [
+            "*/datafiles/locale/*",
+            "*/datafiles/icons/*",
+            "*/scripts/templates_py/*",
+            "*/scripts/templates_osl/*",
+            "*/python/lib/test/*",
+            "*/python/lib/python3*/test/*",
+            "*/python/lib/idlelib/*",
+            "*/python/lib/python3*/idlelib/*",
+            "*/python/lib/tkinter/*",
+            "*/python/lib/python3*/tkinter/*",
+            "*/python/lib/turtledemo/*",
+            "*/python/lib/python3*/turtledemo/*",
+            "license/*",
+            "readme.html",
+            "blender.desktop",
+            "blender*.svg",
+        ],
+    },
+}
+
+# Printed by the startup check, Blender prints errors of scripts but exits 0
+STARTUP_MARKER = "BLENDER_INSTALL_STARTUP_OK"
+
+
+def get_profile(name: str, custom: Dict[str, Dict[str, List[str]]]) -> Dict[str, Any]:
+    """Resolves extraction profile by name, profiles of the config override
+    built-in ones.
+
+    Parameters:
+    -----------
+    name : str
+        Name of the profile.
+    custom : Dict[str, Dict[str, List[str]]]
+        blender_extract_profiles of the config.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        name, include and exclude globs.
+    """
+    profiles = {**EXTRACT_PROFILES, **custom}
+
+    if name not in profiles:
+        raise Exception(
+            f"Unknown blender_extract_profile: {name}, "
+            f"available: {sorted(profiles)}"
+        )
+
+    return {
+        "name": name,
+        "include": list(profiles[name].get("include", [])),
+        "exclude": list(profiles[name].get("exclude", [])),
+    }
+
+
+def is_full(profile: Dict[str, Any]) -> bool:
+    return len(profile["include"]) == 0 and len(profile["exclude"]) == 0
+
+
+def get_profile_key(profile: Dict[str, Any]) -> str:
+    """Suffix of cache keys, trees extracted with different globs differ even
+    if the profile keeps its name."""
+    if is_full(profile):
+        return ""
+
+    globs = json.dumps([profile["include"], profile["exclude"]])
+    return f"-{profile['name']}-{hashlib.sha1(globs.encode('utf8')).hexdigest()[:8]}"
+
+
+def is_wanted(path: str, is_dir: bool, profile: Dict[str, Any]) -> bool:
+    """Checks member of the archive against the profile.
+
+    Parameters:
+    -----------
+    path : str
+        Path relative to the root folder of the archive.
+    is_dir : bool
+        Member is a folder, it's matched with trailing / too, so dir/* globs
+        exclude the folder itself.
+    profile : Dict[str, Any]
+        Result of get_profile.
+
+    Returns:
+    --------
+    bool
+        Member is extracted.
+    """
+    paths = (path, f"{path}/") if is_dir else (path,)
+
+    if any(fnmatch(p, g) for p in paths for g in profile["exclude"]):
+        return False
+
+    return (
+        is_dir
+        or len(profile["include"]) == 0
+        or any(fnmatch(path, g) for g in profile["include"])
+    )
+
+
+class CountingReader:
+    """File wrapper reporting bytes read from the archive, progress of
+    streamed archive is known only in compressed bytes."""
+
+    def __init__(self, f: BinaryIO, progress):
+        self.f = f
+        self.progress = progress
+
+    def read(self, size: int = -1) -> bytes:
+        data = self.f.read(size)
+        self.progress.update(len(data), 0)
+        return data
+
+
+def report_sizes(stats: Dict[str, int], profile: Dict[str, Any]):
+    """Prints size of extracted files against size of the full archive."""
+    mb = 1024 * 1024
+    ratio = 100 * stats["bytes"] / max(stats["total_bytes"], 1)
+
+    print(
+        f"Extracted with profile {profile['name']}: "
+        f"{stats['bytes'] / mb:.1f} of {stats['total_bytes'] / mb:.1f} MB "
+        f"({ratio:.0f}%), {stats['files']} of {stats['total_files']} files"
+    )
+
+
+def check_blender_starts(blender_path: Path) -> bool:
+    """Starts stripped Blender in background with factory settings and runs
+    Python in it, so missing datafiles or modules show up at install time.
+
+    Returns:
+    --------
+    bool
+        Blender started and ran the check.
+    """
+    from install_proc_utils import run_process
+
+    try:
+        ec, so, se, er = run_process(
+            [
+                str(blender_path),
+                "-b",
+                "--factory-startup",
+                "--python-expr",
+                f"import bpy; print({STARTUP_MARKER!r})",
+            ],
+            "Could not start Blender",
+            60,
+            print_std=False,
+        )
+    except OSError as e:
+        # Executable itself was not extracted or is not runnable
+        print(f"Blender failed to start: {e}")
+        return False
+
+    if ec != 0 or STARTUP_MARKER not in (so or ""):
+        print(f"Blender failed to start: {ec}\n{so}\n{se}\n{er}")
+        return False
+
+    print("Blender starts with extracted files")
+    return True
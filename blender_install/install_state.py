@@ -0,0 +1,350 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from install_config import InstallConfig, UNPACK_MARKER
+from install_platform import BUNDLE_MARKER, python_keyed
+from install_config_snapshot import encode
+
+# Stages of run_install in order of execution and stages they consume results
+# of. Fingerprint of a stage includes fingerprints of its dependencies, so
+# changed inputs invalidate everything downstream
+STAGES = ("pip", "bundle", "addon", "activation", "custom")
+DEPENDS: Dict[str, Tuple[str, ...]] = {
+    "pip": (),
+    "bundle": ("pip",),
+    "addon": ("bundle",),
+    "activation": ("addon", "pip"),
+    "custom": ("activation",),
+}
+
+# Written by the installer into the addon folder, not inputs of the tree
+TREE_SKIP = ("__pycache__", "*.pyc", ".*.snapshot.json")
+
+
+class StageSelection(NamedTuple):
+    """Stages picked by --only, --skip and --force."""
+
+    only: Set[str] = set()
+    skip: Set[str] = set()
+    force: Set[str] = set()
+
+
+def parse_stages(value: str) -> Set[str]:
+    """Parses comma separated stage names, all - every stage. Type of argparse
+    arguments."""
+    names = set(s.strip() for s in value.split(",") if s.strip())
+
+    if "all" in names:
+        return set(STAGES)
+
+    unknown = names.difference(STAGES)
+
+    if len(unknown) > 0:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+    return names
+
+
+def get_dependents(stages: Set[str]) -> Set[str]:
+    """Stages with their transitive dependents."""
+    result = set(stages)
+
+    # STAGES is in topological order, one pass is enough
+    for stage in STAGES:
+        if any(d in result for d in DEPENDS[stage]):
+            result.add(stage)
+
+    return result
+
+
+def file_signature(path: Optional[Path]) -> Optional[List[int]]:
+    """Size and mtime of file, None if it does not exist."""
+    if path is None:
+        return None
+
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+
+    return [st.st_size, st.st_mtime_ns]
+
+
+def tree_signature(folder: Path, skip: List[str], skip_paths: Set[Path]) -> str:
+    """Digest of relative paths, sizes and mtimes of files in the folder.
+    Contents are not read, so unchanged trees cost only a listing.
+
+    Parameters:
+    -----------
+    folder : Path
+        Root of the tree.
+    skip : List[str]
+        Name patterns of files and folders that are not part of the tree.
+    skip_paths : Set[Path]
+        Files and folders that are not part of the tree.
+
+    Returns:
+    --------
+    str
+        Digest of the tree, empty if folder does not exist.
+    """
+    if not folder.is_dir():
+        return ""
+
+    h = hashlib.sha256()
+
+    for root, dirs, files in os.walk(folder):
+        dirs[:] = sorted(
+            d
+            for d in dirs
+            if not any(fnmatch(d, p) for p in skip) and Path(root, d) not in skip_paths
+        )
+
+        for name in sorted(files):
+            path = Path(root, name)
+
+            if any(fnmatch(name, p) for p in skip) or path in skip_paths:
+                continue
+
+            sig = file_signature(path)
+            h.update(f"{path.relative_to(folder)}\0{sig}\n".encode("utf8"))
+
+    return h.hexdigest()
+
+
+def archive_digest(cfg: InstallConfig) -> Any:
+    """Digest of the portable archive from its hashfile, stat data if there is
+    no hashfile."""
+    if cfg.blender_packed is None:
+        return None
+
+    for suffix in ("sha512", "sha384", "sha256", "sha1", "md5"):
+        hashfile = Path(f"{cfg.blender_packed}.{suffix}")
+
+        if hashfile.is_file():
+            return hashfile.read_text().split()[0]
+
+    return file_signature(Path(cfg.blender_packed))
+
+
+def get_stage_inputs(
+    cfg: InstallConfig, stage: str, get_tree: Callable[[], str]
+) -> Dict[str, Any]:
+    """Values the result of the stage depends on.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Parsed and validated config object.
+    stage : str
+        Name of the stage.
+    get_tree : Callable[[], str]
+        Returns signature of the addon tree, only called by stages using it.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        Inputs of the stage.
+    """
+    blender = {
+        "blender_path": cfg.blender_path,
+        "blender_version": cfg.blender_version,
+        "python": cfg.blender_python_version,
+        "archive": archive_digest(cfg),
+        "extract_profile": cfg.blender_extract_profile,
+        # Extraction replaces site-packages with the one of the archive
+        "unpacked": file_signature(Path(cfg.blender_path.parent, UNPACK_MARKER)),
+    }
+
+    if stage == "pip":
+        return {
+            **blender,
+            "pip_modules": cfg.pip_modules,
+            "pip_bundle": cfg.pip_bundle,
+            "script": file_signature(cfg.install_pip_script),
+        }
+    elif stage == "bundle":
+        return {
+            **blender,
+            "pip_modules": cfg.pip_modules,
+            "pip_bundle": cfg.pip_bundle,
+            "tree": get_tree(),
+        }
+    elif stage == "addon":
+        binaries = [
+            {
+                **t,
+                "sources": [file_signature(s) for s in t["sources"]],
+                "depends": [file_signature(s) for s in t["depends"]],
+            }
+            for t in cfg.binaries_targets
+        ]
+
+        return {
+            "tree": get_tree(),
+            "addon_path": cfg.addon_path,
+            "addon_install_mode": cfg.addon_install_mode,
+            "addon_zip_path": cfg.addon_zip_path,
+            "use_ignore": cfg.use_ignore,
+            "use_include": cfg.use_include,
+            "install_include": file_signature(cfg.install_include),
+            "install_exclude": file_signature(cfg.install_exclude),
+            "binaries_compile": cfg.binaries_compile,
+            "binaries_copy": cfg.binaries_copy,
+            "binaries_checksum": cfg.binaries_checksum,
+            "binaries_precompiled": tree_signature(
+                cfg.binaries_precompiled_path, [], set()
+            ),
+            "binaries_targets": binaries,
+        }
+    elif stage == "activation":
+        return {
+            **blender,
+            "activate_addons": cfg.activate_addons,
+            "setup_compute_devices": cfg.setup_compute_devices,
+            "cpu_tuning": cfg.cpu_tuning,
+            "cpu_tuning_save_startup": cfg.cpu_tuning_save_startup,
+            "cpu_numa_node": cfg.cpu_numa_node,
+            "activate_profile": cfg.activate_profile,
+            "activate_budget": cfg.activate_budget,
+            "activate_budgets": cfg.activate_budgets,
+            "script": file_signature(cfg.install_activate_script),
+        }
+    elif stage == "custom":
+        return {
+            **blender,
+            "script": file_signature(cfg.install_custom_script),
+            "args": cfg.install_custom_args,
+        }
+
+    raise ValueError(f"Unknown stage: {stage}")
+
+
+class InstallState:
+    """Results of the stages of every target in SQLite database, shared by
+    concurrent targets. A stage is up to date if its last run succeeded with
+    the same fingerprint.
+    """
+
+    def __init__(self, cfg: InstallConfig, selection: Optional[StageSelection]):
+        self.cfg = cfg
+        self.selection = selection or StageSelection()
+        self.forced = get_dependents(self.selection.force)
+        self.target = f"{cfg.blender_path}|{cfg.addon_path}"
+        self.fingerprints: Dict[str, str] = {}
+        self.tree: Optional[str] = None
+        self.db: Optional[sqlite3.Connection] = None
+
+        if cfg.state_db:
+            os.makedirs(cfg.state_db_path.parent, exist_ok=True)
+            self.db = sqlite3.connect(str(cfg.state_db_path), timeout=30)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS stages ("
+                "target TEXT, stage TEXT, fingerprint TEXT, ec INTEGER, "
+                "finished REAL, duration REAL, PRIMARY KEY (target, stage))"
+            )
+            self.db.commit()
+
+    def get_tree(self) -> str:
+        """Signature of the addon tree, outputs of the stages are excluded."""
+        if self.tree is None:
+            cfg = self.cfg
+            # Bundles of all Python versions and their temporary files
+            skip = list(TREE_SKIP) + [
+                f"{python_keyed(cfg.pip_bundle_name, '*')}*",
+                f"{python_keyed(BUNDLE_MARKER, '*')}*",
+            ]
+
+            if cfg.use_ignore:
+                from install_utils import get_ignore_patterns
+
+                skip.extend(get_ignore_patterns(cfg))
+
+            self.tree = tree_signature(
+                cfg.current_folder,
+                skip,
+                {
+                    cfg.binaries_path,
+                    cfg.state_db_path,
+                },
+            )
+
+        return self.tree
+
+    def get_fingerprint(self, stage: str) -> str:
+        """Digest of inputs of the stage and fingerprints of its dependencies,
+        computed right before the stage runs."""
+        if stage not in self.fingerprints:
+            data = {
+                "inputs": encode(get_stage_inputs(self.cfg, stage, self.get_tree)),
+                "depends": [self.get_fingerprint(d) for d in DEPENDS[stage]],
+            }
+            self.fingerprints[stage] = hashlib.sha256(
+                json.dumps(data, sort_keys=True, default=str).encode("utf8")
+            ).hexdigest()
+
+        return self.fingerprints[stage]
+
+    def check(self, stage: str) -> Tuple[bool, str]:
+        """Decides whether the stage runs.
+
+        Returns:
+        --------
+        Tuple[bool, str]
+            Stage runs and the reason.
+        """
+        sel = self.selection
+
+        if len(sel.only) > 0 and stage not in sel.only:
+            return False, "not selected by --only"
+        elif stage in sel.skip:
+            return False, "skipped by --skip"
+        elif stage in self.forced:
+            return True, "forced"
+        elif self.db is None:
+            return True, "state database is off"
+
+        row = self.db.execute(
+            "SELECT fingerprint, ec FROM stages WHERE target = ? AND stage = ?",
+            (self.target, stage),
+        ).fetchone()
+
+        if row is None:
+            return True, "never run"
+        elif row[1] != 0:
+            return True, f"failed last time ({row[1]})"
+        elif row[0] != self.get_fingerprint(stage):
+            return True, "inputs changed"
+        elif stage == "addon" and not os.path.lexists(self.cfg.addon_path):
+            return True, "addon is missing"
+
+        return False, "up to date"
+
+    def record(self, stage: str, ec: int, duration: float):
+        """Stores result of the stage which has just run."""
+        if self.db is None:
+            return
+
+        self.db.execute(
+            "INSERT OR REPLACE INTO stages VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                self.target,
+                stage,
+                self.get_fingerprint(stage),
+                ec,
+                time.time(),
+                duration,
+            ),
+        )
+        self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
@@ -0,0 +1,194 @@
+import io
+import os
+import sys
+import time
+from pathlib import Path
+from contextlib import redirect_stdout, redirect_stderr
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from install_platform import EC
+from install_profile import profiled
+
+
+# Workers dump profiles of their own, the forked profiler is never dumped
+@profiled("target")
+def run_target(
+    cfg_file: Path, target: int, use_snapshot: bool, selection: Optional[Any] = None
+) -> Dict[str, Any]:
+    """Validates config of the target and installs it. Runs in a worker
+    process, output goes to the log of the target, so targets don't mix it.
+
+    Parameters:
+    -----------
+    cfg_file : Path
+        Path to toml file.
+    target : int
+        Index in [[targets]].
+    use_snapshot : bool
+        Load validated config from snapshot if inputs are unchanged.
+    selection : Optional[StageSelection]
+        Stages selected by --only, --skip and --force.
+
+    Returns:
+    --------
+    Dict[str, Any]
+        name, blender_path, addon_path, exit code, time, log of the target and
+        resources of its child processes by stage.
+    """
+    from install import run_install
+    from install_config import InstallConfig, get_targets
+    from install_trace import span, flush
+    from install_proc_utils import reset_usage, get_usage
+
+    # Pool workers are reused, usage of their previous targets is not ours
+    reset_usage()
+    t0 = time.perf_counter()
+    entry = get_targets(cfg_file)[target]
+    result: Dict[str, Any] = {
+        "name": entry.get("name", f"target_{target}"),
+        "blender_path": entry.get("blender_path", ""),
+        "addon_path": entry.get("addon_path", ""),
+        "ec": EC.INSTALLATION_FAILED.value,
+        "log": None,
+    }
+
+    # Log folder is known only after validation, buffer until then
+    output = io.StringIO()
+
+    with redirect_stdout(output), redirect_stderr(output):
+        try:
+            with span("config validation", target=result["name"]):
+                cfg = InstallConfig(cfg_file, use_snapshot, target)
+
+            result["blender_path"] = str(cfg.blender_path)
+            result["addon_path"] = str(cfg.addon_path)
+            result["ec"] = run_install(cfg, selection)
+            log_dir = cfg.targets_log_path
+        except SystemExit as e:
+            result["ec"] = e.code if isinstance(e.code, int) else result["ec"]
+            log_dir = None
+        except Exception as e:
+            print(f"Target failed: {e}")
+            log_dir = None
+
+    if log_dir is not None:
+        os.makedirs(log_dir, exist_ok=True)
+        log = Path(log_dir, f"{result['name']}.log")
+        log.write_text(output.getvalue())
+        result["log"] = str(log)
+    else:
+        result["output"] = output.getvalue()
+
+    result["time"] = time.perf_counter() - t0
+    result["usage"] = get_usage()
+    # Pool workers exit without atexit handlers
+    flush()
+
+    return result
+
+
+def get_jobs(cfg_file: Path, n_targets: int) -> int:
+    """Number of targets installed at a time, targets_jobs of the config,
+    0 - number of CPUs."""
+    import toml
+
+    jobs = toml.load(cfg_file).get("targets_jobs", 0)
+
+    if jobs <= 0:
+        jobs = os.cpu_count() or 1
+
+    return max(1, min(jobs, n_targets))
+
+
+def combine_exit_codes(codes: List[int]) -> int:
+    """Exit code of the whole run: 0 if every target succeeded, code of the
+    failed targets if they agree, INSTALLATION_FAILED otherwise."""
+    failed = set(c for c in codes if c != 0)
+
+    if len(failed) == 0:
+        return 0
+    elif len(failed) == 1:
+        return failed.pop()
+
+    return EC.INSTALLATION_FAILED.value
+
+
+def run_targets(
+    cfg_file: Path,
+    targets: List[Dict[str, Any]],
+    use_snapshot: bool,
+    selection: Optional[Any] = None,
+) -> int:
+    """Installs every target of the config concurrently in a process pool.
+    Targets share the caches of the config (checksum, pip wheels, unpacked
+    archives, build cache), they are safe for concurrent use.
+
+    Parameters:
+    -----------
+    cfg_file : Path
+        Path to toml file.
+    targets : List[Dict[str, Any]]
+        Parsed [[targets]].
+    use_snapshot : bool
+        Load validated configs from snapshots if inputs are unchanged.
+    selection : Optional[StageSelection]
+        Stages selected by --only, --skip and --force, same for all targets.
+
+    Returns:
+    --------
+    int
+        Combined exit code.
+    """
+    jobs = get_jobs(cfg_file, len(targets))
+    print(f"Installing {len(targets)} targets, {jobs} at a time")
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [
+            pool.submit(run_target, cfg_file, i, use_snapshot, selection)
+            for i in range(len(targets))
+        ]
+        results = []
+
+        for i, f in enumerate(futures):
+            try:
+                results.append(f.result())
+            except Exception as e:
+                results.append(
+                    {
+                        "name": targets[i].get("name", f"target_{i}"),
+                        "blender_path": targets[i].get("blender_path", ""),
+                        "addon_path": targets[i].get("addon_path", ""),
+                        "ec": EC.UNKNOWN_ERROR.value,
+                        "time": 0.0,
+                        "log": None,
+                        "output": f"Worker failed: {e}",
+                    }
+                )
+
+    print(f"{'target':20} {'status':6} {'exit':>4} {'time, s':>8}  blender")
+
+    for r in results:
+        status = "OK" if r["ec"] == 0 else "FAIL"
+        print(
+            f"{r['name']:20} {status:6} {r['ec']:4} {r['time']:8.1f}  "
+            f"{r['blender_path']}"
+        )
+
+        if r["log"] is not None:
+            print(f"{'':20} log: {r['log']}")
+
+        if r["ec"] != 0 and r.get("output"):
+            print(r["output"], file=sys.stderr)
+
+    from install_proc_utils import merge_usage, report_usage
+
+    # Every target reported its own children, these are totals of the run
+    usage: Dict[str, Dict[str, float]] = {}
+
+    for r in results:
+        merge_usage(usage, r.get("usage", {}))
+
+    report_usage(usage)
+
+    return combine_exit_codes([r["ec"] for r in results])
@@ -0,0 +1,265 @@
+import os
+import sys
+import json
+import time
+import atexit
+import threading
+from pathlib import Path
+from functools import wraps
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Child processes (Blender scripts, pool workers) append their spans to this
+# file as JSON lines, the orchestrator merges them into the trace
+TRACE_ENV = "BLENDER_INSTALL_TRACE"
+
+# Wall clock at import, timestamps of all processes share the epoch, so spans
+# of children line up with the orchestrator
+_epoch_us = time.time_ns() // 1000
+_perf_ns = time.perf_counter_ns()
+
+_events: List[Dict[str, Any]] = []
+_lock = threading.Lock()
+_enabled = False
+_root_pid: Optional[int] = None
+_children_file: Optional[str] = None
+_started = 0.0
+# Names of the open stage spans of every thread, kept also when tracing is
+# off, child resource usage is attributed to the innermost stage
+_stages = threading.local()
+
+
+def now_us() -> float:
+    """Microseconds since the epoch, monotonic within the process."""
+    return _epoch_us + (time.perf_counter_ns() - _perf_ns) / 1000
+
+
+def enable(children_file: Path):
+    """Enables tracing in the orchestrator. Child processes started after this
+    call inherit the environment variable and report to children_file.
+
+    Parameters:
+    -----------
+    children_file : Path
+        JSON lines file for spans of child processes, truncated.
+    """
+    global _enabled, _root_pid, _children_file, _started
+
+    os.makedirs(children_file.parent, exist_ok=True)
+    open(children_file, "wt").close()
+
+    _enabled = True
+    _root_pid = os.getpid()
+    _children_file = str(children_file)
+    _started = now_us()
+    os.environ[TRACE_ENV] = _children_file
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def current_stage() -> str:
+    """Name of the innermost open span of stage category in this thread."""
+    stack = getattr(_stages, "stack", None)
+    return stack[-1] if stack else "other"
+
+
+@contextmanager
+def span(name: str, cat: str = "stage", **args) -> Iterator[Dict[str, Any]]:
+    """Records duration of the block as complete event of Chrome trace format.
+
+    Parameters:
+    -----------
+    name : str
+        Name of the span, spans with the same name are summed in the summary.
+    cat : str
+        Category: stage, process, blender.
+    args : Any
+        Values shown in the trace viewer, can be extended inside the block.
+
+    Yields:
+    -------
+    Dict[str, Any]
+        args of the event.
+    """
+    if cat == "stage":
+        if not hasattr(_stages, "stack"):
+            _stages.stack = []
+
+        _stages.stack.append(name)
+
+    if not _enabled:
+        try:
+            yield args
+        finally:
+            if cat == "stage":
+                _stages.stack.pop()
+        return
+
+    ts = now_us()
+
+    try:
+        yield args
+    finally:
+        if cat == "stage":
+            _stages.stack.pop()
+
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": ts,
+            "dur": now_us() - ts,
+            "pid": os.getpid(),
+            "tid": threading.get_ident() % 1000000,
+            "args": args,
+        }
+
+        with _lock:
+            _events.append(event)
+
+
+def traced(name: str, cat: str = "stage") -> Callable:
+    """Decorator wrapping every call of the function into span."""
+
+    def decorator(func: Callable) -> Callable:
+        @wraps(func)
+        def wrapper(*a, **kw):
+            with span(name, cat):
+                return func(*a, **kw)
+
+        return wrapper
+
+    return decorator
+
+
+def flush():
+    """Appends spans of this process to the file of the orchestrator. Called
+    at exit of child processes and by pool workers after every task."""
+    if not _enabled or _children_file is None or os.getpid() == _root_pid:
+        return
+
+    pid = os.getpid()
+
+    with _lock:
+        # Forked workers inherit events of the parent, report only own ones
+        own = [e for e in _events if e["pid"] == pid]
+        _events.clear()
+
+    if len(own) == 0:
+        return
+
+    meta = {
+        "name": "process_name",
+        "ph": "M",
+        "pid": pid,
+        "args": {"name": f"{Path(sys.argv[0]).name} {pid}"},
+    }
+    data = "".join(json.dumps(e) + "\n" for e in [meta] + own)
+
+    # Single append of the whole batch, so batches of children don't mix
+    fd = os.open(_children_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    try:
+        os.write(fd, data.encode("utf8"))
+    finally:
+        os.close(fd)
+
+
+def collect() -> List[Dict[str, Any]]:
+    """Returns spans of the orchestrator and all reported children."""
+    events = [
+        {
+            "name": "process_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "args": {"name": "install.py"},
+        }
+    ]
+
+    with _lock:
+        events.extend(e for e in _events if e["pid"] == os.getpid())
+
+    if _children_file is not None:
+        try:
+            with open(_children_file, "rt") as f:
+                for line in f:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:
+                        # Child was killed in the middle of the write
+                        continue
+        except OSError:
+            pass
+
+    return events
+
+
+def summarize(events: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Sums spans by name.
+
+    Returns:
+    --------
+    List[Dict[str, Any]]
+        name, cat, count, total, max (seconds) sorted by total time.
+    """
+    rows: Dict[str, Dict[str, Any]] = {}
+
+    for e in events:
+        if e.get("ph") != "X":
+            continue
+
+        r = rows.setdefault(
+            e["name"],
+            {"name": e["name"], "cat": e["cat"], "count": 0, "total": 0.0, "max": 0.0},
+        )
+        r["count"] += 1
+        r["total"] += e["dur"] / 1e6
+        r["max"] = max(r["max"], e["dur"] / 1e6)
+
+    return sorted(rows.values(), key=lambda r: r["total"], reverse=True)
+
+
+def write_trace(output: Path) -> List[Dict[str, Any]]:
+    """Writes Chrome trace-event JSON (chrome://tracing, ui.perfetto.dev) and
+    prints summary table, percentages are of the time since enable().
+
+    Parameters:
+    -----------
+    output : Path
+        Trace file.
+
+    Returns:
+    --------
+    List[Dict[str, Any]]
+        Summary rows.
+    """
+    wall = (now_us() - _started) / 1e6
+    events = collect()
+    os.makedirs(output.parent, exist_ok=True)
+
+    with open(output, "wt") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    rows = summarize(events)
+
+    print(f"{'span':40} {'cat':8} {'count':>5} {'total, s':>9} {'max, s':>8} {'%':>5}")
+
+    for r in rows:
+        share = 100 * r["total"] / wall if wall > 0 else 0.0
+        print(
+            f"{r['name'][:40]:40} {r['cat']:8} {r['count']:5} "
+            f"{r['total']:9.3f} {r['max']:8.3f} {share:5.1f}"
+        )
+
+    print(f"Wall time: {wall:.3f} s, trace: {output}")
+
+    return rows
+
+
+# Child processes enable themselves from the environment of the orchestrator
+if TRACE_ENV in os.environ:
+    _enabled = True
+    _children_file = os.environ[TRACE_ENV]
+    atexit.register(flush)
@@ -0,0 +1,151 @@
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def get_cache_key(source: Path, profile: Optional[Dict[str, Any]] = None) -> str:
+    """Archives are identified by name, size and modification time, so a
+    replaced archive is extracted again. Sparse extractions get their own
+    entries."""
+    from install_sparse import get_profile_key
+
+    st = source.stat()
+    key = f"{source.name}-{st.st_size}-{st.st_mtime_ns}"
+
+    return key + (get_profile_key(profile) if profile is not None else "")
+
+
+def get_unpacked(
+    source: Path, cache_root: Path, profile: Optional[Dict[str, Any]] = None
+) -> Path:
+    """Returns folder with extracted archive, extracts it on the first call.
+    The first install extracts under exclusive lock of the entry, concurrent
+    ones wait for it and reuse the tree. Archive is extracted to temporary
+    folder which is renamed when complete, so interrupted extraction never
+    leaves partial tree, and without locks the first rename wins.
+
+    Parameters:
+    -----------
+    source : Path
+        Archive with portable Blender.
+    cache_root : Path
+        Folder with extracted archives.
+    profile : Optional[Dict[str, Any]]
+        Extraction profile, see install_sparse.get_profile.
+
+    Returns:
+    --------
+    Path
+        Folder with extracted archive.
+    """
+    from install_config import extract_portable
+    from install_lock import file_lock, lock_path
+    from install_seekable import find_seekable
+
+    cached = Path(cache_root, get_cache_key(source, profile))
+
+    if cached.is_dir():
+        print(f"Using extracted archive from cache: {cached}")
+        return cached
+
+    with file_lock(lock_path(cached)):
+        if cached.is_dir():
+            print(f"Archive was extracted to cache by other install: {cached}")
+            return cached
+
+        tmp = Path(cache_root, f".{cached.name}.{os.getpid()}.tmp")
+        shutil.rmtree(tmp, True)
+
+        try:
+            extract_portable(source, tmp, profile, seekable=find_seekable(source))
+        except BaseException:
+            # Failed or interrupted extraction is never renamed into the cache
+            shutil.rmtree(tmp, True)
+            raise
+
+        try:
+            os.rename(tmp, cached)
+        except OSError:
+            if not cached.is_dir():
+                raise
+
+            # Other install extracted the same archive first
+            shutil.rmtree(tmp, True)
+
+    return cached
+
+
+def materialize_tree(cached: Path, target: Path) -> Dict[str, int]:
+    """Materializes extracted archive in target folder. Files are reflinked or
+    hardlinked where possible and copied otherwise.
+
+    Parameters:
+    -----------
+    cached : Path
+        Folder with extracted archive.
+    target : Path
+        Folder with Blender executable.
+
+    Returns:
+    --------
+    Dict[str, int]
+        Number of files per method.
+    """
+    from install_utils import link_or_copy_file
+    from install_progress import Progress, counting
+
+    stats = {"reflink": 0, "hardlink": 0, "copy": 0}
+
+    def materialize(src: str, dst: str) -> str:
+        # Writing over existing file could modify the cache through hardlink
+        if os.path.lexists(dst):
+            os.unlink(dst)
+
+        return link_or_copy_file(src, dst, stats)
+
+    with Progress(f"Materializing {cached.name}") as progress:
+        shutil.copytree(
+            cached,
+            target,
+            symlinks=True,
+            dirs_exist_ok=True,
+            copy_function=counting(materialize, progress),
+        )
+
+    return stats
+
+
+def unpack_cached(
+    source: Path,
+    target: Path,
+    cache_root: Path,
+    profile: Optional[Dict[str, Any]] = None,
+):
+    """Materializes extracted archive from the cache in target folder, so every
+    Blender instance unpacked from the same archive costs almost no space.
+
+    Parameters:
+    -----------
+    source : Path
+        Archive with portable Blender.
+    target : Path
+        Folder with Blender executable.
+    cache_root : Path
+        Folder with extracted archives.
+    profile : Optional[Dict[str, Any]]
+        Extraction profile, see install_sparse.get_profile.
+    """
+    from install_lock import file_lock, lock_path
+
+    cached = get_unpacked(source, cache_root, profile)
+
+    # Readers share the lock of the entry and run concurrently, an extraction
+    # holding it exclusively is never seen half done
+    with file_lock(lock_path(cached), shared=True):
+        stats = materialize_tree(cached, target)
+
+    print(
+        f"Unpacked from cache: {stats['reflink']} reflinked, "
+        f"{stats['hardlink']} hardlinked, {stats['copy']} copied"
+    )
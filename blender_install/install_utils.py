@@ -2,13 +2,15 @@ import os
 import sys
 import shutil
 from shutil import ignore_patterns
+from functools import partial
 from pathlib import Path
 from install_config import InstallConfig
 from install_platform import PLATFORM, EC
-from typing import List, Dict, Set, Tuple, Optional
-from subprocess import Popen, PIPE
-from checksum_file import checksum_and_copy
-from install_proc_utils import rmtree_protected
+from install_trace import traced
+from typing import Any, List, Dict, Set, Tuple, Optional
+
+# ioctl request to share data extents between files, see ioctl_ficlone(2)
+FICLONE = 0x40049409
 
 
 def try_to_install(cfg: InstallConfig):
@@ -22,13 +24,33 @@ def try_to_install(cfg: InstallConfig):
         Object with parsed and verified configuration.
     """
     try:
-        symlink_or_copy(cfg)
-        manage_binaries(cfg)
+        if cfg.addon_install_mode == "zip":
+            # Binaries are part of the addon tree, so they go first
+            manage_binaries(cfg)
+            package_addon(cfg)
+        else:
+            symlink_or_copy(cfg)
+            manage_binaries(cfg)
     except Exception as e:
         print(f"Failed to install addon: {e}")
         sys.exit(EC.ADDON_NOT_INSTALLED.value)
 
 
+@traced("addon sync")
+def package_addon(cfg: InstallConfig):
+    """Packages addon to zip archive instead of installing it to addon folder.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Object with parsed and verified configuration.
+    """
+    from install_package import package_addon_zip
+
+    package_addon_zip(cfg)
+
+
+@traced("addon sync")
 def symlink_or_copy(cfg: InstallConfig):
     """Tries to install addon to specified folder. As the fastest and by far best
     solution tries to symlink the blender_install to addon folder, so upon running
@@ -69,6 +91,8 @@ def symlink_or_copy(cfg: InstallConfig):
         elif addon_path.is_dir():
             print("Target folder is folder")
             if not addon_path.is_symlink():
+                from install_proc_utils import rmtree_protected
+
                 print(f"Removing previous folder: {addon_path}")
                 rmtree_protected(addon_path, cfg.addon_allowed_paths)
             elif addon_path.is_symlink():
@@ -87,7 +111,9 @@ def symlink_or_copy(cfg: InstallConfig):
 
 
 def create_symlink_or_copy(cfg: InstallConfig):
-    """Tries to recreate symlink to addon or copy addon files.
+    """Tries to recreate symlink to addon or copy addon files. Depending on the
+    addon_install_mode the files are either copied byte by byte or materialized
+    as reflinks/hardlinks (see link_or_copy_file).
 
     Parameters:
     -----------
@@ -96,9 +122,10 @@ def create_symlink_or_copy(cfg: InstallConfig):
     """
     cur_folder = cfg.current_folder
     addon_path = cfg.addon_path
+    install_mode = cfg.addon_install_mode
 
     try:
-        if cfg.addon_create_link:
+        if install_mode == "symlink":
             os.symlink(os.path.abspath(cur_folder), os.path.abspath(addon_path), True)
 
             if all(
@@ -114,35 +141,150 @@ def create_symlink_or_copy(cfg: InstallConfig):
                 )
                 chk_symlink = True
         else:
-            raise Exception("Preferred to copy the addon, falling back to copy")
+            raise Exception(f"Preferred to {install_mode} the addon, falling back")
 
     except Exception as e:
         print(f"Trying to copy addon files because:\n{e}")
         try:
             # Copy current folder to the release folder
-            ignore_files: List[str] = []
-
-            if cfg.install_exclude is not None:
-                with open(cfg.install_exclude, "rt") as ii:
-                    ignore_files = [
-                        li.replace("/", "") for li in ii.read().splitlines()
-                    ]
-
-            shutil.copytree(
-                os.getcwd(),
-                addon_path,
-                ignore=ignore_patterns(*(pat for pat in ignore_files))
-                if len(ignore_files) > 0
-                else None,
-            )
+            from install_progress import Progress, counting
+
+            ignore_files = get_ignore_patterns(cfg)
+            link_stats: Dict[str, int] = {"reflink": 0, "hardlink": 0, "copy": 0}
+
+            with Progress(f"Copying {cfg.addon_name}") as progress:
+                shutil.copytree(
+                    os.getcwd(),
+                    addon_path,
+                    ignore=(
+                        ignore_patterns(*(pat for pat in ignore_files))
+                        if len(ignore_files) > 0
+                        else None
+                    ),
+                    copy_function=counting(
+                        (
+                            partial(link_or_copy_file, stats=link_stats)
+                            if install_mode == "link"
+                            else shutil.copy2
+                        ),
+                        progress,
+                    ),
+                )
+
+            if install_mode == "link":
+                print(f"Addon tree materialized: {link_stats}")
 
         except Exception as e:
             print(f"All installation methods exausted. Tree copy failed: {e}")
             sys.exit(EC.ADDON_NOT_INSTALLED.value)
 
 
+def get_ignore_patterns(cfg: InstallConfig) -> List[str]:
+    """Reads patterns of files that are not copied along with the addon.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Object with parsed and verified configuration.
+
+    Returns:
+    --------
+    List[str]
+        Patterns in format supported by shutil.ignore_patterns.
+    """
+    ignore_files: List[str] = []
+
+    if cfg.install_exclude is not None:
+        with open(cfg.install_exclude, "rt") as ii:
+            ignore_files = [li.replace("/", "") for li in ii.read().splitlines()]
+
+    return ignore_files
+
+
+def link_or_copy_file(
+    src: str, dst: str, stats: Optional[Dict[str, int]] = None
+) -> str:
+    """Materializes single file of the addon tree with the cheapest method
+    available: reflink (FICLONE, Linux only, e.g. btrfs/xfs), then hardlink if
+    source and target are on the same device, then real copy. Signature is
+    compatible with copy_function of shutil.copytree.
+
+    Parameters:
+    -----------
+    src : str
+        Source file.
+    dst : str
+        Target file, must not exist.
+    stats : Optional[Dict[str, int]]
+        Counters of methods used, updated in place.
+
+    Returns:
+    --------
+    str
+        Target file.
+    """
+    method = "copy"
+
+    if reflink_file(src, dst):
+        method = "reflink"
+    else:
+        try:
+            if os.stat(src).st_dev == os.stat(os.path.dirname(dst)).st_dev:
+                os.link(src, dst)
+                method = "hardlink"
+        except OSError:
+            pass
+
+    if method == "copy":
+        shutil.copy2(src, dst)
+
+    if stats is not None:
+        stats[method] = stats.get(method, 0) + 1
+
+    return dst
+
+
+def reflink_file(src: str, dst: str) -> bool:
+    """Clones file using FICLONE ioctl, file data is shared by the filesystem
+    until one of the files is modified.
+
+    Parameters:
+    -----------
+    src : str
+        Source file.
+    dst : str
+        Target file, must not exist.
+
+    Returns:
+    --------
+    bool
+        Reflink is created.
+    """
+    if PLATFORM != "Linux":
+        return False
+
+    import fcntl
+
+    try:
+        with open(src, "rb") as fs, open(dst, "xb") as fd:
+            try:
+                fcntl.ioctl(fd.fileno(), FICLONE, fs.fileno())
+            except OSError:
+                # Filesystem doesn't support reflinks, leave no partial file
+                fd.close()
+                os.unlink(dst)
+                return False
+
+        shutil.copystat(src, dst)
+        return True
+
+    except OSError:
+        return False
+
+
+@traced("binaries")
 def manage_binaries(cfg: InstallConfig):
-    """Copies or compiles binaries - WIP.
+    """Copies or compiles binaries.
 
     Parameters:
     -----------
@@ -150,7 +292,10 @@ def manage_binaries(cfg: InstallConfig):
         Object with parsed and verified configuration.
     """
     if cfg.binaries_compile:
-        print("Compilation of binaries is not yet supported\n")
+        print("Compiling binaries\n")
+        from install_compile import compile_binaries
+
+        compile_binaries(cfg)
     else:
         print("Copying binaries in repository workfolder\n")
         copy_precompiled(cfg)
@@ -158,53 +303,84 @@ def manage_binaries(cfg: InstallConfig):
 
 def copy_precompiled(cfg: InstallConfig):
     """
-    Copies precompiled binaries to bin/ folder.
+    Copies precompiled binaries to bin/ folder. binaries_precompiled_path is
+    scanned recursively, subpaths of binaries are preserved. Index of scanned
+    folders and copied files is stored in the manifest, so next runs only list
+    changed folders and copy changed binaries.
 
     Parameters:
     -----------
     cfg : InstallConfig
         Object with parsed and verified configuration.
     """
+    # Only needed if binaries are copied, skipped runs don't import them
+    from checksum_file import checksum_and_copy
+    from install_progress import Progress
+    from install_binaries import (
+        get_manifest_path,
+        load_manifest,
+        save_manifest,
+        scan_binaries,
+        diff_index,
+    )
+
     dir_bin_precompiled = cfg.binaries_precompiled_path
     dir_target = cfg.binaries_path
+    manifest_path = get_manifest_path(dir_target, cfg.binaries_manifest)
+    checksum_cache = cfg.checksum_cache_path if cfg.checksum_cache else None
 
     os.makedirs(dir_target, exist_ok=True)
 
-    # Linux uses either no extension or AppImage or other ways to publish apps
-    # Mac uses app format
-    # Windows has exe and dlls
-    # Sets can be extended in the future
-    # Precompiled binary Python modules are pyd
-    bin_ext: Dict[str, Set[str]] = {
-        "Linux": {"", "so", "d"},
-        "Darwin": {
-            "app",
-        },
-        "Windows": {"exe", "dll"},
-        "All": {
-            "pyd",
-        },
-    }
-
-    for rt, drs, fls in os.walk(dir_bin_precompiled, topdown=True):
-        for fl in fls:
-            fp = Path(rt, fl)
-            fl_ext = fp.suffixes[-1][1::] if fp.suffixes else ""
-
-            if any(
-                (
-                    fl_ext in bin_ext[PLATFORM],
-                    fl_ext in bin_ext["All"],
-                    fl_ext == "",
-                )
-            ):
-                if fp.is_file():
-                    checksum_and_copy(fp, dir_target)
-                elif fp.is_dir():
-                    print("Not checksumming the folder, just copy")
-                    print(f"Dir copied to: {shutil.copytree(fp, dir_target)}")
-                else:
-                    print(f"{Path(rt, fl)} is not file or dir, not copying")
-
-        # Only one level is copied at the moment
-        break
+    manifest = load_manifest(manifest_path, dir_bin_precompiled)
+    index = scan_binaries(dir_bin_precompiled, manifest)
+    changed, removed = diff_index(index, manifest, dir_target)
+    copied: Dict[str, List[Any]] = manifest.get("files", {})
+
+    print(
+        f"Binaries found: {len(index)}, changed: {len(changed)}, "
+        f"removed: {len(removed)}"
+    )
+
+    for rel in removed:
+        fp = Path(dir_target, rel)
+        print(f"Binary removed from source, removing: {fp}")
+
+        # Binaries folder is owned by the installer, no allowed paths check
+        if fp.is_dir() and not fp.is_symlink():
+            shutil.rmtree(fp)
+        elif fp.exists() or fp.is_symlink():
+            os.unlink(fp)
+
+        del copied[rel]
+
+    # Index has sizes, totals cost nothing
+    progress = Progress(
+        "Copying binaries", sum(index[rel][1] for rel in changed), len(changed)
+    )
+
+    for rel in changed:
+        kind = index[rel][0]
+        fp = Path(dir_bin_precompiled, rel)
+        fp_target = Path(dir_target, rel)
+        os.makedirs(fp_target.parent, exist_ok=True)
+
+        if kind == "dir":
+            print("Not checksumming the folder, just copy")
+            print(
+                "Dir copied to: "
+                f"{shutil.copytree(fp, fp_target, dirs_exist_ok=True)}"
+            )
+        elif cfg.binaries_checksum:
+            if not checksum_and_copy(fp, fp_target.parent, checksum_cache):
+                progress.update(index[rel][1])
+                continue
+        else:
+            print(f"Copied to: {shutil.copy2(fp, fp_target)}")
+
+        copied[rel] = list(index[rel])
+        progress.update(index[rel][1])
+
+    progress.close()
+
+    manifest["files"] = copied
+    save_manifest(manifest_path, manifest)
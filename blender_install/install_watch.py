@@ -0,0 +1,395 @@
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Dict, List, Set, Tuple, Optional
+from install_config import InstallConfig
+from install_platform import PLATFORM
+from install_utils import get_ignore_patterns, link_or_copy_file
+
+# Snapshot entry: relative path -> (st_mtime_ns, st_size)
+Snapshot = Dict[str, Tuple[int, int]]
+
+# inotify(7) event masks used as a wake-up signal for the poller
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = 0x00000800
+IN_WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+
+
+def take_snapshot(root: Path, ignore: List[str]) -> Tuple[Snapshot, Set[str]]:
+    """Builds stat index of the source tree with os.scandir, files matching ignore
+    patterns are skipped the same way shutil.copytree skips them.
+
+    Parameters:
+    -----------
+    root : Path
+        Root of the addon source tree.
+    ignore : List[str]
+        Glob patterns of names to skip.
+
+    Returns:
+    --------
+    Snapshot
+        Relative path -> (mtime_ns, size) of every file.
+    Set[str]
+        Relative paths of all directories, including root ("").
+    """
+    files: Snapshot = {}
+    dirs: Set[str] = {""}
+    stack = [""]
+
+    while stack:
+        rel = stack.pop()
+
+        try:
+            it = os.scandir(os.path.join(root, rel))
+        except OSError:
+            continue
+
+        with it:
+            for e in it:
+                if any(fnmatch(e.name, pat) for pat in ignore):
+                    continue
+
+                e_rel = os.path.join(rel, e.name) if rel else e.name
+
+                try:
+                    if e.is_dir(follow_symlinks=False):
+                        dirs.add(e_rel)
+                        stack.append(e_rel)
+                    elif e.is_file():
+                        st = e.stat()
+                        files[e_rel] = (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    # File vanished between listing and stat, next poll gets it
+                    continue
+
+    return files, dirs
+
+
+def diff_snapshots(old: Snapshot, new: Snapshot) -> Tuple[List[str], List[str]]:
+    """Compares two snapshots.
+
+    Returns:
+    --------
+    List[str]
+        Added or modified files.
+    List[str]
+        Removed files.
+    """
+    changed = sorted(p for p, st in new.items() if old.get(p) != st)
+    removed = sorted(p for p in old.keys() if p not in new)
+
+    return changed, removed
+
+
+class Inotify:
+    """Minimal ctypes binding to inotify, used only to sleep until anything
+    changes in watched directories instead of waking up every poll interval.
+    The snapshot diff stays the source of truth."""
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK)
+
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.watched: Set[str] = set()
+
+    def watch(self, root: Path, dirs: Set[str]):
+        """Adds watches for directories that are not watched yet."""
+        for d in dirs - self.watched:
+            path = os.fsencode(os.path.join(root, d))
+
+            if self.libc.inotify_add_watch(self.fd, path, IN_WATCH_MASK) >= 0:
+                self.watched.add(d)
+
+        # Directories removed from the tree drop their watches in kernel
+        self.watched &= dirs
+
+    def wait(self, timeout: float) -> bool:
+        """Waits for events and drains them.
+
+        Returns:
+        --------
+        bool
+            Some events were received.
+        """
+        import select
+
+        r, _, _ = select.select([self.fd], [], [], timeout)
+
+        if not r:
+            return False
+
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def get_waiter() -> Optional[Inotify]:
+    """Returns inotify waiter if it's available on this platform."""
+    if PLATFORM != "Linux":
+        return None
+
+    try:
+        return Inotify()
+    except Exception as e:
+        print(f"inotify is not available, polling only: {e}")
+        return None
+
+
+def addon_is_symlinked(cfg: InstallConfig) -> bool:
+    """Checks that addon path is a symlink to the current folder, so any change
+    in sources is visible to Blender without syncing."""
+    addon_path = cfg.addon_path
+
+    return addon_path.is_symlink() and Path(addon_path.resolve()) == Path(
+        cfg.current_folder
+    )
+
+
+def resync_files(
+    cfg: InstallConfig, changed: List[str], removed: List[str]
+) -> Dict[str, int]:
+    """Copies changed files to the installed addon folder using the copy path of
+    the configured addon_install_mode, removes deleted files.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Object with parsed and verified configuration.
+    changed : List[str]
+        Relative paths of added/modified files.
+    removed : List[str]
+        Relative paths of removed files.
+
+    Returns:
+    --------
+    Dict[str, int]
+        Counters of methods used to sync files.
+    """
+    stats: Dict[str, int] = {"removed": 0}
+    src_root = cfg.current_folder
+    dst_root = cfg.addon_path
+
+    for rel in removed:
+        dst = Path(dst_root, rel)
+
+        if dst.is_file() or dst.is_symlink():
+            os.unlink(dst)
+            stats["removed"] += 1
+
+    for rel in changed:
+        src = Path(src_root, rel)
+        dst = Path(dst_root, rel)
+        os.makedirs(dst.parent, exist_ok=True)
+
+        # Editors often replace files instead of writing in place, so hardlink
+        # may point to the stale inode, always recreate the target
+        if dst.exists() or dst.is_symlink():
+            os.unlink(dst)
+
+        try:
+            if cfg.addon_install_mode == "link":
+                link_or_copy_file(str(src), str(dst), stats)
+            else:
+                shutil.copy2(src, dst)
+                stats["copy"] = stats.get("copy", 0) + 1
+        except FileNotFoundError:
+            # Removed right after the change, next poll removes target
+            continue
+
+    return stats
+
+
+def affected_modules(addon_name: str, files: List[str]) -> List[str]:
+    """Maps changed files to names of addon modules, deepest modules go first,
+    so they are reloaded before modules importing them, the addon package goes
+    last. Addon folder is on sys.path and submodules are imported as top level
+    modules (lazy_registry, example.example_operator), both these names and
+    names under the addon package are returned, modules which are not
+    imported are skipped by the reload server.
+
+    Parameters:
+    -----------
+    addon_name : str
+        Name of the addon package.
+    files : List[str]
+        Relative paths of changed files.
+
+    Returns:
+    --------
+    List[str]
+        Module names to reload.
+    """
+    modules: Set[str] = set()
+
+    for rel in files:
+        p = Path(rel)
+
+        if p.suffix != ".py":
+            # Data files are picked up by the package itself
+            modules.add(addon_name)
+            continue
+
+        parts = list(p.with_suffix("").parts)
+
+        if parts[-1] == "__init__":
+            parts = parts[:-1]
+
+        if len(parts) == 0:
+            modules.add(addon_name)
+            continue
+
+        modules.add(".".join(parts))
+        modules.add(".".join([addon_name] + parts))
+
+    return sorted(modules, key=lambda m: (m == addon_name, -m.count("."), m))
+
+
+def notify_blender(
+    port: int, addon_name: str, modules: List[str], timeout: float = 10.0
+) -> Optional[Dict]:
+    """Asks running Blender instance with install_reload server to reload modules.
+
+    Parameters:
+    -----------
+    port : int
+        Local port of reload server.
+    addon_name : str
+        Name of the addon package.
+    modules : List[str]
+        Module names to reload.
+    timeout : float
+        Timeout of the request.
+
+    Returns:
+    --------
+    Optional[Dict]
+        Reply of the reload server, None if Blender is not reachable.
+    """
+    msg = json.dumps({"addon": addon_name, "modules": modules}) + "\n"
+
+    try:
+        with socket.create_connection(("127.0.0.1", port), timeout) as s:
+            s.sendall(msg.encode("utf8"))
+            reply = s.makefile("r", encoding="utf8").readline()
+
+        return json.loads(reply) if reply else None
+
+    except (OSError, ValueError) as e:
+        print(f"Could not notify Blender on port {port}: {e}")
+        return None
+
+
+def watch_addon(cfg: InstallConfig):
+    """Watches addon sources and keeps installed addon up to date until
+    interrupted. On every change only changed files are synced (nothing is
+    copied if addon is symlinked) and running Blender is asked to reload
+    affected modules, edit-to-running-code latency is reported.
+
+    Parameters:
+    -----------
+    cfg : InstallConfig
+        Object with parsed and verified configuration.
+    """
+    root = cfg.current_folder
+    ignore = get_ignore_patterns(cfg)
+    interval = cfg.watch_interval
+    port = cfg.watch_reload_port
+    waiter = get_waiter()
+    snap, dirs = take_snapshot(root, ignore)
+
+    print(
+        f"Watching {root} ({len(snap)} files, "
+        f"{'inotify' if waiter is not None else 'polling'}), Ctrl+C to stop"
+    )
+
+    try:
+        while True:
+            if waiter is not None:
+                waiter.watch(root, dirs)
+                # Events are coalesced, the stat snapshot stays authoritative
+                waiter.wait(interval * 10)
+                time.sleep(interval)
+            else:
+                time.sleep(interval)
+
+            new_snap, dirs = take_snapshot(root, ignore)
+            changed, removed = diff_snapshots(snap, new_snap)
+
+            if not changed and not removed:
+                continue
+
+            t_detect = time.time()
+            # The oldest change is the one user has been waiting for the longest
+            t_edit = min(
+                (new_snap[p][0] / 1e9 for p in changed),
+                default=t_detect,
+            )
+            snap = new_snap
+
+            if addon_is_symlinked(cfg):
+                stats = {"symlinked": len(changed) + len(removed)}
+            else:
+                stats = resync_files(cfg, changed, removed)
+
+            t_sync = time.time()
+            print(f"Synced {len(changed)} changed, {len(removed)} removed: {stats}")
+
+            if port:
+                modules = affected_modules(cfg.addon_name, changed + removed)
+                reply = notify_blender(port, cfg.addon_name, modules)
+                t_done = time.time()
+
+                if reply is not None:
+                    if not reply.get("ok", False):
+                        print(f"Blender failed to reload: {reply.get('error')}")
+                    print(f"Reloaded in Blender: {reply.get('reloaded', [])}")
+            else:
+                t_done = t_sync
+
+            print(
+                "Latency: "
+                f"detect {(t_detect - t_edit) * 1000:.0f} ms, "
+                f"sync {(t_sync - t_detect) * 1000:.0f} ms, "
+                f"edit-to-running {(t_done - t_edit) * 1000:.0f} ms"
+            )
+            sys.stdout.flush()
+
+    except KeyboardInterrupt:
+        print("Watch stopped")
+
+    finally:
+        if waiter is not None:
+            waiter.close()
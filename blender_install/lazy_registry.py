@@ -0,0 +1,162 @@
+import sys
+import importlib
+import importlib.util
+from types import ModuleType
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+
+class OperatorEntry(NamedTuple):
+    """Declaration of operator that is registered in Blender without importing
+    its module. Module is imported on the first execute()/invoke()."""
+
+    bl_idname: str
+    bl_label: str
+    module: str
+    cls_name: str
+    bl_options: Set[str] = {"REGISTER", "UNDO"}
+    bl_description: str = ""
+    # Returns annotations with bpy.props, properties must be known to Blender
+    # at registration, so they are declared here and not in the real class
+    properties: Optional[Callable[[], Dict[str, Any]]] = None
+    # Real class defines poll, Blender polls operators as soon as they are
+    # drawn, so the module is imported then instead of the first execute()
+    has_poll: bool = False
+
+
+def lazy_import(name: str) -> ModuleType:
+    """Imports module, but executes it only on the first attribute access.
+    Use it for heavy dependencies (numpy, scipy) at the top of operator modules,
+    so the cost is paid in the first execute() instead of Blender startup.
+
+    Parameters:
+    -----------
+    name : str
+        Full name of the module.
+
+    Returns:
+    --------
+    ModuleType
+        Module, loaded on the first attribute access.
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+
+    if spec is None or spec.loader is None:
+        raise ImportError(f"No module named {name!r}", name=name)
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    return module
+
+
+def resolve(entry: OperatorEntry) -> type:
+    """Imports operator module and returns the real operator class."""
+    return getattr(importlib.import_module(entry.module), entry.cls_name)
+
+
+def make_proxy(entry: OperatorEntry) -> type:
+    """Creates lightweight operator class that Blender registers instead of the
+    real one. execute/invoke/modal/check/cancel are delegated to the real
+    class, which is imported on the first call. poll is delegated only if the
+    entry declares has_poll, such operators import their module when Blender
+    first polls them. draw is not delegated: defined draw replaces Blender's
+    default layout of the properties, declare such operators eagerly.
+
+    Parameters:
+    -----------
+    entry : OperatorEntry
+        Declaration of the operator.
+
+    Returns:
+    --------
+    type
+        Operator class ready for bpy.utils.register_class.
+    """
+    from bpy.types import Operator
+
+    real: List[type] = []
+
+    def real_cls() -> type:
+        if not real:
+            real.append(resolve(entry))
+
+        return real[0]
+
+    def execute(self, context):
+        return real_cls().execute(self, context)
+
+    def invoke(self, context, event):
+        cls = real_cls()
+
+        if hasattr(cls, "invoke"):
+            return cls.invoke(self, context, event)
+
+        return self.execute(context)
+
+    def modal(self, context, event):
+        return real_cls().modal(self, context, event)
+
+    @classmethod
+    def poll(cls, context):
+        return real_cls().poll(context)
+
+    def check(self, context):
+        cls = real_cls()
+
+        return cls.check(self, context) if hasattr(cls, "check") else False
+
+    def cancel(self, context):
+        cls = real_cls()
+
+        if hasattr(cls, "cancel"):
+            cls.cancel(self, context)
+
+    attrs: Dict[str, Any] = {
+        "bl_idname": entry.bl_idname,
+        "bl_label": entry.bl_label,
+        "bl_description": entry.bl_description or entry.bl_label,
+        "bl_options": set(entry.bl_options),
+        "execute": execute,
+        "invoke": invoke,
+        "modal": modal,
+        "check": check,
+        "cancel": cancel,
+        "__annotations__": entry.properties() if entry.properties else {},
+        "__doc__": entry.bl_description or entry.bl_label,
+    }
+
+    if entry.has_poll:
+        attrs["poll"] = poll
+
+    name = "".join(p.capitalize() for p in entry.bl_idname.replace(".", "_").split("_"))
+
+    return type(f"{name}Lazy", (Operator,), attrs)
+
+
+def get_classes(
+    entries: Tuple[OperatorEntry, ...], lazy: bool = True
+) -> Tuple[type, ...]:
+    """Returns classes to register: proxies if lazy, real classes otherwise.
+
+    Parameters:
+    -----------
+    entries : Tuple[OperatorEntry, ...]
+        Declarations of operators.
+    lazy : bool
+        Don't import operator modules.
+
+    Returns:
+    --------
+    Tuple[type, ...]
+        Operator classes.
+    """
+    if lazy:
+        return tuple(make_proxy(e) for e in entries)
+
+    return tuple(resolve(e) for e in entries)